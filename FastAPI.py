@@ -1,31 +1,52 @@
+import time
+# Startup breakdown: how long importing the app's modules takes (models load lazily, see models.py)
+import_started = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 import os
 from configuration import DIRECTORY_PATH,VECTORSORE_PATH
-from ingestion import create_vectorstore_from_pdfs
-from create_diagram import diagram_creation
-from create_summary import summary_creation
+from configuration import QA_BATCH_MAX_QUESTIONS, QA_BATCH_CONCURRENCY
+from create_diagram import adiagram_creation, aprepare_diagram_chain
+from create_summary import asummary_creation, aprepare_summary_chain
 import uvicorn  # make sure uvicorn is installed
 from fastapi.middleware.cors import CORSMiddleware
-from QA_Rag import generate_answer
-from fastapi.responses import JSONResponse
+from QA_Rag import agenerate_answer, aprepare_answer_chain, agenerate_answers_batch
+from fastapi.responses import JSONResponse, StreamingResponse
+import json
 from fastapi.exceptions import RequestValidationError
 from fastapi import Request
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from datetime import datetime
 import pytz  # Optional: for timezone-aware timestamp
 from collections import defaultdict
-import time
+from contextlib import AsyncExitStack
+from functools import partial
 from create_topics import topics_from_vectorstore
 from create_quiz import quiz_creation
-from typing import Optional
-from create_faq import FAQ_creation
+from typing import Optional, Literal
+from create_faq import aFAQ_creation, aprepare_FAQ_chain
+from vectorstore_registry import vectorstore_registry
+from ingestion_jobs import ingestion_jobs
+from embedding_cache import embedding_cache
+from conversion_cache import conversion_cache
+from semantic_cache import semantic_cache
+from artifact_cache import artifact_cache
+from topic_model import topic_models
+from sparse_index import sparse_indexes
+from workload_pools import PoolSaturated, retrieval_pool, generation_pool
+from request_coalescing import single_flight
+from chain_registry import chain_registry
+from artifact_cache import normalize_subject
+from vectorstore_registry import vectorstore_key, vectorstore_version, convert_legacy_vectorstores
+import models
 
 # Service start time
 service_start_time = time.time()
+import_seconds = round(time.perf_counter() - import_started, 3)
+ready_seconds = None
 
 # API request counter
 request_counter = defaultdict(int)
@@ -48,8 +69,176 @@ app.add_middleware(
 
 
 
-# ThreadPool for concurrency
-executor = ThreadPoolExecutor()
+def cached_frames(content: str, start_time: float, sources: list = None):
+    # A cached result is sent as a single token frame followed by the final frame
+    total_ms = round((time.perf_counter() - start_time) * 1000, 1)
+    sources = sources or []
+    yield json.dumps({"type": "token", "content": content}) + "\n"
+    yield json.dumps({
+        "type": "final",
+        "status": "✅ Success",
+        "cached": True,
+        "source": sources[0] if sources else None,
+        "sources": sources,
+        "timing": {"retrieval_ms": 0.0, "time_to_first_token_ms": total_ms, "total_ms": total_ms}
+    }) + "\n"
+
+
+async def stream_generation(pool, prepare_chain, *args, artifact: dict = None, generation_pool=None):
+    """
+    Run a prepared LCEL chain with `.astream()` and yield NDJSON frames.
+
+    Every token is sent as {"type": "token", "content": ...} as soon as Ollama produces it.
+    The final frame ({"type": "final"}) carries the source documents and timing, and an
+    {"type": "error"} frame is sent instead if anything fails mid-stream.
+
+    When `artifact` (function, subject, vectorstore_name, params, force_refresh) is given,
+    a cached artifact is sent as a single token frame and a fresh one is cached at the end,
+    under the store version read before generation started. A chain of None from
+    `prepare_chain` (a semantic cache hit, see aprepare_answer_chain) is answered the
+    same way with inputs["answer"], without taking a generation slot.
+    The generation holds a slot of `pool` until the last token has been sent. With
+    `generation_pool`, the slot of `pool` is only held while the chain is prepared
+    (retrieval) and is then traded for a slot of `generation_pool`. Admission was
+    already checked by ndjson_response.
+    """
+    start_time = time.perf_counter()
+    try:
+        if artifact is not None:
+            artifact = {**artifact, "version": vectorstore_version(artifact["vectorstore_name"])}
+            cached = get_cached_artifact(**artifact)
+            if cached is not None:
+                for frame in cached_frames(cached, start_time):
+                    yield frame
+                return
+
+        async with AsyncExitStack() as slots:
+            await slots.enter_async_context(pool.admit(check=False))
+            chain, inputs, source_documents = await prepare_chain(*args)
+            retrieval_time = time.perf_counter()
+            if chain is None:
+                sources = [doc.metadata.get("source", "Unknown") for doc in source_documents]
+                for frame in cached_frames(inputs["answer"], start_time, sources):
+                    yield frame
+                return
+            if generation_pool is not None:
+                await slots.aclose()
+                await slots.enter_async_context(generation_pool.admit(check=False))
+
+            first_token_time = None
+            tokens = []
+            async for token in chain.astream(inputs):
+                if first_token_time is None:
+                    first_token_time = time.perf_counter()
+                tokens.append(token)
+                yield json.dumps({"type": "token", "content": token}) + "\n"
+
+        if artifact is not None:
+            remember_artifact(
+                artifact["function"], artifact["subject"], artifact["vectorstore_name"], artifact["params"], "".join(tokens),
+                artifact["version"]
+            )
+
+        end_time = time.perf_counter()
+        if first_token_time is None:
+            first_token_time = end_time
+
+        sources = []
+        for doc in source_documents:
+            source = doc.metadata.get("source", "Unknown")
+            if source not in sources:
+                sources.append(source)
+
+        yield json.dumps({
+            "type": "final",
+            "status": "✅ Success",
+            "cached": False,
+            "source": sources[0] if sources else None,
+            "sources": sources,
+            "timing": {
+                "retrieval_ms": round((retrieval_time - start_time) * 1000, 1),
+                "time_to_first_token_ms": round((first_token_time - start_time) * 1000, 1),
+                "total_ms": round((end_time - start_time) * 1000, 1)
+            }
+        }) + "\n"
+
+    except Exception as e:
+        print(f"❌ Streaming generation failed: {e}")
+        yield json.dumps({"type": "error", "message": f"❌ Streaming generation failed: {str(e)}"}) + "\n"
+
+
+def ndjson_response(pool, prepare_chain, *args, artifact: dict = None, generation_pool=None):
+    # Reject with 429 before the 200 response starts if a pool's queue is already full
+    pool.check_admission()
+    if generation_pool is not None:
+        generation_pool.check_admission()
+    # The generator is async end to end, so a stream holds no thread while Ollama is generating.
+    return StreamingResponse(
+        stream_generation(pool, prepare_chain, *args, artifact=artifact, generation_pool=generation_pool),
+        media_type="application/x-ndjson"
+    )
+
+
+def get_cached_artifact(function: str, subject, vectorstore_name: str, params: dict = None, force_refresh: bool = False,
+                        version: str = None):
+    """
+    Return a previously generated artifact for the same (function, subject, store version, params),
+    or None if there is none or the caller asked for a fresh generation.
+    """
+    if force_refresh:
+        return None
+    try:
+        return artifact_cache.get(function, subject, vectorstore_name, params, version)
+    except Exception as e:
+        print(f"⚠️ Artifact cache lookup failed: {e}")
+        return None
+
+
+def remember_artifact(function: str, subject, vectorstore_name: str, params: dict, content, version: str = None):
+    # Generators report failures as "Error..." strings; those must not be cached.
+    # `version` is the store version read before generation started.
+    if isinstance(content, str) and content and not content.startswith("Error"):
+        try:
+            artifact_cache.put(function, subject, vectorstore_name, params, content, version)
+        except Exception as e:
+            print(f"⚠️ Artifact cache store failed: {e}")
+
+
+async def run_coalesced(kind: str, payload: dict, pool, func, *args, artifact: dict = None):
+    """
+    Run `func(*args)` once for all concurrent requests with the same normalized payload.
+
+    Only the leading request takes a slot of `pool` and, if `artifact` (function, subject,
+    vectorstore_name, params, version) is given, stores the result in the artifact cache; followers
+    just wait for the shared result. With `pool` None, `func` takes its own pool slots.
+    """
+    async def compute():
+        if pool is None:
+            result = await func(*args)
+        elif asyncio.iscoroutinefunction(func):
+            async with pool.admit():
+                result = await func(*args)
+        else:
+            result = await pool.run(func, *args)
+        if artifact is not None:
+            remember_artifact(artifact["function"], artifact["subject"], artifact["vectorstore_name"], artifact["params"], result,
+                              artifact.get("version"))
+        return result
+
+    return await single_flight.run(kind, payload, compute)
+
+
+def artifact_params(retrieval_mode: str, **params):
+    # Dense retrieval keeps the params (and so the cache keys) artifacts had before hybrid retrieval
+    if retrieval_mode != "dense":
+        params["retrieval_mode"] = retrieval_mode
+    return params or None
+
+
+def coalescing_payload(subject, vectorstore_name: str, **params) -> dict:
+    # Requests differing only in case/whitespace of the subject or in store path spelling coalesce
+    return {"subject": normalize_subject(subject), "store": vectorstore_key(vectorstore_name), **params}
+
 
 @app.middleware("http")
 async def count_requests_middleware(request: Request, call_next):
@@ -59,6 +248,20 @@ async def count_requests_middleware(request: Request, call_next):
     return response
 
 
+@app.on_event("startup")
+async def convert_legacy_stores():
+    # One-off move of pre-snapshot stores into snapshots; requests only ever read snapshots
+    converted = await asyncio.to_thread(convert_legacy_vectorstores)
+    if converted:
+        print(f"🗂️ Converted legacy vector stores: {', '.join(converted)}")
+
+
+@app.on_event("startup")
+async def record_ready_time():
+    global ready_seconds
+    ready_seconds = round(time.perf_counter() - import_started, 3)
+    print(f"🚀 StudyBuddy API ready in {ready_seconds:.2f}s (imports {import_seconds:.2f}s)")
+
 
 @app.get("/")
 def root():
@@ -91,7 +294,51 @@ async def metrics():
         "status": "✅ Metrics OK",
         "uptime": uptime_str,
         "uptime_seconds": uptime_seconds,
-        "request_counts": dict(request_counter)
+        "request_counts": dict(request_counter),
+        "startup": {
+            "import_seconds": import_seconds,
+            "ready_seconds": ready_seconds,
+            "models": models.stats()
+        },
+        "vectorstore_cache": vectorstore_registry.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "conversion_cache": conversion_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "artifact_cache": artifact_cache.stats(),
+        "topic_models": topic_models.stats(),
+        "sparse_indexes": sparse_indexes.stats(),
+        "coalescing": single_flight.stats(),
+        "chain_registry": chain_registry.stats(),
+        "workload_pools": {
+            "ingestion": ingestion_jobs.stats(),
+            "retrieval": retrieval_pool.stats(),
+            "generation": generation_pool.stats()
+        }
+    }
+
+
+
+class WarmupRequest(BaseModel):
+    resources: Optional[List[str]] = None
+
+@app.post("/warmup")
+async def warmup(req: WarmupRequest = None):
+    """
+    Load the embedding model, LLM client, NLTK stopwords and gensim now instead of on
+    the first request that needs them. Pass `resources` to warm only some of them.
+    """
+    names = req.resources if req else None
+    try:
+        timings = await asyncio.to_thread(models.warm_up, names)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"❌ {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"❌ Warm-up failed: {str(e)}")
+
+    return {
+        "status": "✅ Warmed up",
+        "load_seconds": timings,
+        "loaded": models.stats()["loaded"]
     }
 
 
@@ -99,36 +346,112 @@ async def metrics():
 class VectorStoreRequest(BaseModel):
     filenames: List[str]
     vectorstore_name: str
+    # FAISS index type; defaults to FAISS_INDEX_TYPE in configuration.py
+    index_type: Optional[Literal["flat", "ivf_flat", "ivf_pq", "hnsw"]] = None
 
 @app.post("/create-vectorstore/")
 async def create_vectorstore(req: VectorStoreRequest):
     """
-    Async endpoint to trigger vector store creation from PDF filenames.
+    Queue a background vector store build from PDF filenames.
+    Returns a job id immediately; poll /jobs/{job_id} for progress.
     """
     missing_files = [f for f in req.filenames if not os.path.isfile(os.path.join(DIRECTORY_PATH, f))]
     if missing_files:
         raise HTTPException(status_code=400, detail=f"❌ Missing files: {missing_files}")
 
     try:
-        await asyncio.get_event_loop().run_in_executor(
-            executor,
-            create_vectorstore_from_pdfs,
-            req.filenames,
-            req.vectorstore_name
-        )
+        job = ingestion_jobs.submit(req.filenames, req.vectorstore_name, index_type=req.index_type)
         return {
-            "status": "✅ Success",
+            "status": "✅ Queued",
+            "job_id": job.job_id,
+            "job_url": f"/jobs/{job.job_id}",
             "vectorstore_path": f"Vectorstore/{req.vectorstore_name}"
         }
 
+    except PoolSaturated:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"❌ Failed to create vector store: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"❌ Failed to queue vector store creation: {str(e)}")
+
+
+class VectorStoreUpdateRequest(BaseModel):
+    vectorstore_name: str
+    add_filenames: List[str] = []
+    remove_filenames: List[str] = []
+
+@app.post("/update-vectorstore/")
+async def update_vectorstore_endpoint(req: VectorStoreUpdateRequest):
+    """
+    Queue an incremental update of an existing vector store: only added PDFs are
+    converted and embedded, and chunks of removed PDFs are deleted.
+    Returns a job id immediately; poll /jobs/{job_id} for progress.
+    """
+    vectorstore_path = os.path.join(VECTORSORE_PATH, req.vectorstore_name)
+    if not os.path.exists(vectorstore_path):
+        raise HTTPException(status_code=404, detail=f"❌ Vectorstore '{req.vectorstore_name}' not found.")
+
+    if not req.add_filenames and not req.remove_filenames:
+        raise HTTPException(status_code=400, detail="❌ Provide at least one file to add or remove.")
+
+    missing_files = [f for f in req.add_filenames if not os.path.isfile(os.path.join(DIRECTORY_PATH, f))]
+    if missing_files:
+        raise HTTPException(status_code=400, detail=f"❌ Missing files: {missing_files}")
+
+    try:
+        job = ingestion_jobs.submit(req.add_filenames, req.vectorstore_name, req.remove_filenames, kind="update")
+        return {
+            "status": "✅ Queued",
+            "job_id": job.job_id,
+            "job_url": f"/jobs/{job.job_id}",
+            "vectorstore_path": f"Vectorstore/{req.vectorstore_name}"
+        }
+
+    except PoolSaturated:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"❌ Failed to queue vector store update: {str(e)}")
+
+
+@app.get("/jobs")
+async def list_jobs():
+    """
+    List recent ingestion jobs with their status and progress.
+    """
+    return {"status": "✅ Success", "jobs": ingestion_jobs.list_jobs()}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Report per-file and per-stage progress (converted, chunked, embedded, saved) of an ingestion job.
+    """
+    job = ingestion_jobs.describe(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"❌ Job '{job_id}' not found.")
+    return {"status": "✅ Success", "job": job}
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """
+    Cancel an ingestion job that is still queued.
+    """
+    job = ingestion_jobs.describe(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"❌ Job '{job_id}' not found.")
+
+    if not ingestion_jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"❌ Job '{job_id}' is {job['status']} and can no longer be cancelled.")
+
+    return {"status": "✅ Cancelled", "job_id": job_id}
 
 
 
 class DiagramRequest(BaseModel):
     subject: str
     vectorstore_name: str
+    force_refresh: bool = False
+    retrieval_mode: Literal["dense", "hybrid"] = "dense"
 
 
 @app.post("/generate-diagram/")
@@ -142,26 +465,53 @@ async def generate_diagram(req: DiagramRequest):
         raise HTTPException(status_code=404, detail=f"❌ Vectorstore '{req.vectorstore_name}' not found.")
 
     try:
-        diagram = await asyncio.get_event_loop().run_in_executor(
-            executor,
-            diagram_creation,
-            req.subject,
-            vectorstore_path
-        )
+        params = artifact_params(req.retrieval_mode)
+        version = vectorstore_version(req.vectorstore_name)
+        diagram = get_cached_artifact("diagram", req.subject, req.vectorstore_name, params, req.force_refresh, version)
+        cached = diagram is not None
+        if not cached:
+            diagram = await run_coalesced(
+                "diagram", coalescing_payload(req.subject, req.vectorstore_name, retrieval_mode=req.retrieval_mode),
+                generation_pool, adiagram_creation, req.subject, req.vectorstore_name, req.retrieval_mode,
+                artifact={"function": "diagram", "subject": req.subject, "vectorstore_name": req.vectorstore_name, "params": params,
+                          "version": version}
+            )
 
         return {
             "status": "✅ Success",
             "subject": req.subject,
-            "diagram": diagram
+            "diagram": diagram,
+            "cached": cached
         }
 
+    except PoolSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"❌ Failed to generate diagram: {str(e)}")
 
 
+@app.post("/generate-diagram/stream")
+async def generate_diagram_stream(req: DiagramRequest):
+    """
+    Streaming variant of /generate-diagram/ returning NDJSON token frames.
+    """
+    vectorstore_path = os.path.join(VECTORSORE_PATH, req.vectorstore_name)
+
+    if not os.path.exists(vectorstore_path):
+        raise HTTPException(status_code=404, detail=f"❌ Vectorstore '{req.vectorstore_name}' not found.")
+
+    artifact = {"function": "diagram", "subject": req.subject, "vectorstore_name": req.vectorstore_name,
+                "params": artifact_params(req.retrieval_mode), "force_refresh": req.force_refresh}
+    return ndjson_response(
+        generation_pool, aprepare_diagram_chain, req.subject, req.vectorstore_name, req.retrieval_mode, artifact=artifact
+    )
+
+
 class SummaryRequest(BaseModel):
     subject: str
     vectorstore_name: str
+    force_refresh: bool = False
+    retrieval_mode: Literal["dense", "hybrid"] = "dense"
 
 @app.post("/generate-summary/")
 async def generate_summary(req: SummaryRequest):
@@ -174,26 +524,55 @@ async def generate_summary(req: SummaryRequest):
         raise HTTPException(status_code=404, detail=f"❌ Vectorstore '{req.vectorstore_name}' not found.")
 
     try:
-        summary = await asyncio.get_event_loop().run_in_executor(
-            executor,
-            summary_creation,
-            req.subject,
-            vectorstore_path
-        )
+        params = artifact_params(req.retrieval_mode)
+        version = vectorstore_version(req.vectorstore_name)
+        summary = get_cached_artifact("summary", req.subject, req.vectorstore_name, params, req.force_refresh, version)
+        cached = summary is not None
+        if not cached:
+            summary = await run_coalesced(
+                "summary", coalescing_payload(req.subject, req.vectorstore_name, retrieval_mode=req.retrieval_mode),
+                generation_pool, asummary_creation, req.subject, req.vectorstore_name, req.retrieval_mode,
+                artifact={"function": "summary", "subject": req.subject, "vectorstore_name": req.vectorstore_name, "params": params,
+                          "version": version}
+            )
 
         return {
             "status": "✅ Success",
             "subject": req.subject,
-            "summary": summary
+            "summary": summary,
+            "cached": cached
         }
 
+    except PoolSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"❌ Failed to generate summary: {str(e)}")
 
 
+@app.post("/generate-summary/stream")
+async def generate_summary_stream(req: SummaryRequest):
+    """
+    Streaming variant of /generate-summary/ returning NDJSON token frames.
+    """
+    vectorstore_path = os.path.join(VECTORSORE_PATH, req.vectorstore_name)
+
+    if not os.path.exists(vectorstore_path):
+        raise HTTPException(status_code=404, detail=f"❌ Vectorstore '{req.vectorstore_name}' not found.")
+
+    artifact = {"function": "summary", "subject": req.subject, "vectorstore_name": req.vectorstore_name,
+                "params": artifact_params(req.retrieval_mode), "force_refresh": req.force_refresh}
+    return ndjson_response(
+        generation_pool, aprepare_summary_chain, req.subject, req.vectorstore_name, req.retrieval_mode, artifact=artifact
+    )
+
+
 class QARequest(BaseModel):
     question: str
     vectorstore_name: str
+    retrieval_mode: Literal["dense", "hybrid"] = "dense"
+    # Per-query search depth for IVF / HNSW stores (ignored for flat stores)
+    nprobe: Optional[int] = Field(None, ge=1)
+    ef_search: Optional[int] = Field(None, ge=1)
 
 @app.post("/QA-Guide/")
 async def qa_guide(req: QARequest):
@@ -211,12 +590,13 @@ async def qa_guide(req: QARequest):
         print(f"📨 [QA] Received question: {req.question}")
         print(f"📁 [QA] Using vectorstore: {vectorstore_path}")
 
-        # Run RAG logic in a separate thread for non-blocking performance
-        answer, source = await asyncio.get_event_loop().run_in_executor(
-            executor,
-            generate_answer,
-            req.question,
-            req.vectorstore_name
+        # Retrieval and generation are awaited on the event loop; no thread is held per request.
+        # Retrieval holds a retrieval pool slot, the LLM call a generation pool slot.
+        answer, source = await run_coalesced(
+            "qa", coalescing_payload(req.question, req.vectorstore_name, retrieval_mode=req.retrieval_mode,
+                                     nprobe=req.nprobe, ef_search=req.ef_search),
+            None, agenerate_answer, req.question, req.vectorstore_name, req.retrieval_mode,
+            req.nprobe, req.ef_search, retrieval_pool.admit, generation_pool.admit
         )
 
         return {
@@ -226,14 +606,106 @@ async def qa_guide(req: QARequest):
             "source": source
         }
 
+    except PoolSaturated:
+        raise
     except Exception as e:
         print(f"❌ [QA] Error: {e}")
         raise HTTPException(status_code=500, detail=f"❌ Failed to generate answer: {str(e)}")
+
+
+@app.post("/QA-Guide/stream")
+async def qa_guide_stream(req: QARequest):
+    """
+    Streaming variant of /QA-Guide/ returning NDJSON token frames.
+    The final frame carries the source documents and timing. Retrieval holds a retrieval
+    pool slot and streaming the answer a generation pool slot.
+    """
+    vectorstore_path = os.path.join(VECTORSORE_PATH, req.vectorstore_name)
+
+    if not os.path.exists(vectorstore_path):
+        raise HTTPException(status_code=404, detail=f"❌ Vectorstore '{req.vectorstore_name}' not found.")
+
+    print(f"📨 [QA-Stream] Received question: {req.question}")
+    return ndjson_response(
+        retrieval_pool, aprepare_answer_chain, req.question, req.vectorstore_name, req.retrieval_mode,
+        req.nprobe, req.ef_search, generation_pool=generation_pool
+    )
+
+
+class QABatchRequest(BaseModel):
+    questions: List[str]
+    vectorstore_name: str
+    retrieval_mode: Literal["dense", "hybrid"] = "dense"
+    nprobe: Optional[int] = Field(None, ge=1)
+    ef_search: Optional[int] = Field(None, ge=1)
+    # LLM generations in flight for this batch (capped at QA_BATCH_CONCURRENCY)
+    concurrency: Optional[int] = Field(None, ge=1)
+
+
+async def stream_batch_answers(req: QABatchRequest):
+    """
+    Yield one NDJSON {"type": "answer"} frame per question as soon as it is answered (in
+    completion order, with its "index" in the request), then a {"type": "final"} frame
+    with counts and timing. Embedding and retrieval for the whole batch hold one retrieval
+    pool slot; every LLM generation holds a generation pool slot.
+    """
+    start_time = time.perf_counter()
+    concurrency = min(req.concurrency or QA_BATCH_CONCURRENCY, QA_BATCH_CONCURRENCY)
+    answered = cached = failed = 0
+    try:
+        async for result in agenerate_answers_batch(
+            req.questions, req.vectorstore_name, req.retrieval_mode, req.nprobe, req.ef_search, concurrency,
+            # Admission to the retrieval pool was already checked by qa_guide_batch
+            admit_retrieval=partial(retrieval_pool.admit, check=False), admit_generation=generation_pool.admit
+        ):
+            answered += 1
+            cached += result["cached"]
+            failed += result["source"] is None
+            yield json.dumps({"type": "answer", **result}) + "\n"
+
+        yield json.dumps({
+            "type": "final",
+            "status": "✅ Success",
+            "questions": len(req.questions),
+            "answered": answered,
+            "cached": cached,
+            "failed": failed,
+            "timing": {"total_ms": round((time.perf_counter() - start_time) * 1000, 1)}
+        }) + "\n"
+
+    except Exception as e:
+        print(f"❌ [QA-Batch] Error: {e}")
+        yield json.dumps({"type": "error", "message": f"❌ Batch answering failed: {str(e)}"}) + "\n"
+
+
+@app.post("/QA-Guide/batch")
+async def qa_guide_batch(req: QABatchRequest):
+    """
+    Answer a bank of questions over one store in a single call, streaming NDJSON answer
+    frames as they complete. Questions are embedded and searched as one batch; LLM calls
+    run with bounded concurrency.
+    """
+    vectorstore_path = os.path.join(VECTORSORE_PATH, req.vectorstore_name)
+
+    if not os.path.exists(vectorstore_path):
+        raise HTTPException(status_code=404, detail=f"❌ Vectorstore '{req.vectorstore_name}' not found.")
+    if not req.questions:
+        raise HTTPException(status_code=400, detail="❌ No questions provided.")
+    if len(req.questions) > QA_BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400, detail=f"❌ At most {QA_BATCH_MAX_QUESTIONS} questions per batch ({len(req.questions)} given)."
+        )
+
+    print(f"📨 [QA-Batch] Received {len(req.questions)} questions for: {vectorstore_path}")
+    # Reject with 429 before the 200 response starts if the pool's queue is already full
+    retrieval_pool.check_admission()
+    return StreamingResponse(stream_batch_answers(req), media_type="application/x-ndjson")
     
 
 
 class TopicGenerationRequest(BaseModel):
     vectorstore_name: str
+    force_refresh: bool = False
 
 @app.post("/generate-important-topics/")
 async def generate_important_topics(req: TopicGenerationRequest):
@@ -246,19 +718,31 @@ async def generate_important_topics(req: TopicGenerationRequest):
         raise HTTPException(status_code=404, detail=f"❌ Vectorstore '{req.vectorstore_name}' not found.")
 
     try:
-        # Run topic generation in background executor
-        result = await asyncio.get_event_loop().run_in_executor(
-            executor,
-            topics_from_vectorstore,
-            vectorstore_path
-        )
-
+        version = vectorstore_version(req.vectorstore_name)
+        result = get_cached_artifact("topics", None, req.vectorstore_name, force_refresh=req.force_refresh, version=version)
+        cached = result is not None
+        if not cached:
+            # The saved LDA model is loaded (or retrained if the store changed) off the event loop
+            result = await run_coalesced(
+                "topics", coalescing_payload(None, req.vectorstore_name),
+                generation_pool, topics_from_vectorstore, vectorstore_path,
+                artifact={"function": "topics", "subject": None, "vectorstore_name": req.vectorstore_name, "params": None,
+                          "version": version}
+            )
+
+        # Count picked by the coherence sweep when the topic model was trained
+        topic_model = topic_models.describe(vectorstore_path) or {}
         return {
             "status": "✅ Success",
             "vectorstore": req.vectorstore_name,
-            "topics_description": result
+            "topics_description": result,
+            "num_topics": topic_model.get("num_topics"),
+            "coherence": topic_model.get("coherence"),
+            "cached": cached
         }
 
+    except PoolSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"❌ Failed to generate topics: {str(e)}")
 
@@ -287,8 +771,9 @@ async def generate_quiz(req: QuizRequest):
 
     try:
         print(f"📩 Request received to generate quiz on: '{req.subject}'")
-        quiz = await asyncio.get_event_loop().run_in_executor(
-            executor,
+        quiz = await run_coalesced(
+            "quiz", coalescing_payload(req.subject, req.vectorstore_name, num_questions=req.num_questions),
+            generation_pool,
             quiz_creation,
             req.subject,
             req.vectorstore_name,
@@ -302,6 +787,8 @@ async def generate_quiz(req: QuizRequest):
             "quiz": quiz
         }
 
+    except PoolSaturated:
+        raise
     except Exception as e:
         print(f"❌ Exception in /generate-quiz: {e}")
         raise HTTPException(
@@ -314,19 +801,33 @@ class FAQRequest(BaseModel):
     subject: str
     vector_store_name: str
     num_questions: Optional[int] = 5
+    force_refresh: bool = False
+    retrieval_mode: Literal["dense", "hybrid"] = "dense"
 
 @app.post("/generate-FAQ")
 async def generate_faq(request: FAQRequest):
     """
     Endpoint to generate FAQs using a vector store and LLM.
     """
+    vectorstore_path = os.path.join(VECTORSORE_PATH, request.vector_store_name)
+
+    if not os.path.exists(vectorstore_path):
+        raise HTTPException(status_code=404, detail=f"❌ Vectorstore '{request.vector_store_name}' not found.")
 
     try:
-        # Call the refactored FAQ generator function
-        result = FAQ_creation(
-            subject=request.subject,
-            vector_store_name=request.vector_store_name,
-            num_questions=request.num_questions
+        params = artifact_params(request.retrieval_mode, num_questions=request.num_questions)
+        version = vectorstore_version(request.vector_store_name)
+        result = get_cached_artifact("faq", request.subject, request.vector_store_name, params, request.force_refresh, version)
+        if result is not None:
+            return {"status": "success", "faq": result, "cached": True}
+
+        # Async FAQ generation keeps the event loop free while Ollama is generating
+        result = await run_coalesced(
+            "faq", coalescing_payload(request.subject, request.vector_store_name, **params),
+            generation_pool, aFAQ_creation, request.subject, request.vector_store_name, request.num_questions,
+            request.retrieval_mode,
+            artifact={"function": "faq", "subject": request.subject, "vectorstore_name": request.vector_store_name, "params": params,
+                      "version": version}
         )
 
         # Return error message if something failed inside FAQ_creation
@@ -334,13 +835,32 @@ async def generate_faq(request: FAQRequest):
             raise HTTPException(status_code=500, detail=result)
 
         print("✅ Successfully generated FAQs.")
-        return {"status": "success", "faq": result}
+        return {"status": "success", "faq": result, "cached": False}
 
+    except PoolSaturated:
+        raise
     except Exception as e:
         print(f"❌ Exception in generate-FAQ endpoint: {e}")
         raise HTTPException(status_code=500, detail=f"FAQ generation failed: {str(e)}")
 
 
+@app.post("/generate-FAQ/stream")
+async def generate_faq_stream(request: FAQRequest):
+    """
+    Streaming variant of /generate-FAQ returning NDJSON token frames.
+    """
+    vectorstore_path = os.path.join(VECTORSORE_PATH, request.vector_store_name)
+
+    if not os.path.exists(vectorstore_path):
+        raise HTTPException(status_code=404, detail=f"❌ Vectorstore '{request.vector_store_name}' not found.")
+
+    artifact = {"function": "faq", "subject": request.subject, "vectorstore_name": request.vector_store_name,
+                "params": artifact_params(request.retrieval_mode, num_questions=request.num_questions),
+                "force_refresh": request.force_refresh}
+    return ndjson_response(generation_pool, aprepare_FAQ_chain, request.subject, request.vector_store_name, request.num_questions,
+                           request.retrieval_mode, artifact=artifact)
+
+
 
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
@@ -361,6 +881,20 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     )
 
 
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    print(f"🚦 Rejected {request.method} {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(exc.retry_after)},
+        content={
+            "status": "❌ Too Many Requests",
+            "message": str(exc),
+            "retry_after": exc.retry_after,
+        },
+    )
+
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     return JSONResponse(
@@ -1,24 +1,16 @@
-from langchain import PromptTemplate
-from langchain.chains import RetrievalQA
-from langchain.vectorstores import FAISS
-import torch
+import asyncio
 import os
+from contextlib import nullcontext
 
-from configuration import llm,embeddings,VECTORSORE_PATH
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableGenerator
 
-
-
-
-print("=" * 100)
-try:
-    cuda_available = torch.cuda.is_available()
-    print(f"✅ CUDA Available: {cuda_available}")
-    DEVICE = "cuda" if cuda_available else "cpu"
-    print(f"🧠 Using torch version: {torch.__version__} | Device: {DEVICE}")
-except Exception as e:
-    print(f"❌ Error checking Torch CUDA availability: {e}")
-    DEVICE = "cpu"
-print("=" * 100)
+from configuration import VECTORSORE_PATH, QA_BATCH_CONCURRENCY
+from models import get_embeddings, aget_embeddings
+from vectorstore_registry import load_vectorstore, aload_vectorstore, vectorstore_version
+from hybrid_retrieval import embed_queries, retrieve_batch
+from chain_registry import chain_registry
+from semantic_cache import semantic_cache
 
 
 
@@ -32,52 +24,63 @@ Only return the helpful answer below and nothing else.
 Helpful answer:
 """
 
+chain_registry.register("qa", prompt_template, ["context", "question"], k=3)
+
 
-def generate_answer(question: str, vector_store_name: str):
+def generate_answer(question: str, vector_store_name: str, retrieval_mode: str = "dense",
+                    nprobe: int = None, ef_search: int = None):
     """
     Generates an answer using RAG by retrieving context from a vector store.
 
     Args:
         question (str): The user's question.
         vector_store_name (str): Name of the FAISS vector store.
+        retrieval_mode (str): "dense" (FAISS only) or "hybrid" (BM25 + FAISS fused by rank).
+        nprobe (int, optional): IVF lists to probe for this query (IVF stores only).
+        ef_search (int, optional): HNSW search depth for this query (HNSW stores only).
 
     Returns:
         Tuple[str, str]: The answer and the source document's filename.
     """
+    # Answers are cached for the store version read before retrieval
+    version = vectorstore_version(vector_store_name)
     try:
         vector_store_path = os.path.join(VECTORSORE_PATH, vector_store_name)
         print(f"📂 Loading vector store from: {vector_store_path}")
-        vector_store = FAISS.load_local(vector_store_path, embeddings, allow_dangerous_deserialization=True)
+        vector_store = load_vectorstore(vector_store_name)
         print("✅ Vector store loaded.")
     except Exception as e:
         print(f"❌ Failed to load vector store: {e}")
         return f"Error: Could not load vector store. {str(e)}", None
 
     try:
-        print("🔍 Creating retriever and QA chain...")
-        retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": 3})
-        prompt = PromptTemplate(template=prompt_template, input_variables=["context", "question"])
-
-        qa = RetrievalQA.from_chain_type(
-            llm=llm,
-            chain_type="stuff",
-            retriever=retriever,
-            return_source_documents=True,
-            chain_type_kwargs={"prompt": prompt},
-            verbose=True
-            
+        # Near-identical questions on the same store are answered from the semantic cache
+        question_vector = get_embeddings().embed_query(question)
+        cached = semantic_cache.lookup(vector_store_name, question_vector, retrieval_mode, version)
+        if cached is not None:
+            print(f"⚡ Semantic cache hit ({cached['similarity']:.3f}) for: '{cached['question']}'")
+            return cached["answer"], cached["source"]
+    except Exception as e:
+        print(f"⚠️ Semantic cache lookup failed: {e}")
+        question_vector = None
 
-        )
+    try:
+        # The "stuff" QA chain and the store's retriever are prebuilt (see chain_registry.py)
+        retriever = chain_registry.retriever("qa", vector_store, vector_store_name, retrieval_mode, nprobe, ef_search)
+        answer_chain = chain_registry.chain("qa")
 
         print(f"💬 Asking question: '{question}'")
-        response = qa.invoke({"query": question})
+        source_documents = retriever.invoke(question)
+        context = "\n\n".join(doc.page_content for doc in source_documents)
+        answer = answer_chain.invoke({"context": context, "question": question})
         print("✅ Answer generated.")
 
-        answer = response['result']
-        source = response['source_documents'][0].metadata.get('source', 'Unknown')
+        source = source_documents[0].metadata.get('source', 'Unknown') if source_documents else 'Unknown'
 
         print(f"📝 Answer: {answer}")
         print(f"📄 Source: {source}")
+        if question_vector is not None:
+            semantic_cache.store(vector_store_name, question, question_vector, answer, source, retrieval_mode, version)
         return answer, source
 
     except Exception as e:
@@ -85,6 +88,199 @@ def generate_answer(question: str, vector_store_name: str):
         return f"Error: Failed to answer question. {str(e)}", None
 
 
+async def aprepare_answer_chain(question: str, vector_store_name: str, retrieval_mode: str = "dense",
+                                nprobe: int = None, ef_search: int = None):
+    """
+    Retrieve context for a question and return the prebuilt "stuff" QA chain with its
+    inputs, so the answer can be streamed token by token.
+
+    Near-identical questions on the same store version are answered from the semantic
+    cache: the chain is then None, the inputs hold the cached "answer" and the documents
+    a single one carrying its source. Otherwise the returned chain stores its answer in
+    the cache once it has been generated in full (streamed or not).
+
+    Args:
+        question (str): The user's question.
+        vector_store_name (str): Name of the FAISS vector store.
+        retrieval_mode (str): "dense" (FAISS only) or "hybrid" (BM25 + FAISS fused by rank).
+        nprobe (int, optional): IVF lists to probe for this query (IVF stores only).
+        ef_search (int, optional): HNSW search depth for this query (HNSW stores only).
+
+    Returns:
+        Tuple[Runnable, dict, List[Document]]: The chain, its inputs and the retrieved documents.
+    """
+    # Answers are cached for the store version read before retrieval
+    version = vectorstore_version(vector_store_name)
+    try:
+        question_vector = await (await aget_embeddings()).aembed_query(question)
+        cached = semantic_cache.lookup(vector_store_name, question_vector, retrieval_mode, version)
+        if cached is not None:
+            print(f"⚡ Semantic cache hit ({cached['similarity']:.3f}) for: '{cached['question']}'")
+            return None, {"answer": cached["answer"]}, [Document(page_content="", metadata={"source": cached["source"]})]
+    except Exception as e:
+        print(f"⚠️ Semantic cache lookup failed: {e}")
+        question_vector = None
+
+    vector_store = await aload_vectorstore(vector_store_name)
+    retriever = await chain_registry.aretriever("qa", vector_store, vector_store_name, retrieval_mode, nprobe, ef_search)
+    source_documents = await retriever.ainvoke(question)
+    context = "\n\n".join(doc.page_content for doc in source_documents)
+
+    answer_chain = chain_registry.chain("qa")
+    if question_vector is not None:
+        source = source_documents[0].metadata.get('source', 'Unknown') if source_documents else 'Unknown'
+
+        async def remember_answer(tokens):
+            # Pass tokens through as they arrive; a failed generation raises before the store
+            answer = []
+            async for token in tokens:
+                answer.append(token)
+                yield token
+            try:
+                semantic_cache.store(vector_store_name, question, question_vector, "".join(answer), source,
+                                     retrieval_mode, version)
+            except Exception as e:
+                print(f"⚠️ Semantic cache store failed: {e}")
+
+        answer_chain = answer_chain | RunnableGenerator(remember_answer)
+    return answer_chain, {"context": context, "question": question}, source_documents
+
+
+async def agenerate_answer(question: str, vector_store_name: str, retrieval_mode: str = "dense",
+                           nprobe: int = None, ef_search: int = None,
+                           admit_retrieval=None, admit_generation=None):
+    """
+    Async variant of generate_answer built on the LCEL chain: retrieval and generation
+    run on the event loop (`ainvoke`), so many questions can be in flight at once.
+    Answers go through the semantic cache (see aprepare_answer_chain).
+
+    `admit_retrieval` and `admit_generation` work as in agenerate_answers_batch: the
+    cache lookup and retrieval hold one context, the LLM generation the other.
+    Rejections by either (PoolSaturated) are raised, not turned into an error answer.
+
+    Returns:
+        Tuple[str, str]: The answer and the source document's filename.
+    """
+    async with (admit_retrieval or nullcontext)():
+        try:
+            print(f"💬 Asking question: '{question}'")
+            answer_chain, inputs, source_documents = await aprepare_answer_chain(
+                question, vector_store_name, retrieval_mode, nprobe, ef_search
+            )
+        except Exception as e:
+            print(f"❌ Failed to generate answer: {e}")
+            return f"Error: Failed to answer question. {str(e)}", None
+
+    source = source_documents[0].metadata.get('source', 'Unknown') if source_documents else 'Unknown'
+    if answer_chain is None:
+        return inputs["answer"], source
+
+    async with (admit_generation or nullcontext)():
+        try:
+            answer = await answer_chain.ainvoke(inputs)
+            print("✅ Answer generated.")
+        except Exception as e:
+            print(f"❌ Failed to generate answer: {e}")
+            return f"Error: Failed to answer question. {str(e)}", None
+    return answer, source
+
+
+
+async def agenerate_answers_batch(questions: list, vector_store_name: str, retrieval_mode: str = "dense",
+                                  nprobe: int = None, ef_search: int = None,
+                                  concurrency: int = QA_BATCH_CONCURRENCY,
+                                  admit_retrieval=None, admit_generation=None):
+    """
+    Answer many questions over one store, yielding each answer as soon as it is ready.
+
+    The store is loaded once, all questions are embedded in one batched call and
+    retrieved with a single FAISS search over the query matrix. Questions found in the
+    semantic cache are answered right away; the rest go to the LLM with at most
+    `concurrency` generations in flight.
+
+    `admit_retrieval` and `admit_generation` (e.g. `WorkloadPool.admit`) return the async
+    context held around the embed-and-retrieve step and around each LLM generation, so
+    a batch takes its slots from the same pools as single requests.
+
+    Args:
+        questions (list): The questions, answered independently.
+        vector_store_name (str): Name of the FAISS vector store.
+        retrieval_mode (str): "dense" (FAISS only) or "hybrid" (BM25 + FAISS fused by rank).
+        nprobe (int, optional): IVF lists to probe (IVF stores only).
+        ef_search (int, optional): HNSW search depth (HNSW stores only).
+        concurrency (int): Maximum LLM generations running at once.
+        admit_retrieval (callable, optional): Async context factory for the retrieval step.
+        admit_generation (callable, optional): Async context factory for every generation.
+
+    Yields:
+        dict: {"index", "question", "answer", "source", "cached"} in completion order. A
+        failed question yields an "Error: ..." answer with source None, like generate_answer.
+    """
+    version = vectorstore_version(vector_store_name)
+    cached_answers = []
+    pending = []
+    async with (admit_retrieval or nullcontext)():
+        vector_store = await aload_vectorstore(vector_store_name)
+        embeddings = await aget_embeddings()
+        query_vectors = await asyncio.to_thread(embed_queries, embeddings, questions)
+        print(f"🧮 [QA-Batch] Embedded {len(questions)} questions in one batch")
+
+        for index, (question, question_vector) in enumerate(zip(questions, query_vectors)):
+            try:
+                cached = semantic_cache.lookup(vector_store_name, question_vector, retrieval_mode, version)
+            except Exception as e:
+                print(f"⚠️ Semantic cache lookup failed: {e}")
+                cached = None
+            if cached is not None:
+                cached_answers.append({"index": index, "question": question, "answer": cached["answer"],
+                                       "source": cached["source"], "cached": True})
+            else:
+                pending.append(index)
+
+        if pending:
+            retrieved = await asyncio.to_thread(
+                retrieve_batch, vector_store, vector_store_name, [questions[index] for index in pending],
+                query_vectors[pending], 3, retrieval_mode, nprobe, ef_search
+            )
+            print(f"🔍 [QA-Batch] Retrieved context for {len(pending)} questions with one index search")
+
+    for result in cached_answers:
+        yield result
+    if not pending:
+        return
+
+    answer_chain = chain_registry.chain("qa")
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def answer(index: int, source_documents: list) -> dict:
+        question = questions[index]
+        async with slots:
+            try:
+                context = "\n\n".join(doc.page_content for doc in source_documents)
+                async with (admit_generation or nullcontext)():
+                    answer_text = await answer_chain.ainvoke({"context": context, "question": question})
+            except Exception as e:
+                print(f"❌ Failed to generate answer: {e}")
+                return {"index": index, "question": question, "answer": f"Error: Failed to answer question. {str(e)}",
+                        "source": None, "cached": False}
+        source = source_documents[0].metadata.get('source', 'Unknown') if source_documents else 'Unknown'
+        try:
+            semantic_cache.store(vector_store_name, question, query_vectors[index], answer_text, source, retrieval_mode, version)
+        except Exception as e:
+            # The answer is still returned; only caching it failed
+            print(f"⚠️ Semantic cache store failed: {e}")
+        return {"index": index, "question": question, "answer": answer_text, "source": source, "cached": False}
+
+    tasks = [asyncio.create_task(answer(index, docs)) for index, docs in zip(pending, retrieved)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        # The client went away: stop the generations that have not finished
+        for task in tasks:
+            task.cancel()
+
+
 
 
 
@@ -0,0 +1,217 @@
+import math
+import time
+
+import faiss
+import numpy as np
+from langchain.vectorstores import FAISS
+
+from configuration import FAISS_INDEX_TYPE, ANN_MIN_VECTORS
+from configuration import IVF_NLIST, IVF_TRAIN_SAMPLE_SIZE, IVF_NPROBE, IVF_PQ_M, IVF_PQ_NBITS
+from configuration import HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH
+
+
+# "flat" is exact search (the original index); the others trade a little recall for
+# sub-linear search on large stores.
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+
+def ivf_nlist(num_vectors: int) -> int:
+    """
+    Number of IVF lists: IVF_NLIST, or about 4 * sqrt(n) while keeping at least 39
+    training points per list (FAISS's minimum for a stable k-means).
+    """
+    if IVF_NLIST:
+        return IVF_NLIST
+    return max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+
+
+def index_spec(index_type: str, num_vectors: int) -> str:
+    """
+    `faiss.index_factory` description for an index type and store size.
+    """
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf_flat":
+        return f"IVF{ivf_nlist(num_vectors)},Flat"
+    if index_type == "ivf_pq":
+        return f"IVF{ivf_nlist(num_vectors)},PQ{IVF_PQ_M}x{IVF_PQ_NBITS}"
+    if index_type == "hnsw":
+        return f"HNSW{HNSW_M},Flat"
+    raise ValueError(f"Unknown index type '{index_type}'. Expected one of: {', '.join(INDEX_TYPES)}")
+
+
+def build_index(vectors: np.ndarray, index_type: str = FAISS_INDEX_TYPE, min_vectors: int = ANN_MIN_VECTORS):
+    """
+    Create and, for IVF types, train an empty FAISS index for `vectors` (not added yet).
+
+    Stores smaller than `min_vectors` always get an exact flat index: an approximate
+    index would not be faster there and IVF needs enough points to train.
+
+    Args:
+        vectors (np.ndarray): float32 matrix of shape (n, dim).
+        index_type (str): One of INDEX_TYPES.
+        min_vectors (int): Smallest store that gets an approximate index.
+    """
+    num_vectors, dim = vectors.shape
+    if index_type != "flat" and num_vectors < min_vectors:
+        print(f"ℹ️ [ANN] {num_vectors} vectors < {min_vectors}; using a flat index instead of {index_type}")
+        index_type = "flat"
+
+    spec = index_spec(index_type, num_vectors)
+    index = faiss.index_factory(dim, spec, faiss.METRIC_L2)
+    if index_type == "hnsw":
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+
+    if not index.is_trained:
+        start_time = time.perf_counter()
+        sample_size = min(num_vectors, IVF_TRAIN_SAMPLE_SIZE)
+        sample = vectors[np.random.default_rng(0).choice(num_vectors, size=sample_size, replace=False)]
+        index.train(sample)
+        print(f"🏋️ [ANN] Trained {spec} on {sample_size} vectors in {time.perf_counter() - start_time:.2f}s")
+
+    configure_search_defaults(index)
+    return index
+
+
+def configure_search_defaults(index):
+    """
+    Set the default nprobe / efSearch on a freshly built or loaded index. FAISS defaults
+    (nprobe=1, efSearch=16) give poor recall.
+    """
+    ivf = _ivf(index)
+    if ivf is not None:
+        ivf.nprobe = IVF_NPROBE
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+
+
+def _ivf(index):
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
+
+
+def search_parameters(index, nprobe: int = None, ef_search: int = None):
+    """
+    Per-query search parameters for `index.search(..., params=...)`, or None to use the
+    index defaults. They apply to one call only, so concurrent requests on a shared index
+    can use different settings safely.
+    """
+    if nprobe and _ivf(index) is not None:
+        return faiss.SearchParametersIVF(nprobe=nprobe)
+    if ef_search and isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=ef_search)
+    return None
+
+
+def describe_index(index) -> dict:
+    ivf = _ivf(index)
+    if ivf is not None:
+        # extract_index_ivf returns the IndexIVF base proxy; downcast to tell PQ from Flat
+        index_type = "ivf_pq" if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else "ivf_flat"
+        return {"type": index_type, "ntotal": index.ntotal, "nlist": ivf.nlist, "nprobe": ivf.nprobe}
+    if isinstance(index, faiss.IndexHNSW):
+        return {"type": "hnsw", "ntotal": index.ntotal, "ef_search": index.hnsw.efSearch}
+    return {"type": "flat", "ntotal": index.ntotal}
+
+
+def resident_index_bytes(index, mapped: bool = False) -> int:
+    """
+    Rough number of bytes an index keeps in process memory. A memory-mapped index's codes
+    live in the shared page cache; only its coarse quantizer (IVF) or graph (HNSW) is counted.
+    """
+    if not mapped:
+        return int(index.ntotal) * int(index.d) * 4
+    ivf = _ivf(index)
+    if ivf is not None:
+        return int(ivf.nlist) * int(index.d) * 4
+    if isinstance(index, faiss.IndexHNSW):
+        return int(index.hnsw.neighbors.size()) * 4
+    return 0
+
+
+class StreamingIndexBuilder:
+    """
+    Builds an index of `index_type` from vectors that arrive in batches during streaming
+    ingestion.
+
+    Flat indexes are filled as batches arrive. Approximate types first buffer a prefix of
+    the stream, `min_vectors` vectors (and for IVF, the training sample), so that
+    build_index can decide whether the store is big enough and train on that prefix;
+    later batches go straight into the index. The buffer is bounded by configuration,
+    not by store size. IVF list counts are sized from the prefix, since the total is not
+    known up front.
+    """
+
+    def __init__(self, index_type: str = FAISS_INDEX_TYPE, min_vectors: int = ANN_MIN_VECTORS):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{index_type}'. Expected one of: {', '.join(INDEX_TYPES)}")
+        self.index_type = index_type
+        self.min_vectors = min_vectors
+        self.buffer_size = 0
+        if index_type != "flat":
+            self.buffer_size = max(min_vectors, IVF_TRAIN_SAMPLE_SIZE if index_type.startswith("ivf") else 0)
+        self.index = None
+        self._pending = []
+        self._pending_count = 0
+
+    def add(self, vectors: np.ndarray):
+        if self.index is not None:
+            self.index.add(vectors)
+            return
+        self._pending.append(vectors)
+        self._pending_count += len(vectors)
+        if self._pending_count >= self.buffer_size:
+            self._flush()
+
+    def _flush(self):
+        matrix = np.concatenate(self._pending)
+        self._pending, self._pending_count = [], 0
+        self.index = build_index(matrix, self.index_type, self.min_vectors)
+        self.index.add(matrix)
+
+    def finish(self):
+        """
+        The filled index; None if no vectors were added.
+        """
+        if self.index is None and self._pending:
+            self._flush()
+        return self.index
+
+
+def remove_documents(vectorstore: FAISS, doc_ids: list):
+    """
+    Delete chunks from a store by docstore id.
+
+    Only flat indexes renumber the remaining vectors on `remove_ids`. IVF indexes keep
+    the old labels, so later adds would reuse labels that are still taken, and HNSW
+    cannot remove vectors at all. For those the kept vectors are reconstructed and put
+    back with labels 0..n-1: IVF indexes are emptied and refilled with their trained
+    quantizer (and PQ codebooks), HNSW is rebuilt.
+    """
+    index = vectorstore.index
+    if isinstance(index, faiss.IndexFlat):
+        vectorstore.delete(doc_ids)
+        return
+
+    stale = set(doc_ids)
+    keep = [position for position, doc_id in sorted(vectorstore.index_to_docstore_id.items()) if doc_id not in stale]
+    ivf = _ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+        vectors = index.reconstruct_n(0, index.ntotal)[keep]
+        ivf.make_direct_map(False)
+        index.reset()
+        index.add(vectors)
+    else:
+        vectors = index.reconstruct_n(0, index.ntotal)[keep]
+        # Same type as before, like the refilled IVF indexes, however small the store got
+        index = build_index(vectors, "hnsw", min_vectors=0)
+        index.add(vectors)
+    vectorstore.index = index
+    vectorstore.index_to_docstore_id = {
+        new_position: vectorstore.index_to_docstore_id[old_position] for new_position, old_position in enumerate(keep)
+    }
+    vectorstore.docstore.delete(list(stale))
+    print(f"🔁 [ANN] Re-added {len(keep)} vectors to the {describe_index(index)['type']} index without {len(stale)} removed chunks")
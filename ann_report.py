@@ -0,0 +1,132 @@
+import argparse
+import random
+import time
+
+import faiss
+import numpy as np
+
+from ann_index import INDEX_TYPES, build_index, describe_index, index_spec
+from configuration import IVF_NPROBE, HNSW_EF_SEARCH
+from embedding_cache import embedding_cache
+from hybrid_retrieval import embed_queries
+from models import get_embeddings
+from vectorstore_registry import load_vectorstore, iter_texts
+
+
+def store_vectors(vector_store):
+    """
+    Exact embeddings of every chunk of a store, in docstore order, from the embedding
+    cache (so PQ stores, whose index only keeps compressed codes, work too).
+    """
+    texts = [text for _, text in iter_texts(vector_store)]
+    return np.asarray(embedding_cache.embed_texts(texts), dtype=np.float32), texts
+
+
+def sample_queries(texts: list, num_queries: int, seed: int = 0):
+    """
+    Realistic partial-text queries: the first 200 characters of random chunks, embedded
+    as queries (with the BGE query instruction, like production questions).
+    """
+    rng = random.Random(seed)
+    picked = rng.sample(texts, min(num_queries, len(texts)))
+    return embed_queries(get_embeddings(), [text[:200] for text in picked])
+
+
+def measure(index, queries: np.ndarray, k: int, exact_ids: np.ndarray, params=None) -> dict:
+    latencies = []
+    hits = 0
+    for query_index in range(len(queries)):
+        query = queries[query_index:query_index + 1]
+        start_time = time.perf_counter()
+        if params is None:
+            _, ids = index.search(query, k)
+        else:
+            _, ids = index.search(query, k, params=params)
+        latencies.append(time.perf_counter() - start_time)
+        hits += len(set(ids[0].tolist()) & set(exact_ids[query_index].tolist()))
+
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "recall": round(hits / (len(queries) * k), 4),
+        "mean_ms": round(float(latencies_ms.mean()), 3),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 3),
+    }
+
+
+def run_report(vector_store_name: str, index_types: list, num_queries: int, k: int,
+               nprobes: list, ef_searches: list) -> list:
+    """
+    Build every index type over the store's vectors and compare recall@k and per-query
+    latency against the exact flat index, sweeping nprobe (IVF) and efSearch (HNSW).
+
+    Returns:
+        List[dict]: One row per (index type, search setting).
+    """
+    vector_store = load_vectorstore(vector_store_name)
+    print(f"📂 Store '{vector_store_name}': {describe_index(vector_store.index)}")
+    vectors, texts = store_vectors(vector_store)
+    queries = sample_queries(texts, num_queries)
+    k = min(k, len(vectors))
+
+    exact = build_index(vectors, "flat")
+    exact.add(vectors)
+    _, exact_ids = exact.search(queries, k)
+    rows = [{"index": "flat", "spec": "Flat", "setting": "-", "build_s": 0.0,
+             "size_mb": round(faiss.serialize_index(exact).nbytes / 1e6, 2), **measure(exact, queries, k, exact_ids)}]
+
+    for index_type in index_types:
+        if index_type == "flat":
+            continue
+        try:
+            start_time = time.perf_counter()
+            index = build_index(vectors, index_type, min_vectors=0)
+            index.add(vectors)
+            build_seconds = round(time.perf_counter() - start_time, 2)
+        except RuntimeError as e:
+            print(f"⚠️ Skipping {index_type}: {e}")
+            continue
+
+        common = {"index": index_type, "spec": index_spec(index_type, len(vectors)), "build_s": build_seconds,
+                  "size_mb": round(faiss.serialize_index(index).nbytes / 1e6, 2)}
+        if index_type == "hnsw":
+            for ef_search in ef_searches:
+                params = faiss.SearchParametersHNSW(efSearch=ef_search)
+                rows.append({**common, "setting": f"efSearch={ef_search}", **measure(index, queries, k, exact_ids, params)})
+        else:
+            for nprobe in nprobes:
+                params = faiss.SearchParametersIVF(nprobe=nprobe)
+                rows.append({**common, "setting": f"nprobe={nprobe}", **measure(index, queries, k, exact_ids, params)})
+    return rows
+
+
+def format_report(rows: list, k: int) -> str:
+    lines = [
+        f"| Index | Spec | Setting | Recall@{k} | Mean ms | p95 ms | Build s | Size MB |",
+        "|---|---|---|---|---|---|---|---|",
+    ]
+    for row in rows:
+        lines.append(
+            f"| {row['index']} | {row['spec']} | {row['setting']} | {row['recall']:.4f} | {row['mean_ms']} | "
+            f"{row['p95_ms']} | {row['build_s']} | {row['size_mb']} |"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall-vs-latency report of FAISS index types against the exact index.")
+    parser.add_argument("vectorstore_name", help="Store to benchmark (name under VECTORSORE_PATH).")
+    parser.add_argument("--types", nargs="+", default=[t for t in INDEX_TYPES if t != "flat"], choices=INDEX_TYPES)
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled queries.")
+    parser.add_argument("-k", type=int, default=10, help="Neighbours per query (recall@k).")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=sorted({1, 4, IVF_NPROBE, 64}))
+    parser.add_argument("--ef-search", type=int, nargs="+", default=sorted({16, 32, HNSW_EF_SEARCH, 128}))
+    parser.add_argument("--output", help="Also write the markdown table to this file.")
+
+    args = parser.parse_args()
+    report_rows = run_report(args.vectorstore_name, args.types, args.queries, args.k, args.nprobe, args.ef_search)
+    report = format_report(report_rows, args.k)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+        print(f"✅ Report written to {args.output}")
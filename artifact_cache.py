@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from configuration import ARTIFACT_CACHE_PATH
+from vectorstore_registry import vectorstore_key, vectorstore_version, on_vectorstore_invalidated
+
+
+def normalize_subject(subject) -> str:
+    """
+    Case-, whitespace- and trailing-punctuation-insensitive form of a subject,
+    so "Thrust and Pressure" and "thrust  and pressure?" share one artifact.
+    """
+    if subject is None:
+        return ""
+    return re.sub(r"\s+", " ", str(subject)).strip().rstrip("?.!").strip().lower()
+
+
+class ArtifactCache:
+    """
+    Persistent exact-match cache of generated study artifacts (summary, diagram, FAQ,
+    topics) keyed by (function, normalized subject, store, store version, params).
+
+    Rebuilding a store changes its version, so old artifacts are never served again.
+    They are deleted when ingestion invalidates the store. Callers pass the version they
+    read before generating, so an artifact built from a version that was replaced while
+    it was being generated is not stored under the new one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Caller holds self._lock. Opened on first use rather than at import (like the
+        # models in models.py), so a missing or unwritable cache path cannot stop the API
+        # from starting.
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    cache_key TEXT PRIMARY KEY,
+                    function TEXT NOT NULL,
+                    store TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS artifacts_store ON artifacts (store)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _key(self, function: str, subject, vector_store_name: str, params: dict, version: str) -> tuple:
+        store = vectorstore_key(vector_store_name)
+        payload = json.dumps(
+            [function, normalize_subject(subject), store, version, params or {}],
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest(), store
+
+    def get(self, function: str, subject, vector_store_name: str, params: dict = None, version: str = None):
+        """
+        Return the cached artifact text for store `version` (default: the current one), or None on a miss.
+        """
+        if version is None:
+            version = vectorstore_version(vector_store_name)
+        cache_key, _ = self._key(function, subject, vector_store_name, params, version)
+        with self._lock:
+            row = self._connection().execute("SELECT content FROM artifacts WHERE cache_key = ?", (cache_key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, function: str, subject, vector_store_name: str, params: dict, content: str,
+            version: str = None) -> bool:
+        """
+        Store an artifact generated from store `version`. Skipped (returns False) when the
+        store has been rewritten since: the entry could never be served again.
+        """
+        current_version = vectorstore_version(vector_store_name)
+        if version is not None and version != current_version:
+            return False
+        cache_key, store = self._key(function, subject, vector_store_name, params, current_version)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?)",
+                (cache_key, function, store, content, time.time())
+            )
+            conn.commit()
+        return True
+
+    def invalidate(self, store_key: str):
+        with self._lock:
+            conn = self._connection()
+            deleted = conn.execute("DELETE FROM artifacts WHERE store = ?", (store_key,)).rowcount
+            conn.commit()
+        if deleted:
+            print(f"🧹 [ArtifactCache] Dropped {deleted} cached artifacts for: {store_key}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._connection().execute("SELECT function, COUNT(*) FROM artifacts GROUP BY function").fetchall()
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": {function: count for function, count in rows},
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+artifact_cache = ArtifactCache(ARTIFACT_CACHE_PATH)
+on_vectorstore_invalidated(artifact_cache.invalidate)
@@ -0,0 +1,114 @@
+import argparse
+import time
+
+import numpy as np
+from langchain.chains import RetrievalQA
+from langchain.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+
+from chain_registry import chain_registry
+from hybrid_retrieval import build_retriever, RETRIEVAL_MODES
+from models import get_llm
+from vectorstore_registry import load_vectorstore
+
+# Importing the task modules registers their chains
+import QA_Rag  # noqa: F401
+import create_summary  # noqa: F401
+import create_diagram  # noqa: F401
+import create_faq  # noqa: F401
+import create_topics  # noqa: F401
+
+TASKS = ("qa", "summary", "diagram", "faq", "topics")
+
+
+def build_per_request(task: str, vector_store, vector_store_name: str, retrieval_mode: str):
+    """
+    What every request used to do before the chain registry: build the prompt, the
+    `prompt | llm | parser` chain and the retriever (and the RetrievalQA chain for Q&A).
+    """
+    spec = chain_registry.spec(task)
+    prompt = PromptTemplate(template=spec["template"], input_variables=spec["input_variables"])
+    chain = prompt | get_llm() | StrOutputParser()
+    if spec["k"] is None:
+        return chain
+    retriever = build_retriever(vector_store, vector_store_name, spec["k"], retrieval_mode)
+    if task == "qa":
+        return RetrievalQA.from_chain_type(
+            llm=get_llm(),
+            chain_type="stuff",
+            retriever=retriever,
+            return_source_documents=True,
+            chain_type_kwargs={"prompt": prompt},
+        )
+    return chain, retriever
+
+
+def lookup_prebuilt(task: str, vector_store, vector_store_name: str, retrieval_mode: str):
+    chain = chain_registry.chain(task)
+    if chain_registry.spec(task)["k"] is None:
+        return chain
+    return chain, chain_registry.retriever(task, vector_store, vector_store_name, retrieval_mode)
+
+
+def time_per_request(build, task: str, vector_store, vector_store_name: str, retrieval_mode: str,
+                     iterations: int) -> float:
+    """
+    Mean microseconds per request spent getting a ready-to-invoke chain (no LLM call).
+    """
+    build(task, vector_store, vector_store_name, retrieval_mode)  # warm models and indexes
+    latencies = []
+    for _ in range(iterations):
+        start_time = time.perf_counter()
+        build(task, vector_store, vector_store_name, retrieval_mode)
+        latencies.append(time.perf_counter() - start_time)
+    return float(np.mean(latencies)) * 1e6
+
+
+def run_benchmark(vector_store_name: str, tasks: list, retrieval_mode: str, iterations: int) -> list:
+    """
+    Compare per-request chain construction against registry lookups for every task.
+
+    Returns:
+        List[dict]: One row per task.
+    """
+    vector_store = load_vectorstore(vector_store_name)
+    rows = []
+    for task in tasks:
+        before_us = time_per_request(build_per_request, task, vector_store, vector_store_name, retrieval_mode, iterations)
+        after_us = time_per_request(lookup_prebuilt, task, vector_store, vector_store_name, retrieval_mode, iterations)
+        rows.append({
+            "task": task,
+            "before_us": round(before_us, 1),
+            "after_us": round(after_us, 1),
+            "speedup": round(before_us / after_us, 1) if after_us else float("inf"),
+        })
+    return rows
+
+
+def format_report(rows: list, retrieval_mode: str) -> str:
+    lines = [
+        f"| Task ({retrieval_mode}) | Per-request build µs | Prebuilt µs | Speedup |",
+        "|---|---|---|---|",
+    ]
+    for row in rows:
+        lines.append(f"| {row['task']} | {row['before_us']} | {row['after_us']} | {row['speedup']}x |")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-request chain overhead before and after the chain registry.")
+    parser.add_argument("vectorstore_name", help="Store to benchmark (name under VECTORSORE_PATH).")
+    parser.add_argument("--tasks", nargs="+", default=list(TASKS), choices=TASKS)
+    parser.add_argument("--retrieval-mode", default="dense", choices=RETRIEVAL_MODES)
+    parser.add_argument("--iterations", type=int, default=200, help="Timed requests per task and variant.")
+    parser.add_argument("--output", help="Also write the markdown table to this file.")
+
+    args = parser.parse_args()
+    report_rows = run_benchmark(args.vectorstore_name, args.tasks, args.retrieval_mode, args.iterations)
+    report = format_report(report_rows, args.retrieval_mode)
+    print(report)
+    print(f"Registry: {chain_registry.stats()}")
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+        print(f"✅ Report written to {args.output}")
@@ -0,0 +1,171 @@
+import threading
+from collections import OrderedDict
+
+from langchain.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+
+from configuration import CHAIN_VERBOSE, CHAIN_REGISTRY_MAX_RETRIEVERS
+from models import get_llm
+from vectorstore_registry import vectorstore_key, on_vectorstore_invalidated, on_vectorstore_evicted
+from hybrid_retrieval import build_retriever, abuild_retriever
+
+
+def configure_chain_logging(verbose: bool = CHAIN_VERBOSE):
+    """
+    Quiet production mode (verbose=False) turns off langchain's verbose and debug
+    logging, which prints every stuffed prompt in full; verbose=True restores it for
+    debugging.
+    """
+    from langchain.globals import set_debug, set_verbose
+
+    set_verbose(verbose)
+    set_debug(False)
+
+
+class ChainRegistry:
+    """
+    Prebuilt LCEL chains and retrievers, reused across requests instead of being rebuilt
+    on every call.
+
+    Modules register each task once with its prompt and retrieval depth. The
+    `prompt | llm | parser` pipeline of a task does not depend on the store, so it is
+    compiled on first use and shared. Retrievers are compiled per (store, task, retrieval
+    mode), bound to the currently loaded store instance, rebuilt when the registry
+    hands out a reloaded store, and dropped when the store is rewritten or evicted so
+    they never keep an evicted store in memory. At most `max_retrievers` are kept,
+    least recently used first out.
+
+    Per-request nprobe / efSearch overrides are client-chosen, so they are not part of the
+    cache key: such requests get a fresh (cheap) retriever instead of one cache entry per value.
+    """
+
+    def __init__(self, max_retrievers: int = CHAIN_REGISTRY_MAX_RETRIEVERS):
+        self.max_retrievers = max_retrievers
+        self._tasks = {}
+        self._chains = {}
+        self._retrievers = OrderedDict()
+        self._lock = threading.Lock()
+        self.chain_builds = 0
+        self.retriever_builds = 0
+        self.uncached_retrievers = 0
+        self.evictions = 0
+        self.hits = 0
+
+    def register(self, task: str, template: str, input_variables: list, k: int = None):
+        """
+        Declare a task: its prompt and, for retrieval tasks, how many chunks it retrieves.
+        """
+        with self._lock:
+            self._tasks[task] = {"template": template, "input_variables": input_variables, "k": k}
+            self._chains.pop(task, None)
+
+    def spec(self, task: str) -> dict:
+        """
+        The registered template, input variables and retrieval depth of a task.
+        """
+        with self._lock:
+            return dict(self._tasks[task])
+
+    def chain(self, task: str):
+        """
+        The compiled `prompt | llm | StrOutputParser()` chain of a task.
+        """
+        with self._lock:
+            chain = self._chains.get(task)
+            if chain is not None:
+                self.hits += 1
+                return chain
+            spec = self._tasks[task]
+            prompt = PromptTemplate(template=spec["template"], input_variables=spec["input_variables"])
+            chain = prompt | get_llm() | StrOutputParser()
+            self._chains[task] = chain
+            self.chain_builds += 1
+            return chain
+
+    def _retriever_key(self, task: str, vector_store_name: str, retrieval_mode: str):
+        return vectorstore_key(vector_store_name), task, retrieval_mode
+
+    def _cached_retriever(self, key, vector_store):
+        # Caller holds self._lock
+        entry = self._retrievers.get(key)
+        if entry is not None and entry[0] is vector_store:
+            self._retrievers.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        return None
+
+    def _cache_retriever(self, key, vector_store, retriever):
+        with self._lock:
+            self._retrievers[key] = (vector_store, retriever)
+            self._retrievers.move_to_end(key)
+            self.retriever_builds += 1
+            while len(self._retrievers) > self.max_retrievers:
+                self._retrievers.popitem(last=False)
+                self.evictions += 1
+
+    def retriever(self, task: str, vector_store, vector_store_name: str, retrieval_mode: str = "dense",
+                  nprobe: int = None, ef_search: int = None):
+        """
+        The task's retriever over `vector_store` (see build_retriever), compiled once per
+        store and retrieval mode. Requests with nprobe / ef_search get an uncached one.
+        """
+        key = self._retriever_key(task, vector_store_name, retrieval_mode)
+        with self._lock:
+            k = self._tasks[task]["k"]
+            cached = nprobe is None and ef_search is None
+            if cached:
+                retriever = self._cached_retriever(key, vector_store)
+                if retriever is not None:
+                    return retriever
+            else:
+                self.uncached_retrievers += 1
+        retriever = build_retriever(vector_store, vector_store_name, k, retrieval_mode, nprobe, ef_search)
+        if cached:
+            self._cache_retriever(key, vector_store, retriever)
+        return retriever
+
+    async def aretriever(self, task: str, vector_store, vector_store_name: str, retrieval_mode: str = "dense",
+                         nprobe: int = None, ef_search: int = None):
+        """
+        Async variant of retriever: a BM25 index that is not in memory yet is loaded (or
+        built) in a worker thread, as in abuild_retriever.
+        """
+        key = self._retriever_key(task, vector_store_name, retrieval_mode)
+        with self._lock:
+            k = self._tasks[task]["k"]
+            cached = nprobe is None and ef_search is None
+            if cached:
+                retriever = self._cached_retriever(key, vector_store)
+                if retriever is not None:
+                    return retriever
+            else:
+                self.uncached_retrievers += 1
+        retriever = await abuild_retriever(vector_store, vector_store_name, k, retrieval_mode, nprobe, ef_search)
+        if cached:
+            self._cache_retriever(key, vector_store, retriever)
+        return retriever
+
+    def invalidate(self, store_key: str):
+        with self._lock:
+            for key in [key for key in self._retrievers if key[0] == store_key]:
+                del self._retrievers[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tasks": sorted(self._tasks),
+                "chains": len(self._chains),
+                "retrievers": len(self._retrievers),
+                "max_retrievers": self.max_retrievers,
+                "evictions": self.evictions,
+                "uncached_retrievers": self.uncached_retrievers,
+                "hits": self.hits,
+                "chain_builds": self.chain_builds,
+                "retriever_builds": self.retriever_builds,
+            }
+
+
+chain_registry = ChainRegistry()
+on_vectorstore_invalidated(chain_registry.invalidate)
+on_vectorstore_evicted(chain_registry.invalidate)
+configure_chain_logging()
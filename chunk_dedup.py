@@ -0,0 +1,121 @@
+import hashlib
+import re
+
+import numpy as np
+
+from configuration import SIMHASH_SHINGLE_SIZE, SIMHASH_MAX_DISTANCE
+
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+# Chunks with fewer shingles than this only get exact dedup: a SimHash over a handful of
+# shingles flips too easily to say anything about near-duplicates
+MIN_SHINGLES = 8
+
+FINGERPRINT_BITS = 64
+
+
+def normalized_hash(text: str) -> str:
+    """
+    Hash of a chunk with case and whitespace normalized, for exact-duplicate detection.
+    """
+    return hashlib.sha256(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+
+
+def simhash(text: str, shingle_size: int = SIMHASH_SHINGLE_SIZE):
+    """
+    64-bit SimHash of a chunk's word shingles, or None if the chunk is too short.
+
+    Every shingle is hashed to 64 bits; each fingerprint bit is set when the majority
+    of shingles have it set, so chunks sharing most shingles differ in only a few bits.
+    """
+    words = _WORD_PATTERN.findall(text.lower())
+    num_shingles = len(words) - shingle_size + 1
+    if num_shingles < MIN_SHINGLES:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(" ".join(words[i:i + shingle_size]).encode("utf-8"), digest_size=8).digest(), "little")
+         for i in range(num_shingles)),
+        dtype="<u8", count=num_shingles,
+    )
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    majority = bits.sum(axis=0, dtype=np.int64) * 2 > num_shingles
+    return int.from_bytes(np.packbits(majority, bitorder="little").tobytes(), "little")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class ChunkDeduplicator:
+    """
+    Drops exact and near-duplicate chunks of one ingestion run before they are embedded.
+
+    Exact duplicates are found by a hash of the normalized text. Near-duplicates are
+    chunks whose SimHash differs from a kept chunk's in at most `max_distance` bits.
+    Candidates are found by banding: the 64 bits are split into `max_distance + 1`
+    bands, and by the pigeonhole principle any fingerprint within that distance matches
+    at least one band exactly.
+
+    Every kept chunk is registered with a caller-chosen handle (e.g. its docstore id),
+    which `check` returns for the duplicates of that chunk. Chunks already stored can be
+    registered up front with `register`, so new chunks are also checked against them.
+    """
+
+    def __init__(self, shingle_size: int = SIMHASH_SHINGLE_SIZE, max_distance: int = SIMHASH_MAX_DISTANCE):
+        self.shingle_size = shingle_size
+        self.max_distance = max_distance
+        bounds = np.linspace(0, FINGERPRINT_BITS, max_distance + 2).astype(int)
+        self._bands = [(int(start), (1 << int(end - start)) - 1) for start, end in zip(bounds[:-1], bounds[1:])]
+        self._exact = {}
+        self._buckets = {}
+        self.kept = 0
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    def _band_keys(self, fingerprint: int):
+        for band, (shift, mask) in enumerate(self._bands):
+            yield band, (fingerprint >> shift) & mask
+
+    def check(self, text: str, handle):
+        """
+        Return the handle of the kept chunk `text` duplicates, or register `text` as kept
+        under `handle` and return None.
+        """
+        exact_key = normalized_hash(text)
+        kept_handle = self._exact.get(exact_key)
+        if kept_handle is not None:
+            self.exact_duplicates += 1
+            return kept_handle
+
+        fingerprint = simhash(text, self.shingle_size)
+        if fingerprint is not None:
+            for band_key in self._band_keys(fingerprint):
+                for candidate, candidate_handle in self._buckets.get(band_key, ()):
+                    if hamming_distance(fingerprint, candidate) <= self.max_distance:
+                        self.near_duplicates += 1
+                        return candidate_handle
+
+        self._add(exact_key, fingerprint, handle)
+        self.kept += 1
+        return None
+
+    def register(self, text: str, handle):
+        """
+        Register a chunk that is already stored (not counted in the stats).
+        """
+        self._add(normalized_hash(text), simhash(text, self.shingle_size), handle)
+
+    def _add(self, exact_key: str, fingerprint, handle):
+        self._exact.setdefault(exact_key, handle)
+        if fingerprint is not None:
+            for band_key in self._band_keys(fingerprint):
+                self._buckets.setdefault(band_key, []).append((fingerprint, handle))
+
+    def stats(self) -> dict:
+        return {
+            "kept": self.kept,
+            "exact_duplicates": self.exact_duplicates,
+            "near_duplicates": self.near_duplicates,
+            "embeddings_saved": self.exact_duplicates + self.near_duplicates,
+        }
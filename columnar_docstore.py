@@ -0,0 +1,493 @@
+import fcntl
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+from collections.abc import Mapping
+
+import faiss
+import numpy as np
+from langchain.docstore.base import Docstore
+from langchain.docstore.in_memory import InMemoryDocstore
+from langchain.vectorstores import FAISS
+from langchain_core.documents import Document
+
+
+# A store directory holds one snapshot per write: `snapshot-<version>/` with index.faiss and
+# the columnar docstore/ (replaces langchain's index.faiss + pickled index.pkl). The CURRENT
+# pointer file names the live snapshot and is swapped with os.replace, so a reader sees the
+# old or the new index and docstore together, never a mix, a partial or a missing one.
+# Superseded snapshots are deleted only after the swap. The snapshot name is the store version.
+INDEX_FILENAME = "index.faiss"
+DOCSTORE_DIRNAME = "docstore"
+DOCSTORE_FORMAT = 2
+SNAPSHOT_PREFIX = "snapshot-"
+CURRENT_POINTER = "CURRENT"
+# Unpublished snapshots older than this are left over from a crashed writer
+STALE_SNAPSHOT_SECONDS = 24 * 3600
+# Held (flock) while a legacy store is converted, so concurrent workers convert it once
+CONVERT_LOCK = "convert.lock"
+
+# Read-only mapping of the index file, chosen by index type (the file's leading fourcc).
+# IVF inverted lists ("Iw..." indexes) are mapped by IO_FLAG_MMAP. Flat codes (Flat, and the
+# storage of HNSW,Flat) are only mapped in place by FAISS builds that have IO_FLAG_MMAP_IFC;
+# without it they cannot be mapped and the index is read into memory.
+IVF_MMAP_FLAGS = faiss.IO_FLAG_READ_ONLY | faiss.IO_FLAG_MMAP
+FLAT_MMAP_FLAGS = faiss.IO_FLAG_READ_ONLY | faiss.IO_FLAG_MMAP_IFC if hasattr(faiss, "IO_FLAG_MMAP_IFC") else None
+FLAT_FOURCCS = (b"IxF2", b"IxFI", b"IxFl", b"IHNf")
+
+LOAD_MODES = ("memory", "mmap")
+
+
+def current_snapshot(store_path: str):
+    """
+    Path of the store's published snapshot directory, or None if it has none yet.
+    """
+    try:
+        with open(os.path.join(store_path, CURRENT_POINTER)) as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return os.path.join(store_path, name) if name else None
+
+
+def snapshot_version(store_path: str):
+    """
+    Version of a store: the name of its current snapshot, or None if it has none.
+    """
+    snapshot_path = current_snapshot(store_path)
+    return os.path.basename(snapshot_path) if snapshot_path else None
+
+
+def new_snapshot(store_path: str) -> str:
+    """
+    Create an unpublished snapshot directory for a writer. Readers never look at it
+    until publish_snapshot points CURRENT to it. The store directory must already exist:
+    FileNotFoundError otherwise.
+    """
+    name = f"{SNAPSHOT_PREFIX}{time.time_ns()}-{os.getpid()}-{threading.get_ident()}"
+    staging_path = os.path.join(store_path, f"{name}.tmp")
+    os.mkdir(staging_path)
+    return staging_path
+
+
+def discard_snapshot(staging_path: str):
+    shutil.rmtree(staging_path, ignore_errors=True)
+
+
+def publish_snapshot(store_path: str, staging_path: str) -> str:
+    """
+    Make a finished snapshot the store's current one with a single os.replace of the
+    CURRENT pointer, then delete the snapshots it supersedes.
+    """
+    snapshot_path = staging_path[:-len(".tmp")]
+    os.replace(staging_path, snapshot_path)
+    name = os.path.basename(snapshot_path)
+    pointer_path = os.path.join(store_path, CURRENT_POINTER)
+    pointer_staging_path = f"{pointer_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(pointer_staging_path, "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_staging_path, pointer_path)
+    remove_superseded_snapshots(store_path, name)
+    return snapshot_path
+
+
+def remove_superseded_snapshots(store_path: str, current_name: str):
+    """
+    Delete published snapshots other than `current_name`, and unpublished ones abandoned
+    by a crashed writer. Readers that already opened an old snapshot keep their open
+    files and mappings; a reader that only read the old pointer retries (see read_faiss_store).
+    """
+    now = time.time()
+    for name in os.listdir(store_path):
+        if not name.startswith(SNAPSHOT_PREFIX) or name == current_name:
+            continue
+        path = os.path.join(store_path, name)
+        try:
+            if name.endswith(".tmp") and now - os.path.getmtime(path) < STALE_SNAPSHOT_SECONDS:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class DocstoreWriter:
+    """
+    Writes chunks in the columnar docstore format one at a time, in FAISS position order,
+    so a store can be saved while it is being ingested without holding its text in memory.
+
+    Layout of `<snapshot>/docstore/`:
+        text.bin               page_content of every chunk, UTF-8, concatenated
+        text_offsets.npy       int64, n + 1 byte offsets into text.bin
+        ids.npy                docstore id of every row
+        sorted_ids.npy         ids sorted, with sorted_positions.npy, for id -> row lookups
+        metadata_<i>.npy       int32 codes of metadata key i per row (-1 = key absent)
+        meta.json              format, row count, and per key the table of distinct values
+
+    Everything is plain bytes, .npy arrays or JSON, so loading needs no pickle. Rows go
+    to an unpublished snapshot (see new_snapshot), which the caller publishes once the
+    index is written next to the docstore.
+    """
+
+    def __init__(self, snapshot_path: str):
+        self.path = os.path.join(snapshot_path, DOCSTORE_DIRNAME)
+        os.makedirs(self.path)
+        self._text_file = open(os.path.join(self.path, "text.bin"), "wb")
+        self._doc_ids = []
+        self._offsets = [0]
+        self._columns = {}  # key -> (value table {json: code}, codes per row)
+        self._metadata_updates = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def update_metadata(self, doc_id: str, metadata: dict):
+        """
+        Merge `metadata` into an already added row when the writer is committed.
+        """
+        self._metadata_updates.setdefault(doc_id, {}).update(metadata)
+
+    def _set_metadata(self, row: int, key, value):
+        table, codes = self._columns.setdefault(key, ({}, []))
+        codes.extend([-1] * (row + 1 - len(codes)))
+        codes[row] = table.setdefault(json.dumps(value, sort_keys=True), len(table))
+
+    def add(self, doc_id: str, doc: Document):
+        row = len(self._doc_ids)
+        text = doc.page_content.encode("utf-8")
+        self._text_file.write(text)
+        self._offsets.append(self._offsets[-1] + len(text))
+        self._doc_ids.append(doc_id)
+        for key, value in doc.metadata.items():
+            self._set_metadata(row, key, value)
+
+    def commit(self) -> str:
+        self._text_file.close()
+        if self._metadata_updates:
+            for row, doc_id in enumerate(self._doc_ids):
+                for key, value in self._metadata_updates.get(doc_id, {}).items():
+                    self._set_metadata(row, key, value)
+        num_docs = len(self._doc_ids)
+        ids = np.array(self._doc_ids, dtype=str)
+        order = np.argsort(ids, kind="stable")
+        np.save(os.path.join(self.path, "text_offsets.npy"), np.asarray(self._offsets, dtype=np.int64))
+        np.save(os.path.join(self.path, "ids.npy"), ids)
+        np.save(os.path.join(self.path, "sorted_ids.npy"), ids[order])
+        np.save(os.path.join(self.path, "sorted_positions.npy"), order.astype(np.int64))
+
+        metadata_columns = []
+        for column, (key, (table, codes)) in enumerate(self._columns.items()):
+            codes.extend([-1] * (num_docs - len(codes)))
+            np.save(os.path.join(self.path, f"metadata_{column}.npy"), np.asarray(codes, dtype=np.int32))
+            metadata_columns.append({"key": key, "values": [json.loads(value) for value in table]})
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump({"format": DOCSTORE_FORMAT, "num_docs": num_docs, "metadata_columns": metadata_columns}, f)
+
+        return self.path
+
+    def abort(self):
+        self._text_file.close()
+
+
+def write_docstore(snapshot_path: str, documents) -> str:
+    """
+    Write a whole docstore (see DocstoreWriter for the layout).
+
+    Args:
+        snapshot_path (str): Unpublished snapshot directory (see new_snapshot).
+        documents (Iterable[Tuple[str, Document]]): (doc_id, Document) in FAISS position order.
+    """
+    writer = DocstoreWriter(snapshot_path)
+    try:
+        for doc_id, doc in documents:
+            writer.add(doc_id, doc)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.commit()
+
+
+class ColumnarDocstore(Docstore):
+    """
+    Read-only docstore over the files written by DocstoreWriter.
+
+    Every file is read (or memory-mapped, with `mmap=True`) when the docstore is opened,
+    so an open docstore stays on the one snapshot it was opened from even after a writer
+    publishes and deletes it. `Document` objects are built per lookup. With `mmap=True`
+    every worker on a host shares the same pages through the OS cache.
+    """
+
+    def __init__(self, path: str, mmap: bool = False):
+        self.path = path
+        self.mmap = mmap
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.num_docs = meta["num_docs"]
+        self.metadata_keys = [column["key"] for column in meta["metadata_columns"]]
+        self.metadata_values = [column["values"] for column in meta["metadata_columns"]]
+        self.text = self._text()
+        self.text_offsets = self._array("text_offsets.npy")
+        self.ids = self._array("ids.npy")
+        self._sorted_ids = self._array("sorted_ids.npy")
+        self._sorted_positions = self._array("sorted_positions.npy")
+        self._metadata_codes = [self._array(f"metadata_{column}.npy") for column in range(len(self.metadata_keys))]
+
+    def _array(self, filename: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, filename), mmap_mode="r" if self.mmap else None, allow_pickle=False)
+
+    def _text(self):
+        with open(os.path.join(self.path, "text.bin"), "rb") as f:
+            if not self.mmap:
+                return f.read()
+            # mmap cannot map an empty file
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    def text_at(self, position: int) -> str:
+        start, end = int(self.text_offsets[position]), int(self.text_offsets[position + 1])
+        return self.text[start:end].decode("utf-8")
+
+    def metadata_at(self, position: int) -> dict:
+        metadata = {}
+        for key, values, codes in zip(self.metadata_keys, self.metadata_values, self._metadata_codes):
+            code = int(codes[position])
+            if code != -1:
+                metadata[key] = values[code]
+        return metadata
+
+    def document(self, position: int) -> Document:
+        return Document(page_content=self.text_at(position), metadata=self.metadata_at(position))
+
+    def position_of(self, doc_id: str):
+        row = int(np.searchsorted(self._sorted_ids, doc_id))
+        if row < len(self._sorted_ids) and self._sorted_ids[row] == doc_id:
+            return int(self._sorted_positions[row])
+        return None
+
+    def search(self, search: str):
+        position = self.position_of(search)
+        if position is None:
+            return f"ID {search} not found."
+        return self.document(position)
+
+    def items(self):
+        """
+        (doc_id, Document) for every chunk, in FAISS position order.
+        """
+        for position in range(self.num_docs):
+            yield str(self.ids[position]), self.document(position)
+
+    def iter_texts(self):
+        """
+        (doc_id, text) for every chunk in row order, without building Documents or metadata.
+        """
+        ids, offsets, text = self.ids, self.text_offsets, self.text
+        for position in range(self.num_docs):
+            yield str(ids[position]), text[int(offsets[position]):int(offsets[position + 1])].decode("utf-8")
+
+    def text_bytes(self) -> int:
+        return int(self.text_offsets[-1]) if self.num_docs else 0
+
+
+class PositionIds(Mapping):
+    """
+    Read-only `index_to_docstore_id` view over the docstore's id array.
+    """
+
+    def __init__(self, ids):
+        self._ids = ids
+
+    def __getitem__(self, position):
+        if not 0 <= position < len(self._ids):
+            raise KeyError(position)
+        return str(self._ids[position])
+
+    def __iter__(self):
+        return iter(range(len(self._ids)))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+def save_faiss_store(store_path: str, vectorstore: FAISS) -> str:
+    """
+    Save a langchain FAISS store as a new snapshot of index.faiss plus a columnar
+    docstore (instead of `save_local`'s pickle), and publish it. `store_path` must exist.
+    """
+    snapshot_path = new_snapshot(store_path)
+    try:
+        index_to_docstore_id = vectorstore.index_to_docstore_id
+        write_docstore(
+            snapshot_path,
+            ((index_to_docstore_id[position], vectorstore.docstore.search(index_to_docstore_id[position]))
+             for position in sorted(index_to_docstore_id))
+        )
+        write_faiss_index(snapshot_path, vectorstore.index)
+    except BaseException:
+        discard_snapshot(snapshot_path)
+        raise
+    return publish_snapshot(store_path, snapshot_path)
+
+
+def write_faiss_index(snapshot_path: str, index):
+    faiss.write_index(index, os.path.join(snapshot_path, INDEX_FILENAME))
+
+
+def is_legacy_store(store_path: str) -> bool:
+    """
+    True for a store saved before snapshots existed and not converted yet.
+    """
+    return current_snapshot(store_path) is None and os.path.exists(os.path.join(store_path, INDEX_FILENAME))
+
+
+def convert_legacy_store(store_path: str) -> bool:
+    """
+    Move a store saved before snapshots existed (index.faiss next to a pickled index.pkl
+    or an unversioned docstore/) into its first snapshot.
+
+    A one-off step for startup and writers, never the read path: it holds an exclusive
+    lock on the store while it runs, so of several workers only the first converts and
+    the others wait and find the store converted.
+
+    Returns:
+        bool: True if the store was converted by this call.
+    """
+    if not is_legacy_store(store_path):
+        return False
+    with open(os.path.join(store_path, CONVERT_LOCK), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if not is_legacy_store(store_path):
+                return False
+            _convert_legacy_store(store_path)
+            return True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _convert_legacy_store(store_path: str):
+    legacy_index_path = os.path.join(store_path, INDEX_FILENAME)
+    unversioned_path = os.path.join(store_path, DOCSTORE_DIRNAME)
+    snapshot_path = new_snapshot(store_path)
+    try:
+        if os.path.exists(os.path.join(unversioned_path, "meta.json")):
+            print(f"🗂️ [Docstore] Moving '{store_path}' into a snapshot")
+            write_docstore(snapshot_path, ColumnarDocstore(unversioned_path).items())
+        else:
+            print(f"🗂️ [Docstore] Converting pickled docstore of '{store_path}' to the columnar format")
+            # Only the docstore is read, so no embedding model is needed
+            legacy = FAISS.load_local(store_path, None, allow_dangerous_deserialization=True)
+            write_docstore(snapshot_path, ((doc_id, legacy.docstore.search(doc_id))
+                                           for _, doc_id in sorted(legacy.index_to_docstore_id.items())))
+        shutil.copyfile(legacy_index_path, os.path.join(snapshot_path, INDEX_FILENAME))
+    except BaseException:
+        discard_snapshot(snapshot_path)
+        raise
+    publish_snapshot(store_path, snapshot_path)
+    for path in (legacy_index_path, os.path.join(store_path, "index.pkl")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    shutil.rmtree(unversioned_path, ignore_errors=True)
+
+
+def index_mmap_flags(index_path: str):
+    """
+    read_index flags that memory-map this index file, or None if this FAISS build cannot
+    map its index type.
+    """
+    with open(index_path, "rb") as f:
+        fourcc = f.read(4)
+    if fourcc.startswith(b"Iw"):
+        return IVF_MMAP_FLAGS
+    if fourcc in FLAT_FOURCCS:
+        return FLAT_MMAP_FLAGS
+    return None
+
+
+def read_index(index_path: str, use_mmap: bool):
+    """
+    Read index.faiss, memory-mapped if `use_mmap` and the index type allows it.
+
+    Returns:
+        Tuple[faiss.Index, bool]: The index and whether it is really mapped.
+    """
+    if not use_mmap:
+        return faiss.read_index(index_path), False
+    flags = index_mmap_flags(index_path)
+    if flags is None:
+        print(f"⚠️ [Docstore] This FAISS build cannot memory-map {index_path}; reading it into memory")
+        return faiss.read_index(index_path), False
+    return faiss.read_index(index_path, flags), True
+
+
+def open_snapshot(store_path: str, use_mmap: bool, attempts: int = 3):
+    """
+    Open the index and docstore of the current snapshot. A writer may publish a newer
+    snapshot and delete this one between reading the pointer and opening the files; the
+    pointer is then read again.
+
+    Returns:
+        Tuple[faiss.Index, bool, ColumnarDocstore]: The index, whether it is memory-mapped,
+            and the docstore.
+    """
+    for attempt in range(attempts):
+        snapshot_path = current_snapshot(store_path)
+        if snapshot_path is None:
+            if is_legacy_store(store_path):
+                raise FileNotFoundError(f"Vector store '{store_path}' has not been converted to snapshots yet "
+                                        f"(see convert_legacy_store)")
+            raise FileNotFoundError(f"Vector store '{store_path}' does not exist")
+        try:
+            index, index_mapped = read_index(os.path.join(snapshot_path, INDEX_FILENAME), use_mmap)
+            return index, index_mapped, ColumnarDocstore(os.path.join(snapshot_path, DOCSTORE_DIRNAME), mmap=use_mmap)
+        except (FileNotFoundError, RuntimeError):
+            # faiss reports a missing file as a RuntimeError
+            if attempt == attempts - 1 or current_snapshot(store_path) == snapshot_path:
+                raise
+
+
+def read_faiss_store(store_path: str, embeddings, load_mode: str = "memory", writable: bool = False) -> FAISS:
+    """
+    Load a store saved by save_faiss_store.
+
+    Args:
+        store_path (str): Store directory.
+        embeddings: Embedding model for queries.
+        load_mode (str): "memory" reads the index and docstore arrays into this process;
+            "mmap" memory-maps both (read-only) where the index type allows it (see
+            index_mmap_flags). The returned store's `index_mmap` says whether the index is mapped.
+        writable (bool): Return a regular InMemoryDocstore and index that can be updated
+            and saved again (used by incremental ingestion).
+
+    Never writes to the store: an unknown store, or one saved before snapshots existed
+    and not converted yet (see convert_legacy_store), raises FileNotFoundError.
+    """
+    if load_mode not in LOAD_MODES:
+        raise ValueError(f"Unknown vector store load mode '{load_mode}'. Expected one of: {', '.join(LOAD_MODES)}")
+
+    use_mmap = load_mode == "mmap" and not writable
+    index, index_mapped, docstore = open_snapshot(store_path, use_mmap)
+    if writable:
+        index_to_docstore_id = dict(enumerate(str(doc_id) for doc_id in docstore.ids))
+        return FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=InMemoryDocstore(dict(docstore.items())),
+            index_to_docstore_id=index_to_docstore_id,
+        )
+    vectorstore = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=PositionIds(docstore.ids),
+    )
+    vectorstore.index_mmap = index_mapped
+    return vectorstore
@@ -1,37 +1,118 @@
 import os
-import torch
-from langchain.embeddings import HuggingFaceBgeEmbeddings
-from langchain_community.chat_models import ChatOllama
 
 
+# Models are created lazily on first use (see models.py); only their settings live here.
 
-# Initialize device for embeddings (CUDA if available)
-print("=" * 100)
-try:
-    cuda_available = torch.cuda.is_available()
-    print(f"✅ CUDA Available: {cuda_available}")
-    DEVICE = "cuda" if cuda_available else "cpu"
-    print(f"🧠 Using torch version: {torch.__version__} | Device: {DEVICE}")
-except Exception as e:
-    print(f"❌ Error checking Torch CUDA availability: {e}")
-    DEVICE = "cpu"
-print("=" * 100)
-
-
-
-# Set up HuggingFace embedding model
+# HuggingFace embedding model (device is picked when the model is first loaded)
 model_name = "BAAI/bge-small-en-v1.5"
-model_kwargs = {'device': DEVICE}
 encode_kwargs = {'normalize_embeddings': True}
-embeddings = HuggingFaceBgeEmbeddings(
-    model_name=model_name,
-    model_kwargs=model_kwargs,
-    encode_kwargs=encode_kwargs
-)
+
+# Ollama chat model
+llm_kwargs = {'base_url': "http://localhost:11434", 'model': "gemma3:12b-it-q4_K_M", 'temperature': 0.3}
 
 
 DIRECTORY_PATH = "/PROVIDE_YOUR_PATH/studybuddy/Data"
 VECTORSORE_PATH = "/PROVIDE_YOUR_PATH/studybuddy/vector_store"
 
 
-llm = ChatOllama(base_url="http://localhost:11434" model="gemma3:12b-it-q4_K_M", temperature=0.3)
+# Process-wide vector store cache (see vectorstore_registry.py)
+VECTORSTORE_CACHE_MAX_ENTRIES = 8
+VECTORSTORE_CACHE_MAX_MEMORY_MB = 2048
+# "memory": every worker reads its own copy of index.faiss and the columnar docstore;
+# "mmap": both are memory-mapped, so workers on one host share pages through the OS cache.
+# Flat/HNSW indexes are only mapped by FAISS builds with IO_FLAG_MMAP_IFC; otherwise they are
+# read into memory with a warning (see columnar_docstore.py)
+VECTORSTORE_LOAD_MODE = "memory"
+
+
+# Persistent chunk embedding cache shared by all stores (see embedding_cache.py)
+EMBEDDING_CACHE_PATH = os.path.join(os.path.dirname(VECTORSORE_PATH), "cache", "embeddings.sqlite3")
+
+
+# Generated summaries, diagrams, FAQs and topics (see artifact_cache.py)
+ARTIFACT_CACHE_PATH = os.path.join(os.path.dirname(VECTORSORE_PATH), "cache", "artifacts.sqlite3")
+
+
+# Compressed docling markdown keyed by PDF digest (see conversion_cache.py)
+CONVERSION_CACHE_PATH = os.path.join(os.path.dirname(DIRECTORY_PATH), "conversion_cache")
+
+
+# Chunks per embedding batch during ingestion (batches are bucketed by token length)
+EMBEDDING_BATCH_SIZE = 64
+
+
+# PDF conversion processes per ingestion run (1 = convert in-process)
+CONVERSION_MAX_WORKERS = max(1, (os.cpu_count() or 1) // 2)
+
+
+# Streaming ingestion (see ingestion.py): bounded queues between convert -> split -> embed,
+# so peak memory depends on these sizes rather than on the size of the corpus
+INGESTION_DOCUMENT_QUEUE_SIZE = 2       # converted markdown documents waiting to be split
+INGESTION_CHUNK_QUEUE_SIZE = 1024       # chunks waiting to be embedded
+INGESTION_EMBED_BATCH_CHUNKS = 512      # chunks per embed + index add step
+
+
+# Exact and near-duplicate chunks of one ingestion run are dropped before embedding (see chunk_dedup.py)
+CHUNK_DEDUP_ENABLED = True
+SIMHASH_SHINGLE_SIZE = 3      # words per shingle
+SIMHASH_MAX_DISTANCE = 3      # differing bits (of 64) still counted as a near-duplicate
+
+
+# Semantic answer cache for /QA-Guide/ (see semantic_cache.py)
+SEMANTIC_CACHE_THRESHOLD = 0.92       # minimum cosine similarity between questions
+SEMANTIC_CACHE_TTL_SECONDS = 24 * 3600
+SEMANTIC_CACHE_MAX_ENTRIES = 500      # per vector store
+
+
+# FAISS index type for new stores: "flat" (exact), "ivf_flat", "ivf_pq" or "hnsw" (see ann_index.py)
+FAISS_INDEX_TYPE = "flat"
+ANN_MIN_VECTORS = 10000        # smaller stores always use an exact flat index
+IVF_NLIST = None               # None = about 4 * sqrt(num_vectors)
+IVF_TRAIN_SAMPLE_SIZE = 100000
+IVF_NPROBE = 16                # default lists probed per query (overridable per request)
+IVF_PQ_M = 48                  # PQ sub-quantizers; must divide the embedding size (384 for bge-small)
+IVF_PQ_NBITS = 8
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64            # default search depth (overridable per request)
+
+
+# Hybrid retrieval: BM25 index saved as bm25.npz in each store (see sparse_index.py, hybrid_retrieval.py)
+BM25_K1 = 1.5
+BM25_B = 0.75
+HYBRID_FETCH_K = 20      # candidates taken from each of BM25 and FAISS before fusion
+RRF_K = 60               # reciprocal-rank fusion constant
+
+
+# LDA topic model saved in each store's lda/ directory (see topic_model.py)
+TOPIC_MODEL_PASSES = 15
+TOPIC_MODEL_STREAMING_MIN_DOCS = 10000   # larger stores stream an on-disk corpus into LdaMulticore
+TOPIC_MODEL_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+TOPIC_MODEL_CHUNKSIZE = 2000             # documents per LdaMulticore training chunk
+# Topic count is picked by a coherence sweep over these candidates on a subsample
+TOPIC_COUNT_CANDIDATES = (2, 3, 4, 5, 6, 8, 10, 12, 15, 20, 25, 30)
+TOPIC_COUNT_MAX = 20                     # hard cap on the chosen count (None = no cap)
+TOPIC_COHERENCE_MEASURE = "c_v"          # or "u_mass" (faster, less reliable)
+TOPIC_SWEEP_SAMPLE_SIZE = 2000           # chunks sampled for the sweep
+TOPIC_SWEEP_PASSES = 5
+TOPIC_SWEEP_TIME_BUDGET_SECONDS = 60
+
+
+# Per-workload pools and queue limits; requests beyond the queue get 429 + Retry-After
+# (see ingestion_jobs.py and workload_pools.py)
+INGESTION_MAX_WORKERS = 2
+INGESTION_MAX_QUEUE = 8
+INGESTION_JOB_HISTORY = 100
+RETRIEVAL_POOL_SIZE = 8       # /QA-Guide/
+RETRIEVAL_MAX_QUEUE = 32
+GENERATION_POOL_SIZE = 4      # summary, diagram, FAQ, quiz, topics
+GENERATION_MAX_QUEUE = 16
+
+# Prebuilt chains (see chain_registry.py). False is the quiet production mode: no
+# verbose langchain logging of every stuffed prompt
+CHAIN_VERBOSE = False
+CHAIN_REGISTRY_MAX_RETRIEVERS = 64       # prebuilt retrievers kept, least recently used evicted first
+
+# /QA-Guide/batch: questions per request, and LLM generations in flight per batch
+QA_BATCH_MAX_QUESTIONS = 500
+QA_BATCH_CONCURRENCY = 4
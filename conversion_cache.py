@@ -0,0 +1,162 @@
+import argparse
+import gzip
+import hashlib
+import os
+import shutil
+import threading
+import time
+from importlib import metadata
+
+from configuration import DIRECTORY_PATH, CONVERSION_CACHE_PATH
+
+
+def docling_version() -> str:
+    try:
+        return metadata.version("docling")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def file_digest(path: str) -> str:
+    """
+    SHA-256 of a file's bytes, read in 1 MB blocks.
+    """
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class ConversionCache:
+    """
+    Gzip-compressed markdown produced by docling, keyed by the SHA-256 of the PDF
+    bytes and the docling version. Entries live under `<root>/<docling version>/`,
+    so upgrading docling naturally invalidates the previous results.
+    """
+
+    def __init__(self, root: str, version: str):
+        self.root = root
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, digest: str) -> str:
+        return os.path.join(self.root, self.version, f"{digest}.md.gz")
+
+    def get(self, digest: str):
+        """
+        Return the cached markdown for a PDF digest, or None on a miss.
+        """
+        path = self._entry_path(digest)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                markdown_text = file.read()
+        except (FileNotFoundError, OSError, EOFError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return markdown_text
+
+    def contains(self, digest: str) -> bool:
+        return os.path.exists(self._entry_path(digest))
+
+    def put(self, digest: str, markdown_text: str):
+        path = self._entry_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so concurrent readers never see a half-written entry
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as file:
+            file.write(markdown_text)
+        os.replace(tmp_path, path)
+
+    def prune(self, data_directory: str = None, max_age_days: float = None) -> dict:
+        """
+        Remove stale entries: every other docling version, entries whose PDF is no longer
+        present in `data_directory` (if given) and entries older than `max_age_days`.
+
+        Returns:
+            dict: Number of removed entries and freed bytes.
+        """
+        removed, freed = 0, 0
+        if not os.path.isdir(self.root):
+            return {"removed": removed, "freed_mb": 0.0}
+
+        for version in os.listdir(self.root):
+            version_dir = os.path.join(self.root, version)
+            if version != self.version and os.path.isdir(version_dir):
+                for name in os.listdir(version_dir):
+                    freed += os.path.getsize(os.path.join(version_dir, name))
+                    removed += 1
+                shutil.rmtree(version_dir)
+                print(f"🧹 Removed conversion cache for docling {version}")
+
+        live_digests = None
+        if data_directory is not None and os.path.isdir(data_directory):
+            live_digests = {
+                file_digest(os.path.join(data_directory, name))
+                for name in os.listdir(data_directory)
+                if name.lower().endswith(".pdf")
+            }
+
+        version_dir = os.path.join(self.root, self.version)
+        if os.path.isdir(version_dir):
+            now = time.time()
+            for name in os.listdir(version_dir):
+                path = os.path.join(version_dir, name)
+                digest = name.split(".", 1)[0]
+                too_old = max_age_days is not None and now - os.path.getmtime(path) > max_age_days * 86400
+                orphaned = live_digests is not None and digest not in live_digests
+                if too_old or orphaned or name.endswith(".tmp"):
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                    removed += 1
+
+        return {"removed": removed, "freed_mb": round(freed / (1024 * 1024), 2)}
+
+    def stats(self) -> dict:
+        entries, size_bytes = 0, 0
+        version_dir = os.path.join(self.root, self.version)
+        if os.path.isdir(version_dir):
+            for name in os.listdir(version_dir):
+                entries += 1
+                size_bytes += os.path.getsize(os.path.join(version_dir, name))
+        lookups = self.hits + self.misses
+        return {
+            "path": self.root,
+            "docling_version": self.version,
+            "entries": entries,
+            "size_mb": round(size_bytes / (1024 * 1024), 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+conversion_cache = ConversionCache(CONVERSION_CACHE_PATH, docling_version())
+
+
+
+# Usage:
+#   python conversion_cache.py prune                      # drop other docling versions and PDFs no longer in DIRECTORY_PATH
+#   python conversion_cache.py prune --max-age-days 90    # also drop entries older than 90 days
+#   python conversion_cache.py stats
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the docling conversion cache.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    prune_parser = subparsers.add_parser("prune", help="Remove stale conversion cache entries.")
+    prune_parser.add_argument("--max-age-days", type=float, default=None, help="Also remove entries older than this.")
+    prune_parser.add_argument("--keep-orphans", action="store_true", help="Keep entries whose PDF is no longer in the data directory.")
+
+    subparsers.add_parser("stats", help="Show conversion cache size.")
+
+    args = parser.parse_args()
+    if args.command == "prune":
+        result = conversion_cache.prune(
+            data_directory=None if args.keep_orphans else DIRECTORY_PATH,
+            max_age_days=args.max_age_days
+        )
+        print(f"✅ Pruned {result['removed']} entries, freed {result['freed_mb']} MB")
+    else:
+        print(conversion_cache.stats())
@@ -0,0 +1,35 @@
+# Each worker process keeps one warm converter for every PDF it is given.
+# docling is imported when the first converter is built, so importing this module
+# (and the API, through ingestion.py) stays cheap.
+_converter = None
+
+
+def init_worker():
+    """
+    Process-pool initializer: build this worker's DocumentConverter once.
+    """
+    from docling.document_converter import DocumentConverter
+
+    global _converter
+    _converter = DocumentConverter()
+
+
+def convert_pdf(pdf_path: str):
+    """
+    Convert a single PDF to markdown with this worker's converter.
+
+    Args:
+        pdf_path (str): Full path of the PDF file.
+
+    Returns:
+        Tuple[str, str]: (markdown_text, error). Exactly one of them is None, so a bad
+        file only fails its own slot instead of the whole pool.
+    """
+    global _converter
+    if _converter is None:
+        init_worker()
+    try:
+        result = _converter.convert(pdf_path)
+        return result.document.export_to_markdown(), None
+    except Exception as e:
+        return None, str(e)
@@ -1,20 +1,37 @@
 # from langchain_community.chat_models import ChatOllama
-from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.output_parsers import StrOutputParser
-import torch
-from langchain.vectorstores import FAISS
-from configuration import llm,embeddings,VECTORSORE_PATH
+from configuration import VECTORSORE_PATH
+from vectorstore_registry import load_vectorstore, aload_vectorstore
+from chain_registry import chain_registry
 import os
 
 
-def diagram_creation(subject: str, vector_store_name: str) -> str:
+diagram_prompt_template = """
+            You are an expert at summarizing technical content into clear and concise diagrams.
+
+            Using the provided context, generate an ASCII flowchart that summarizes the key concepts related to the subject: **{subject}**.
+
+            Guidelines:
+            - Use simple ASCII characters like '-', '|', '+', and '>' to draw the flowchart.
+            - Organize up to 10 major points in a logical sequence or hierarchy.
+            - Keep it clear, readable, and easy to follow.
+            - Each node should represent a key idea or step from the context.
+            - Avoid repeating content verbatim — summarize meaningfully.
+
+            Context:
+            {context}
+            """
+
+chain_registry.register("diagram", diagram_prompt_template, ["subject", "context"], k=5)
+
+
+def diagram_creation(subject: str, vector_store_name: str, retrieval_mode: str = "dense") -> str:
     """
     Creates an ASCII diagram based on subject using context from a vector store.
 
     Args:
         subject (str): Topic for which the diagram is to be generated.
         vector_store_path (str): Path to the saved FAISS vector store.
+        retrieval_mode (str): "dense" (FAISS only) or "hybrid" (BM25 + FAISS fused by rank).
 
     Returns:
         str: ASCII flowchart as a string.
@@ -22,7 +39,7 @@ def diagram_creation(subject: str, vector_store_name: str) -> str:
     try:
         vector_store_path = os.path.join(VECTORSORE_PATH, vector_store_name)
         print(f"📂 Loading vector store from: {vector_store_path}")
-        vector_store = FAISS.load_local(vector_store_path, embeddings, allow_dangerous_deserialization=True)
+        vector_store = load_vectorstore(vector_store_name)
         print("✅ Vector store loaded successfully.")
     except Exception as e:
         print(f"❌ Failed to load vector store: {e}")
@@ -30,7 +47,7 @@ def diagram_creation(subject: str, vector_store_name: str) -> str:
 
     try:
         print(f"🔍 Setting up retriever with subject: '{subject}'")
-        retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": 5})
+        retriever = chain_registry.retriever("diagram", vector_store, vector_store_name, retrieval_mode)
         content = retriever.invoke(subject)
         print(f"📚 Retrieved {len(content)} relevant chunks from the vector store.")
     except Exception as e:
@@ -41,32 +58,61 @@ def diagram_creation(subject: str, vector_store_name: str) -> str:
         full_text = "".join([doc.page_content for doc in content])
 
         print("🧠 Preparing diagram generation prompt...")
-        prompt = PromptTemplate(
-            template="""
-            You are an expert at summarizing technical content into clear and concise diagrams.
+        diagram_creator = chain_registry.chain("diagram")
+        print("✏️ Generating ASCII diagram...")
+        diagram = diagram_creator.invoke({"subject": subject, "context": full_text})
+        print("✅ Diagram generated successfully.\n")
 
-            Using the provided context, generate an ASCII flowchart that summarizes the key concepts related to the subject: **{subject}**.
+        return diagram
 
-            Guidelines:
-            - Use simple ASCII characters like '-', '|', '+', and '>' to draw the flowchart.
-            - Organize up to 10 major points in a logical sequence or hierarchy.
-            - Keep it clear, readable, and easy to follow.
-            - Each node should represent a key idea or step from the context.
-            - Avoid repeating content verbatim — summarize meaningfully.
+    except Exception as e:
+        print(f"❌ Diagram generation failed: {e}")
+        return f"Error: Failed to generate diagram. {str(e)}"
+
+
+async def aprepare_diagram_chain(subject: str, vector_store_name: str, retrieval_mode: str = "dense"):
+    """
+    Retrieve context for a subject and build the diagram chain without running it,
+    so callers can stream the generation token by token.
+
+    Args:
+        subject (str): Topic for which the diagram is to be generated.
+        vector_store_name (str): Name of the FAISS vector store.
+        retrieval_mode (str): "dense" (FAISS only) or "hybrid" (BM25 + FAISS fused by rank).
+
+    Returns:
+        Tuple[Runnable, dict, List[Document]]: The chain, its inputs and the retrieved documents.
+    """
+    vector_store = await aload_vectorstore(vector_store_name)
+    retriever = await chain_registry.aretriever("diagram", vector_store, vector_store_name, retrieval_mode)
+    content = await retriever.ainvoke(subject)
+    print(f"📚 Retrieved {len(content)} relevant chunks from the vector store.")
+
+    full_text = "".join([doc.page_content for doc in content])
+    diagram_creator = chain_registry.chain("diagram")
+    return diagram_creator, {"subject": subject, "context": full_text}, content
 
-            Context:
-            {context}
-            """,
-            input_variables=["subject", "context"]
-        )
 
-        diagram_creator = prompt | llm | StrOutputParser()
+async def adiagram_creation(subject: str, vector_store_name: str, retrieval_mode: str = "dense") -> str:
+    """
+    Async variant of diagram_creation: retrieval and generation run on the event loop
+    (`ainvoke`), so many diagrams can be in flight without holding a thread each.
+
+    Returns:
+        str: ASCII flowchart, or an "Error: ..." message.
+    """
+    try:
+        print(f"🔍 Setting up retriever with subject: '{subject}'")
+        diagram_creator, inputs, _ = await aprepare_diagram_chain(subject, vector_store_name, retrieval_mode)
+    except Exception as e:
+        print(f"❌ Error during retrieval: {e}")
+        return f"Error: Failed to retrieve content. {str(e)}"
+
+    try:
         print("✏️ Generating ASCII diagram...")
-        diagram = diagram_creator.invoke({"subject": subject, "context": full_text})
+        diagram = await diagram_creator.ainvoke(inputs)
         print("✅ Diagram generated successfully.\n")
-
         return diagram
-
     except Exception as e:
         print(f"❌ Diagram generation failed: {e}")
         return f"Error: Failed to generate diagram. {str(e)}"
@@ -1,28 +1,35 @@
 # from langchain_community.chat_models import ChatOllama
-from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.output_parsers import StrOutputParser
-import torch,os
-from langchain.vectorstores import FAISS
-from configuration import llm,embeddings,VECTORSORE_PATH
+import os
+from configuration import VECTORSORE_PATH
+from vectorstore_registry import load_vectorstore, aload_vectorstore
+from chain_registry import chain_registry
 
 
-print("=" * 100)
-try:
-    cuda_available = torch.cuda.is_available()
-    print(f"✅ CUDA Available: {cuda_available}")
-    DEVICE = "cuda" if cuda_available else "cpu"
-    print(f"🧠 Using torch version: {torch.__version__} | Device: {DEVICE}")
-except Exception as e:
-    print(f"❌ Error checking Torch CUDA availability: {e}")
-    DEVICE = "cpu"
-print("=" * 100)
 
+FAQ_prompt_template = """
+                    You are an AI learning assistant that helps students study more effectively. Based on the content below, generate {num_ques} Frequently Asked Questions (FAQs) that serve as a structured learning guide for students.
+
+                    ### Context:
+                    {context}
+
+                    Generate a list of {num_ques} guiding FAQs that cover the most important aspects of the material. These FAQs should help a student understand, review, and retain the content effectively.
+
+                    ### Output Format:
+                    1. **Q:** [Question 1]  
+                    **A:** [Answer 1]
+
+                    2. **Q:** [Question 2]  
+                    **A:** [Answer 2]
+
+                    ...
 
+                    ONLY RETURN FAQ AND NOTHING ELSE
+                    """
 
+chain_registry.register("faq", FAQ_prompt_template, ["num_ques", "context"], k=5)
 
 
-def FAQ_creation(subject, vector_store_name, num_questions):
+def FAQ_creation(subject, vector_store_name, num_questions, retrieval_mode="dense"):
     """
     Generates student-friendly FAQs based on a given subject and vector store.
 
@@ -30,6 +37,7 @@ def FAQ_creation(subject, vector_store_name, num_questions):
         subject (str): The subject/topic to base the FAQs on.
         vector_store_name (str): Name of the FAISS vector store directory.
         num_questions (int): Number of FAQs to generate.
+        retrieval_mode (str): "dense" (FAISS only) or "hybrid" (BM25 + FAISS fused by rank).
 
     Returns:
         str: Formatted FAQ content.
@@ -40,16 +48,9 @@ def FAQ_creation(subject, vector_store_name, num_questions):
         vector_store_path = os.path.join(VECTORSORE_PATH, vector_store_name)
         print(f"📂 Loading vector store from: {vector_store_path}")
 
-        vector_store = FAISS.load_local(
-            vector_store_path, 
-            embeddings, 
-            allow_dangerous_deserialization=True
-        )
+        vector_store = load_vectorstore(vector_store_name)
 
-        retriever = vector_store.as_retriever(
-            search_type="similarity", 
-            search_kwargs={"k": 5}
-        )
+        retriever = chain_registry.retriever("faq", vector_store, vector_store_name, retrieval_mode)
         print("✅ Vector store loaded and retriever initialized.")
 
     except Exception as e:
@@ -61,38 +62,64 @@ def FAQ_creation(subject, vector_store_name, num_questions):
         full_text = "".join([doc.page_content for doc in content])
         print("📚 Retrieved and aggregated relevant content.")
 
-        prompt = PromptTemplate(
-            input_variables=["num_ques", "context"],
-            template="""
-                    You are an AI learning assistant that helps students study more effectively. Based on the content below, generate {num_ques} Frequently Asked Questions (FAQs) that serve as a structured learning guide for students.
+        FAQ_creator = chain_registry.chain("faq")
+        FAQ = FAQ_creator.invoke({
+            "num_ques": num_questions,
+            "context": full_text
+        })
 
-                    ### Context:
-                    {context}
+        print("✅ FAQ successfully generated.\n")
+        return FAQ
 
-                    Generate a list of {num_ques} guiding FAQs that cover the most important aspects of the material. These FAQs should help a student understand, review, and retain the content effectively.
+    except Exception as e:
+        print(f"❌ Error during FAQ generation: {e}")
+        return f"Error during FAQ generation: {str(e)}"
 
-                    ### Output Format:
-                    1. **Q:** [Question 1]  
-                    **A:** [Answer 1]
 
-                    2. **Q:** [Question 2]  
-                    **A:** [Answer 2]
+async def aprepare_FAQ_chain(subject, vector_store_name, num_questions, retrieval_mode="dense"):
+    """
+    Retrieve context for a subject and build the FAQ chain without running it,
+    so callers can stream the generation token by token.
 
-                    ...
+    Args:
+        subject (str): The subject/topic to base the FAQs on.
+        vector_store_name (str): Name of the FAISS vector store directory.
+        num_questions (int): Number of FAQs to generate.
+        retrieval_mode (str): "dense" (FAISS only) or "hybrid" (BM25 + FAISS fused by rank).
 
-                    ONLY RETURN FAQ AND NOTHING ELSE
-                    """
-            )
+    Returns:
+        Tuple[Runnable, dict, List[Document]]: The chain, its inputs and the retrieved documents.
+    """
+    vector_store = await aload_vectorstore(vector_store_name)
+    retriever = await chain_registry.aretriever("faq", vector_store, vector_store_name, retrieval_mode)
+    content = await retriever.ainvoke(subject)
+    full_text = "".join([doc.page_content for doc in content])
+    print("📚 Retrieved and aggregated relevant content.")
 
-        FAQ_creator = prompt | llm | StrOutputParser()
-        FAQ = FAQ_creator.invoke({
-            "num_ques": num_questions,
-            "context": full_text
-        })
+    FAQ_creator = chain_registry.chain("faq")
+    return FAQ_creator, {"num_ques": num_questions, "context": full_text}, content
+
+
+async def aFAQ_creation(subject, vector_store_name, num_questions, retrieval_mode="dense"):
+    """
+    Async variant of FAQ_creation: retrieval and generation run on the event loop
+    (`ainvoke`), so the request never blocks the server.
+
+    Returns:
+        str: Formatted FAQ content, or an "Error ..." message.
+    """
+    print(f"\n🔍 Starting FAQ generation for subject: '{subject}', Vector Store: '{vector_store_name}'")
 
+    try:
+        FAQ_creator, inputs, _ = await aprepare_FAQ_chain(subject, vector_store_name, num_questions, retrieval_mode)
+    except Exception as e:
+        print(f"❌ Error loading vector store: {e}")
+        return f"Error loading vector store: {str(e)}"
+
+    try:
+        FAQ = await FAQ_creator.ainvoke(inputs)
         print("✅ FAQ successfully generated.\n")
         return FAQ
-
     except Exception as e:
         print(f"❌ Error during FAQ generation: {e}")
         return f"Error during FAQ generation: {str(e)}"
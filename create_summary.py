@@ -1,21 +1,39 @@
-from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.output_parsers import StrOutputParser
-import torch
-from langchain.vectorstores import FAISS
-from configuration import llm,embeddings,VECTORSORE_PATH
+from configuration import VECTORSORE_PATH
+from vectorstore_registry import load_vectorstore, aload_vectorstore
+from chain_registry import chain_registry
 import os
 
 
 
+summary_prompt_template = """
+            You are a helpful tutor summarizing complex topics for high school students.
+
+            Using the context below, generate a clear and concise summary of **{subject}**.
+
+            The summary should:
+            1. Explain the main concepts and principles in simple language
+            2. Highlight key experiments or demonstrations
+            3. Mention important formulas or equations where relevant
+            4. Address any important or commonly asked questions
+            5. Be easy to follow, using bullet points or a numbered list for clarity
+
+            Context:
+            {context}
+
+            ONLY RETURN SUMMARY BELOW:
+            """
 
-def summary_creation(subject: str, vector_store_name: str) -> str:
+chain_registry.register("summary", summary_prompt_template, ["subject", "context"], k=5)
+
+
+def summary_creation(subject: str, vector_store_name: str, retrieval_mode: str = "dense") -> str:
     """
     Generate a student-friendly summary of a given subject using retrieved context from a vector store.
 
     Args:
         subject (str): The topic or question to summarize.
         vectorstore_path (str): Path to the saved FAISS vector store.
+        retrieval_mode (str): "dense" (FAISS only) or "hybrid" (BM25 + FAISS fused by rank).
 
     Returns:
         str: Summary text
@@ -23,7 +41,7 @@ def summary_creation(subject: str, vector_store_name: str) -> str:
     try:
         vector_store_path = os.path.join(VECTORSORE_PATH, vector_store_name)
         print(f"📂 Loading vector store from: {vector_store_path}")
-        vector_store = FAISS.load_local(vector_store_path, embeddings, allow_dangerous_deserialization=True)
+        vector_store = load_vectorstore(vector_store_name)
         print("✅ Vector store loaded successfully.")
     except Exception as e:
         print(f"❌ Error loading vector store: {e}")
@@ -31,7 +49,7 @@ def summary_creation(subject: str, vector_store_name: str) -> str:
 
     try:
         print(f"🔍 Retrieving documents for subject: '{subject}'")
-        retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": 5})
+        retriever = chain_registry.retriever("summary", vector_store, vector_store_name, retrieval_mode)
         content = retriever.invoke(subject)
         print(f"📄 Retrieved {len(content)} relevant documents.")
 
@@ -42,40 +60,66 @@ def summary_creation(subject: str, vector_store_name: str) -> str:
 
     try:
         print("🧠 Preparing summarization prompt...")
-        prompt = PromptTemplate(
-            template="""
-            You are a helpful tutor summarizing complex topics for high school students.
+        summary_creator = chain_registry.chain("summary")
+        print("✏️ Generating summary...")
+        summary = summary_creator.invoke({"subject": subject, "context": full_text})
+        print("✅ Summary generated successfully.")
+        return summary
 
-            Using the context below, generate a clear and concise summary of **{subject}**.
+    except Exception as e:
+        print(f"❌ Summarization failed: {e}")
+        return f"Error: Failed to generate summary. {str(e)}"
 
-            The summary should:
-            1. Explain the main concepts and principles in simple language
-            2. Highlight key experiments or demonstrations
-            3. Mention important formulas or equations where relevant
-            4. Address any important or commonly asked questions
-            5. Be easy to follow, using bullet points or a numbered list for clarity
 
-            Context:
-            {context}
+async def aprepare_summary_chain(subject: str, vector_store_name: str, retrieval_mode: str = "dense"):
+    """
+    Retrieve context for a subject and build the summary chain without running it,
+    so callers can stream the generation token by token.
+
+    Args:
+        subject (str): The topic or question to summarize.
+        vector_store_name (str): Name of the FAISS vector store.
+        retrieval_mode (str): "dense" (FAISS only) or "hybrid" (BM25 + FAISS fused by rank).
+
+    Returns:
+        Tuple[Runnable, dict, List[Document]]: The chain, its inputs and the retrieved documents.
+    """
+    vector_store = await aload_vectorstore(vector_store_name)
+    retriever = await chain_registry.aretriever("summary", vector_store, vector_store_name, retrieval_mode)
+    content = await retriever.ainvoke(subject)
+    print(f"📄 Retrieved {len(content)} relevant documents.")
+
+    full_text = "".join([doc.page_content for doc in content])
+    summary_creator = chain_registry.chain("summary")
+    return summary_creator, {"subject": subject, "context": full_text}, content
 
-            ONLY RETURN SUMMARY BELOW:
-            """,
-            input_variables=["subject", "context"]
-        )
 
-        summary_creator = prompt | llm | StrOutputParser()
+async def asummary_creation(subject: str, vector_store_name: str, retrieval_mode: str = "dense") -> str:
+    """
+    Async variant of summary_creation: retrieval and generation run on the event loop
+    (`ainvoke`), so many summaries can be in flight without holding a thread each.
+
+    Returns:
+        str: Summary text, or an "Error: ..." message.
+    """
+    try:
+        print(f"🔍 Retrieving documents for subject: '{subject}'")
+        summary_creator, inputs, _ = await aprepare_summary_chain(subject, vector_store_name, retrieval_mode)
+    except Exception as e:
+        print(f"❌ Retrieval failed: {e}")
+        return f"Error: Failed to retrieve documents. {str(e)}"
+
+    try:
         print("✏️ Generating summary...")
-        summary = summary_creator.invoke({"subject": subject, "context": full_text})
+        summary = await summary_creator.ainvoke(inputs)
         print("✅ Summary generated successfully.")
         return summary
-
     except Exception as e:
         print(f"❌ Summarization failed: {e}")
         return f"Error: Failed to generate summary. {str(e)}"
 
 
 
-
 # sample_summary = summary_creation("Thrust and Pressure", "Science")
 
 # print(sample_summary)
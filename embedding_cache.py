@@ -0,0 +1,152 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from configuration import model_name, encode_kwargs
+from configuration import EMBEDDING_CACHE_PATH
+from models import get_embeddings
+
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH_SIZE = 500
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent on-disk cache of chunk embeddings keyed by
+    (model name, normalize flag, SHA-256 of the chunk text).
+
+    The same textbook ingested into several stores is embedded only once.
+    """
+
+    def __init__(self, path: str, model: str, normalize: bool):
+        self.path = path
+        self.model = model
+        self.normalize = int(bool(normalize))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Caller holds self._lock. Opened on first use rather than at import (like the
+        # models in models.py), so a missing or unwritable cache path cannot stop the API
+        # from starting.
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    normalize INTEGER NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model, normalize, text_hash)
+                )
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, hashes: list) -> dict:
+        """
+        Look up many chunk hashes at once.
+
+        Returns:
+            dict: text_hash -> float32 vector (as a list) for every hash found.
+        """
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+                batch = hashes[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection().execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND normalize = ? AND text_hash IN ({placeholders})",
+                    [self.model, self.normalize, *batch]
+                ).fetchall()
+                for hash_value, blob in rows:
+                    found[hash_value] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, items: dict):
+        """
+        Store embeddings for many chunk hashes (text_hash -> vector).
+        """
+        rows = [
+            (self.model, self.normalize, hash_value, np.asarray(vector, dtype=np.float32).tobytes())
+            for hash_value, vector in items.items()
+        ]
+        with self._lock:
+            conn = self._connection()
+            conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            conn.commit()
+
+    def embed_texts(self, texts: list, embed_fn=None) -> list:
+        """
+        Embed chunk texts, computing only the ones not already in the cache.
+
+        Args:
+            texts (list): Chunk texts.
+            embed_fn (callable, optional): Computes embeddings for the misses.
+                Defaults to the shared model's `embed_documents`.
+
+        Returns:
+            List[List[float]]: One embedding per input text, in input order.
+        """
+        hashes = [text_hash(text) for text in texts]
+        cached = self.get_many(list(set(hashes)))
+
+        # Identical chunks within one call are embedded once
+        missing = {}
+        for hash_value, text in zip(hashes, texts):
+            if hash_value not in cached and hash_value not in missing:
+                missing[hash_value] = text
+
+        if missing:
+            vectors = (embed_fn or get_embeddings().embed_documents)(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.put_many(computed)
+            cached.update(computed)
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+        print(f"🗃️ Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} computed")
+        return [cached[hash_value] for hash_value in hashes]
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            hits, misses = self.hits, self.misses
+        size_bytes = sum(
+            os.path.getsize(self.path + suffix)
+            for suffix in ("", "-wal")
+            if os.path.exists(self.path + suffix)
+        )
+        return {
+            "path": self.path,
+            "entries": entries,
+            "size_mb": round(size_bytes / (1024 * 1024), 2),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+embedding_cache = EmbeddingCache(
+    EMBEDDING_CACHE_PATH,
+    model=model_name,
+    normalize=encode_kwargs.get("normalize_embeddings", False),
+)
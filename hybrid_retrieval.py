@@ -0,0 +1,161 @@
+import asyncio
+from typing import Any, List, Optional
+
+import faiss
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from ann_index import search_parameters
+from configuration import HYBRID_FETCH_K, RRF_K
+from sparse_index import sparse_indexes
+
+
+# "dense": FAISS similarity only (the original behaviour); "hybrid": BM25 + FAISS fused by RRF
+RETRIEVAL_MODES = ("dense", "hybrid")
+
+
+def reciprocal_rank_fusion(rankings: list, rrf_k: int = RRF_K) -> list:
+    """
+    Fuse several ranked id lists: every list adds 1 / (rrf_k + rank) to an id's score.
+
+    Returns:
+        List[str]: Ids ordered by fused score, best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def embed_queries(embeddings, questions: list) -> np.ndarray:
+    """
+    Embed many questions in one batched encode call. Matches `embed_query` vector for
+    vector: same BGE query instruction, newlines flattened the same way.
+    """
+    texts = [embeddings.query_instruction + question.replace("\n", " ") for question in questions]
+    return np.asarray(embeddings.client.encode(texts, **embeddings.encode_kwargs), dtype=np.float32)
+
+
+def dense_search_ids_batch(vector_store, query_vectors: np.ndarray, k: int, nprobe: int = None,
+                           ef_search: int = None) -> list:
+    """
+    Docstore ids of the `k` nearest chunks for every row of `query_vectors`, with a single
+    FAISS search over the whole matrix.
+
+    Returns:
+        List[List[str]]: One ranked id list per query.
+    """
+    vectors = np.array(query_vectors, dtype=np.float32)
+    if vector_store._normalize_L2:
+        faiss.normalize_L2(vectors)
+    params = search_parameters(vector_store.index, nprobe, ef_search)
+    if params is None:
+        _, positions = vector_store.index.search(vectors, k)
+    else:
+        _, positions = vector_store.index.search(vectors, k, params=params)
+    return [[vector_store.index_to_docstore_id[position] for position in row if position != -1] for row in positions]
+
+
+def dense_search_ids(vector_store, query: str, k: int, nprobe: int = None, ef_search: int = None) -> list:
+    """
+    Docstore ids of the `k` nearest chunks, searching the FAISS index directly so that
+    per-query nprobe (IVF) / efSearch (HNSW) can be applied.
+    """
+    vector = np.asarray([vector_store._embed_query(query)], dtype=np.float32)
+    return dense_search_ids_batch(vector_store, vector, k, nprobe, ef_search)[0]
+
+
+class DenseRetriever(BaseRetriever):
+    """
+    FAISS similarity retriever with per-query nprobe / efSearch for approximate indexes.
+    """
+
+    vector_store: Any
+    k: int = 4
+    nprobe: Optional[int] = None
+    ef_search: Optional[int] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        doc_ids = dense_search_ids(self.vector_store, query, self.k, self.nprobe, self.ef_search)
+        return [self.vector_store.docstore.search(doc_id) for doc_id in doc_ids]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retrieves the top `fetch_k` chunks from the FAISS index and from the store's BM25
+    index and returns the best `k` by reciprocal-rank fusion, so exact keyword matches
+    (formulas, named experiments, chapter terms) surface even when the embedding misses them.
+    """
+
+    vector_store: Any
+    sparse_index: Any
+    k: int = 4
+    fetch_k: int = HYBRID_FETCH_K
+    rrf_k: int = RRF_K
+    nprobe: Optional[int] = None
+    ef_search: Optional[int] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        dense_ids = dense_search_ids(self.vector_store, query, self.fetch_k, self.nprobe, self.ef_search)
+        sparse_ids = [doc_id for doc_id, _ in self.sparse_index.search(query, self.fetch_k)]
+        fused_ids = reciprocal_rank_fusion([dense_ids, sparse_ids], self.rrf_k)[:self.k]
+        return [self.vector_store.docstore.search(doc_id) for doc_id in fused_ids]
+
+
+def build_retriever(vector_store, vector_store_name: str, k: int, retrieval_mode: str = "dense",
+                    nprobe: int = None, ef_search: int = None):
+    """
+    Retriever for `retrieval_mode` over a loaded store, returning the top `k` chunks.
+    `nprobe` / `ef_search` override the index defaults for IVF / HNSW stores (ignored otherwise).
+    """
+    if retrieval_mode == "dense":
+        if nprobe is None and ef_search is None:
+            return vector_store.as_retriever(search_type="similarity", search_kwargs={"k": k})
+        return DenseRetriever(vector_store=vector_store, k=k, nprobe=nprobe, ef_search=ef_search)
+    if retrieval_mode == "hybrid":
+        sparse_index = sparse_indexes.get(vector_store_name, vector_store)
+        return HybridRetriever(
+            vector_store=vector_store, sparse_index=sparse_index, k=k, nprobe=nprobe, ef_search=ef_search
+        )
+    raise ValueError(f"Unknown retrieval mode '{retrieval_mode}'. Expected one of: {', '.join(RETRIEVAL_MODES)}")
+
+
+def retrieve_batch(vector_store, vector_store_name: str, questions: list, query_vectors: np.ndarray, k: int,
+                   retrieval_mode: str = "dense", nprobe: int = None, ef_search: int = None) -> list:
+    """
+    Top-k chunks for many questions at once: the dense side is one FAISS search over the
+    matrix of query vectors (from embed_queries); in hybrid mode each question's BM25
+    ranking is fused with its dense ranking as in HybridRetriever.
+
+    Returns:
+        List[List[Document]]: The retrieved chunks of every question, in question order.
+    """
+    if retrieval_mode == "dense":
+        rankings = dense_search_ids_batch(vector_store, query_vectors, k, nprobe, ef_search)
+    elif retrieval_mode == "hybrid":
+        sparse_index = sparse_indexes.get(vector_store_name, vector_store)
+        dense_rankings = dense_search_ids_batch(vector_store, query_vectors, HYBRID_FETCH_K, nprobe, ef_search)
+        rankings = [
+            reciprocal_rank_fusion(
+                [dense_ids, [doc_id for doc_id, _ in sparse_index.search(question, HYBRID_FETCH_K)]]
+            )[:k]
+            for question, dense_ids in zip(questions, dense_rankings)
+        ]
+    else:
+        raise ValueError(f"Unknown retrieval mode '{retrieval_mode}'. Expected one of: {', '.join(RETRIEVAL_MODES)}")
+    return [[vector_store.docstore.search(doc_id) for doc_id in doc_ids] for doc_ids in rankings]
+
+
+async def abuild_retriever(vector_store, vector_store_name: str, k: int, retrieval_mode: str = "dense",
+                           nprobe: int = None, ef_search: int = None):
+    """
+    Async variant of build_retriever: a BM25 index that is not in memory yet is loaded
+    (or built) in a worker thread.
+    """
+    args = (vector_store, vector_store_name, k, retrieval_mode, nprobe, ef_search)
+    if retrieval_mode == "hybrid" and sparse_indexes.peek(vector_store_name) is None:
+        return await asyncio.to_thread(build_retriever, *args)
+    return build_retriever(*args)
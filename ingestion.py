@@ -1,39 +1,35 @@
 import os
-import torch
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from itertools import islice
+import numpy as np
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores import FAISS
-from langchain.embeddings import HuggingFaceBgeEmbeddings
 from langchain.schema import Document
-from docling.document_converter import DocumentConverter
-
-
-from configuration import embeddings
-from configuration import DIRECTORY_PATH,VECTORSORE_PATH
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
+from conversion_worker import init_worker, convert_pdf
+from conversion_cache import conversion_cache, file_digest
 
 
+from models import get_embeddings
+from configuration import DIRECTORY_PATH,VECTORSORE_PATH
+from configuration import CONVERSION_MAX_WORKERS, EMBEDDING_BATCH_SIZE, FAISS_INDEX_TYPE
+from configuration import INGESTION_DOCUMENT_QUEUE_SIZE, INGESTION_CHUNK_QUEUE_SIZE, INGESTION_EMBED_BATCH_CHUNKS
+from configuration import CHUNK_DEDUP_ENABLED
+from chunk_dedup import ChunkDeduplicator
+from ann_index import StreamingIndexBuilder, remove_documents
+from vectorstore_registry import invalidate_vectorstore, vectorstore_version
+from columnar_docstore import DocstoreWriter, save_faiss_store, read_faiss_store, write_faiss_index
+from columnar_docstore import new_snapshot, publish_snapshot, discard_snapshot, convert_legacy_store
+from embedding_cache import embedding_cache
+from topic_model import topic_models
+from sparse_index import sparse_indexes
 
-# Initialize device for embeddings (CUDA if available)
-print("=" * 100)
-try:
-    cuda_available = torch.cuda.is_available()
-    print(f"✅ CUDA Available: {cuda_available}")
-    DEVICE = "cuda" if cuda_available else "cpu"
-    print(f"🧠 Using torch version: {torch.__version__} | Device: {DEVICE}")
-except Exception as e:
-    print(f"❌ Error checking Torch CUDA availability: {e}")
-    DEVICE = "cpu"
-print("=" * 100)
 
-# # Set up HuggingFace embedding model
-# model_name = "BAAI/bge-small-en-v1.5"
-# model_kwargs = {'device': DEVICE}
-# encode_kwargs = {'normalize_embeddings': True}
-# embeddings = HuggingFaceBgeEmbeddings(
-#     model_name=model_name,
-#     model_kwargs=model_kwargs,
-#     encode_kwargs=encode_kwargs
-# )
 
 
 def write_to_file(filename, text):
@@ -46,56 +42,558 @@ def write_to_file(filename, text):
 
 
 
-def create_vectorstore_from_pdfs(pdf_filenames: list, vectorstore_name: str):
+def report_progress(progress_callback, stage: str, filename: str = None, **details):
     """
-    Create a FAISS vector store from a list of PDF files.
+    Forward a pipeline progress event to the optional callback, never letting a
+    reporting failure break ingestion.
+    """
+    if progress_callback is None:
+        return
+    try:
+        progress_callback(stage, filename, **details)
+    except Exception as e:
+        print(f"⚠️ Progress callback failed at stage '{stage}': {e}")
+
+
+def convert_pdfs(pdf_paths: list, max_workers: int = CONVERSION_MAX_WORKERS):
+    """
+    Convert PDFs to markdown, using a pool of worker processes when max_workers > 1.
+
+    PDFs whose bytes were converted before by the same docling version are read from
+    the conversion cache when their turn comes. Each worker keeps its own warm
+    DocumentConverter, and only a few conversions are in flight at a time, so results
+    never pile up ahead of a slow consumer. Results are yielded in input order as soon
+    as each slot is ready, and a failing file only fails its own slot.
 
     Args:
-        pdf_filenames (list): List of PDF file names (just file names, not full paths).
-        vectorstore_name (str): Name for the output vector store (folder under 'Vectorstore').
+        pdf_paths (list): Full paths of the PDF files.
+        max_workers (int): Number of conversion processes (1 converts in-process).
+
+    Yields:
+        Tuple[str, str, str]: (pdf_path, markdown_text, error) with exactly one of markdown_text/error set.
+    """
+    # Unchanged PDFs are served from the conversion cache without touching docling
+    digests, cached = [], set()
+    for pdf_path in pdf_paths:
+        try:
+            digest = file_digest(pdf_path)
+        except OSError:
+            digest = None
+        digests.append(digest)
+        if digest is not None and conversion_cache.contains(digest):
+            cached.add(digest)
+
+    # Repeated copies of the same PDF in one run are converted only once
+    to_convert, pending = [], set()
+    for pdf_path, digest in zip(pdf_paths, digests):
+        if digest in cached or (digest is not None and digest in pending):
+            continue
+        to_convert.append(pdf_path)
+        if digest is not None:
+            pending.add(digest)
+    if len(to_convert) < len(pdf_paths):
+        print(f"🗃️ Conversion cache: {len(pdf_paths) - len(to_convert)} of {len(pdf_paths)} PDFs need no conversion")
+
+    max_workers = max(1, min(max_workers, len(to_convert)))
+    if max_workers == 1:
+        converted = (convert_pdf(pdf_path) for pdf_path in to_convert)
+        yield from _merge_conversions(pdf_paths, digests, cached, converted)
+        return
+
+    print(f"🧵 Converting {len(to_convert)} PDFs with {max_workers} worker processes...")
+    # "spawn" keeps CUDA/torch state from the parent out of the workers
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker
+    ) as pool:
+        converted = _bounded_map(pool, convert_pdf, to_convert, window=2 * max_workers)
+        yield from _merge_conversions(pdf_paths, digests, cached, converted)
+
+
+def _bounded_map(pool, fn, items: list, window: int):
+    """
+    Like `pool.map`, but with at most `window` tasks submitted ahead of the consumer.
+    """
+    items = iter(items)
+    pending = deque(pool.submit(fn, item) for item in islice(items, window))
+    while pending:
+        result = pending.popleft().result()
+        for item in islice(items, 1):
+            pending.append(pool.submit(fn, item))
+        yield result
+
+
+def _merge_conversions(pdf_paths: list, digests: list, cached: set, converted):
+    """
+    Interleave cache hits with freshly converted results in input order, storing
+    every successful conversion in the cache. Cache hits are read from disk one at a
+    time, so only the markdown being yielded is held in memory.
+    """
+    failed = {}
+    kept = {}  # conversions that could not be cached but are repeated later in the run
+    for pdf_path, digest in zip(pdf_paths, digests):
+        if digest in cached:
+            markdown_text = kept.get(digest) or conversion_cache.get(digest)
+            if markdown_text is None:
+                # Entry pruned since the lookup: convert it again in-process
+                markdown_text, error = convert_pdf(pdf_path)
+                yield pdf_path, markdown_text, error
+                continue
+            yield pdf_path, markdown_text, None
+            continue
+        if digest is not None and digest in failed:
+            yield pdf_path, None, failed[digest]
+            continue
+        markdown_text, error = next(converted)
+        if error is None and digest is not None:
+            try:
+                conversion_cache.put(digest, markdown_text)
+            except OSError as e:
+                print(f"⚠️ Could not cache conversion of {pdf_path}: {e}")
+                if digests.count(digest) > 1:
+                    kept[digest] = markdown_text
+            cached.add(digest)
+        elif digest is not None:
+            failed[digest] = error
+        yield pdf_path, markdown_text, error
+
+
+def embed_chunks_bucketed(texts: list, batch_size: int = EMBEDDING_BATCH_SIZE) -> list:
+    """
+    Embed chunk texts in length-sorted batches to minimise padding on CPU.
+
+    Texts are ordered by token length, so each batch holds chunks of similar length,
+    encoded batch by batch through `embeddings.client` (the SentenceTransformer), and
+    then put back in input order. Produces the same vectors as `embeddings.embed_documents`.
+
+    Args:
+        texts (list): Chunk texts.
+        batch_size (int): Number of chunks per encode call.
 
     Returns:
-        None
+        List[List[float]]: One embedding per input text, in input order.
     """
-    print("🚀 Starting PDF ingestion and vector store creation pipeline...")
-    converter = DocumentConverter()
-    documents = []
+    if not texts:
+        return []
+
+    start_time = time.perf_counter()
+    embeddings = get_embeddings()
+    model = embeddings.client
+    # HuggingFaceBgeEmbeddings.embed_documents flattens newlines before encoding
+    texts = [text.replace("\n", " ") for text in texts]
+    token_ids = model.tokenizer(texts, truncation=True, max_length=model.max_seq_length)["input_ids"]
+    order = sorted(range(len(texts)), key=lambda i: len(token_ids[i]))
+
+    vectors = [None] * len(texts)
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+        bucket_vectors = model.encode(
+            [texts[i] for i in bucket],
+            batch_size=len(bucket),
+            show_progress_bar=False,
+            **embeddings.encode_kwargs
+        )
+        for i, vector in zip(bucket, bucket_vectors):
+            vectors[i] = vector.tolist()
+
+    elapsed = time.perf_counter() - start_time
+    print(f"⚡ Embedded {len(texts)} chunks in {elapsed:.2f}s ({len(texts) / max(elapsed, 1e-9):.1f} chunks/s, batch size {batch_size})")
+    return vectors
+
+
+_STREAM_END = object()
+
 
-    for filename in pdf_filenames:
-        pdf_path = os.path.join(DIRECTORY_PATH, filename)
-        print(f"📄 Converting PDF: {pdf_path}")
+def run_stage(source, maxsize: int, name: str):
+    """
+    Run a generator in a background thread and yield its items through a bounded queue.
+
+    The producer blocks once `maxsize` items are waiting, so a stage runs ahead of its
+    consumer by at most that many items and consecutive stages overlap. An exception in
+    the producer is re-raised in the consumer. If the consumer stops early, the producer
+    stops and closes its source.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
         try:
-            result = converter.convert(pdf_path)
-            markdown_text = result.document.export_to_markdown()
+            for item in source:
+                if not put((item, None)):
+                    return
+            put((_STREAM_END, None))
+        except BaseException as e:
+            put((_STREAM_END, e))
+        finally:
+            if hasattr(source, "close"):
+                source.close()
+
+    thread = threading.Thread(target=produce, name=f"ingestion-{name}", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is _STREAM_END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+
+
+def iter_pdf_documents(pdf_filenames: list, progress_callback=None, conversion_workers: int = CONVERSION_MAX_WORKERS):
+    """
+    Convert PDF files under DIRECTORY_PATH into one markdown Document per file.
+
+    Yields:
+        Tuple[str, Document]: (filename, document) for every successfully converted file;
+        failed files are reported and skipped.
+    """
+    pdf_paths = [os.path.join(DIRECTORY_PATH, filename) for filename in pdf_filenames]
+    conversions = convert_pdfs(pdf_paths, max_workers=conversion_workers)
+    for filename, (pdf_path, markdown_text, error) in zip(pdf_filenames, conversions):
+        if error is None:
             # write_to_file("output.txt", markdown_text)
-            document = Document(page_content=markdown_text,metadata={"source": pdf_path})
-            documents.append(document)
             print(f"✅ Successfully converted: {filename}")
-        except Exception as e:
-            print(f"❌ Failed to convert {filename}: {e}")
+            report_progress(progress_callback, "converted", filename, characters=len(markdown_text))
+            yield filename, Document(page_content=markdown_text, metadata={"source": pdf_path})
+        else:
+            print(f"❌ Failed to convert {filename}: {error}")
+            report_progress(progress_callback, "failed", filename, error=error)
 
-    if not documents:
-        print("⚠️ No valid documents were loaded. Aborting vector store creation.")
-        return
 
-    print("✂️ Splitting documents into chunks...")
+def iter_chunks(documents, progress_callback=None):
+    """
+    Split converted documents into overlapping chunks one document at a time.
+
+    Yields:
+        Document: The chunks, each carrying its source PDF path in metadata.
+    """
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    split_texts = text_splitter.split_documents(documents)
-    print(f"🔍 Total chunks created: {len(split_texts)}")
+    for filename, document in documents:
+        chunks = text_splitter.split_documents([document])
+        if chunks:
+            report_progress(progress_callback, "chunked", filename, chunks=len(chunks))
+        yield from chunks
+
+
+def iter_unique_chunks(chunks, deduplicator: ChunkDeduplicator = None, duplicate_sources: dict = None):
+    """
+    Give every chunk a docstore id and, with a deduplicator, drop exact and near-duplicate
+    chunks before they are embedded. The source of a dropped chunk is added to
+    `duplicate_sources[kept_id]` when it differs from the kept chunk's own source.
+
+    Yields:
+        Tuple[str, Document]: (doc_id, chunk) for every kept chunk.
+    """
+    for chunk in chunks:
+        doc_id = str(uuid.uuid4())
+        source = chunk.metadata.get("source")
+        if deduplicator is None:
+            yield doc_id, chunk
+            continue
+        kept = deduplicator.check(chunk.page_content, (doc_id, source))
+        if kept is None:
+            yield doc_id, chunk
+        elif kept[1] != source and duplicate_sources is not None:
+            duplicate_sources.setdefault(kept[0], set()).add(source)
+
+
+def register_stored_chunks(deduplicator: ChunkDeduplicator, vectorstore, skip_sources: set) -> int:
+    """
+    Register the chunks already in a store with `deduplicator`, so new chunks that
+    duplicate them are dropped as well. Chunks of `skip_sources` (files being re-added or
+    removed) are left out, since they are about to be deleted.
 
-    print("📊 Generating vector store using FAISS...")
+    Returns:
+        int: Number of chunks registered.
+    """
+    registered = 0
+    for doc_id, doc in vectorstore.docstore._dict.items():
+        source = doc.metadata.get("source")
+        if source not in skip_sources:
+            deduplicator.register(doc.page_content, (doc_id, source))
+            registered += 1
+    return registered
+
+
+def iter_embedded_batches(pdf_filenames: list, progress_callback=None,
+                          conversion_workers: int = CONVERSION_MAX_WORKERS,
+                          deduplicator: ChunkDeduplicator = None, duplicate_sources: dict = None):
+    """
+    Streaming ingestion pipeline: convert -> split -> dedup -> embed, one bounded batch at a time.
+
+    Conversion and splitting run in their own threads behind bounded queues
+    (INGESTION_DOCUMENT_QUEUE_SIZE documents, INGESTION_CHUNK_QUEUE_SIZE chunks) and
+    overlap with embedding in the caller's thread, so peak memory is set by the queue
+    and batch sizes rather than by the size of the corpus. See iter_unique_chunks for
+    `deduplicator` and `duplicate_sources`.
+
+    Yields:
+        Tuple[List[str], List[Document], List[List[float]]]: Docstore ids, up to
+        INGESTION_EMBED_BATCH_CHUNKS chunks, and their embeddings.
+    """
+    documents = run_stage(
+        iter_pdf_documents(pdf_filenames, progress_callback, conversion_workers), INGESTION_DOCUMENT_QUEUE_SIZE, "convert"
+    )
+    chunks = run_stage(iter_chunks(documents, progress_callback), INGESTION_CHUNK_QUEUE_SIZE, "split")
+    unique_chunks = iter_unique_chunks(chunks, deduplicator, duplicate_sources)
+    while True:
+        batch = list(islice(unique_chunks, INGESTION_EMBED_BATCH_CHUNKS))
+        if not batch:
+            return
+        doc_ids = [doc_id for doc_id, _ in batch]
+        batch_chunks = [chunk for _, chunk in batch]
+        texts = [chunk.page_content for chunk in batch_chunks]
+        yield doc_ids, batch_chunks, embedding_cache.embed_texts(texts, embed_fn=embed_chunks_bucketed)
+
+
+def report_deduplication(deduplicator: ChunkDeduplicator):
+    if deduplicator is None:
+        return
+    stats = deduplicator.stats()
+    print(
+        f"🧬 Dedup: kept {stats['kept']} chunks, dropped {stats['exact_duplicates']} exact and "
+        f"{stats['near_duplicates']} near duplicates ({stats['embeddings_saved']} embeddings saved)"
+    )
+
+
+def prune_stale_sources(vectorstore, doc_sources: dict, stale_sources: set):
+    """
+    Work out which existing chunks to delete when `stale_sources` are removed or replaced.
+
+    A chunk from a stale source is still kept if one of its `duplicate_sources` stays in
+    the store, because those files' copies were dropped as duplicates of it. It is then
+    re-attributed to a remaining source. Stale entries are dropped from the
+    `duplicate_sources` of kept chunks.
+
+    Args:
+        doc_sources (dict): {doc_id: (source, duplicate_sources)} of the chunks that were
+            in the store before this update.
+
+    Returns:
+        Tuple[List[str], int]: (ids to delete, number of chunks whose metadata changed).
+    """
+    stale_ids, relabelled = [], 0
+    for doc_id, (source, duplicates) in doc_sources.items():
+        remaining = [duplicate for duplicate in duplicates if duplicate not in stale_sources]
+        if source in stale_sources and not remaining:
+            stale_ids.append(doc_id)
+            continue
+        if source not in stale_sources and len(remaining) == len(duplicates):
+            continue
+        metadata = vectorstore.docstore.search(doc_id).metadata
+        if source in stale_sources:
+            source = remaining.pop(0)
+            metadata["source"] = source
+        if remaining:
+            metadata["duplicate_sources"] = remaining
+        else:
+            metadata.pop("duplicate_sources", None)
+        relabelled += 1
+    return stale_ids, relabelled
+
+
+def refresh_derived_indexes(vectorstore_name: str, vectorstore, reuse_num_topics: bool = False):
+    """
+    Build and save the store's BM25 index and LDA topic model right after the store was
+    written, so hybrid retrieval and /generate-important-topics/ never build them on the
+    request path. A failure here only logs: the index or model is then built on first use.
+    Incremental updates pass `reuse_num_topics` to skip the topic-count sweep.
+    """
+    try:
+        sparse_indexes.build(vectorstore_name, vectorstore)
+    except Exception as e:
+        print(f"⚠️ Failed to build BM25 index for '{vectorstore_name}': {e}")
+    try:
+        topic_models.train(vectorstore_name, vectorstore, reuse_num_topics)
+    except Exception as e:
+        print(f"⚠️ Failed to train topic model for '{vectorstore_name}': {e}")
+
+
+
+def create_vectorstore_from_pdfs(pdf_filenames: list, vectorstore_name: str, progress_callback=None,
+                                 conversion_workers: int = CONVERSION_MAX_WORKERS, index_type: str = None):
+    """
+    Create a FAISS vector store from a list of PDF files.
+
+    Args:
+        pdf_filenames (list): List of PDF file names (just file names, not full paths).
+        vectorstore_name (str): Name for the output vector store (folder under 'Vectorstore').
+        progress_callback (callable, optional): Called as `progress_callback(stage, filename, **details)`
+            with stage one of "converted", "failed", "chunked", "embedded" or "saved".
+        conversion_workers (int): Number of PDF conversion processes (1 converts in-process).
+        index_type (str, optional): FAISS index type ("flat", "ivf_flat", "ivf_pq", "hnsw");
+            defaults to FAISS_INDEX_TYPE.
+
+    Returns:
+        str: Path of the saved vector store, or None if no document could be converted.
+    """
+    print("🚀 Starting PDF ingestion and vector store creation pipeline...")
     vectorstore_path = os.path.join(VECTORSORE_PATH, vectorstore_name)
+    created = not os.path.isdir(vectorstore_path)
     os.makedirs(vectorstore_path, exist_ok=True)
 
+    # Chunks go straight to the on-disk docstore and vectors into the index as each batch
+    # is embedded; neither the markdown nor the chunk texts of the corpus are kept in memory.
+    # Both go to a new snapshot that readers only see once it is published whole.
+    snapshot_path = new_snapshot(vectorstore_path)
+    docstore_writer = DocstoreWriter(snapshot_path)
+    index_builder = StreamingIndexBuilder(index_type or FAISS_INDEX_TYPE)
+    deduplicator = ChunkDeduplicator() if CHUNK_DEDUP_ENABLED else None
+    duplicate_sources = {}
     try:
-        vectorstore = FAISS.from_documents(split_texts, embedding=embeddings)
-        vectorstore.save_local(vectorstore_path)
+        batches = iter_embedded_batches(
+            pdf_filenames, progress_callback, conversion_workers, deduplicator, duplicate_sources
+        )
+        for doc_ids, chunks, vectors in batches:
+            index_builder.add(np.asarray(vectors, dtype=np.float32))
+            for doc_id, chunk in zip(doc_ids, chunks):
+                docstore_writer.add(doc_id, chunk)
+            print(f"📊 Indexed {len(docstore_writer)} chunks so far")
+        for doc_id, sources in duplicate_sources.items():
+            docstore_writer.update_metadata(doc_id, {"duplicate_sources": sorted(sources)})
+        report_deduplication(deduplicator)
+
+        if not len(docstore_writer):
+            docstore_writer.abort()
+            discard_snapshot(snapshot_path)
+            if created:
+                os.rmdir(vectorstore_path)
+            print("⚠️ No valid documents were loaded. Aborting vector store creation.")
+            return
+
+        duplicates = deduplicator.stats()["embeddings_saved"] if deduplicator else 0
+        report_progress(progress_callback, "embedded", chunks=len(docstore_writer), duplicates=duplicates)
+        docstore_writer.commit()
+        write_faiss_index(snapshot_path, index_builder.finish())
+        publish_snapshot(vectorstore_path, snapshot_path)
+        invalidate_vectorstore(vectorstore_name)
+        refresh_derived_indexes(vectorstore_name, read_faiss_store(vectorstore_path, get_embeddings()))
+        report_progress(progress_callback, "saved", path=vectorstore_path)
         print(f"✅ Vector store saved at: {vectorstore_path}")
     except Exception as e:
+        docstore_writer.abort()
+        discard_snapshot(snapshot_path)
         print(f"❌ Failed to create/save vector store: {e}")
         raise
 
     print("🏁 Vector store creation pipeline completed successfully.")
+    return vectorstore_path
+
+
+
+def update_vectorstore(vectorstore_name: str, add_filenames: list = None, remove_filenames: list = None,
+                       progress_callback=None, conversion_workers: int = CONVERSION_MAX_WORKERS):
+    """
+    Incrementally add and/or remove PDF files in an existing FAISS vector store.
+
+    Only the added files are converted and embedded, through the same streaming pipeline
+    as create_vectorstore_from_pdfs; their vectors are appended with `add_embeddings`
+    batch by batch. Chunks of removed files are deleted by docstore id. Re-adding a
+    file that is already indexed replaces its old chunks. New chunks are deduplicated
+    against each other and against the chunks already in the store; a duplicate of a
+    stored chunk only adds its file to that chunk's `duplicate_sources`.
+
+    Only conversion and embedding are incremental. The whole store is read into memory
+    (index plus an InMemoryDocstore) and written back as a complete new snapshot, so
+    every update costs memory and disk I/O proportional to the store size, not to the
+    number of files changed.
+
+    Args:
+        vectorstore_name (str): Name of the existing vector store.
+        add_filenames (list, optional): PDF file names (under DIRECTORY_PATH) to add.
+        remove_filenames (list, optional): PDF file names whose chunks should be removed.
+        progress_callback (callable, optional): Same contract as in create_vectorstore_from_pdfs,
+            plus a store-level "removed" stage.
+        conversion_workers (int): Number of PDF conversion processes (1 converts in-process).
+
+    Returns:
+        str: Path of the saved vector store, or None if there was nothing to change.
+    """
+    add_filenames = add_filenames or []
+    remove_filenames = remove_filenames or []
+    vectorstore_path = os.path.join(VECTORSORE_PATH, vectorstore_name)
+    if vectorstore_version(vectorstore_name) is None:
+        raise FileNotFoundError(f"Vector store '{vectorstore_name}' does not exist.")
+
+    print(f"🔄 Updating vector store '{vectorstore_name}': +{len(add_filenames)} / -{len(remove_filenames)} files")
+    convert_legacy_store(vectorstore_path)
+    # Work on a private copy: the registry's cached instance may be serving queries right now
+    vectorstore = read_faiss_store(vectorstore_path, get_embeddings(), writable=True)
+
+    # Only ids present before this update can be stale; new chunks get fresh ids
+    doc_sources = {
+        doc_id: (doc.metadata.get("source"), doc.metadata.get("duplicate_sources", []))
+        for doc_id, doc in vectorstore.docstore._dict.items()
+    }
+
+    try:
+        deduplicator = ChunkDeduplicator() if CHUNK_DEDUP_ENABLED else None
+        if deduplicator is not None:
+            replaced_sources = {os.path.join(DIRECTORY_PATH, filename) for filename in add_filenames + remove_filenames}
+            registered = register_stored_chunks(deduplicator, vectorstore, replaced_sources)
+            print(f"🧬 Dedup: checking new chunks against {registered} stored chunks")
+        duplicate_sources = {}
+        added_sources = set()
+        num_added = 0
+        batches = iter_embedded_batches(
+            add_filenames, progress_callback, conversion_workers, deduplicator, duplicate_sources
+        )
+        for doc_ids, chunks, vectors in batches:
+            vectorstore.add_embeddings(
+                list(zip((chunk.page_content for chunk in chunks), vectors)),
+                metadatas=[chunk.metadata for chunk in chunks],
+                ids=doc_ids
+            )
+            added_sources.update(chunk.metadata["source"] for chunk in chunks)
+            num_added += len(chunks)
+        # Files whose every chunk was a duplicate of another file are re-added too
+        added_sources.update(source for sources in duplicate_sources.values() for source in sources)
+        if num_added:
+            print(f"➕ Added {num_added} new chunks.")
+        report_deduplication(deduplicator)
+
+        # Replace chunks of re-added files as well as those explicitly removed
+        stale_sources = {os.path.join(DIRECTORY_PATH, filename) for filename in remove_filenames} | added_sources
+        stale_ids, relabelled = prune_stale_sources(vectorstore, doc_sources, stale_sources)
+        # After pruning, which would otherwise drop re-added files from stored chunks
+        for doc_id, sources in duplicate_sources.items():
+            metadata = vectorstore.docstore.search(doc_id).metadata
+            metadata["duplicate_sources"] = sorted(sources.union(metadata.get("duplicate_sources", [])))
+
+        if not stale_ids and not num_added and not relabelled and not duplicate_sources:
+            print("⚠️ Nothing to add or remove. Vector store left unchanged.")
+            return
+
+        if stale_ids:
+            remove_documents(vectorstore, stale_ids)
+            print(f"🗑️ Removed {len(stale_ids)} chunks from {len(stale_sources)} sources.")
+        report_progress(progress_callback, "removed", chunks=len(stale_ids))
+        duplicates = deduplicator.stats()["embeddings_saved"] if deduplicator else 0
+        report_progress(progress_callback, "embedded", chunks=num_added, duplicates=duplicates)
+
+        save_faiss_store(vectorstore_path, vectorstore)
+        invalidate_vectorstore(vectorstore_name)
+        refresh_derived_indexes(vectorstore_name, vectorstore, reuse_num_topics=True)
+        report_progress(progress_callback, "saved", path=vectorstore_path)
+        print(f"✅ Vector store updated at: {vectorstore_path}")
+    except Exception as e:
+        print(f"❌ Failed to update/save vector store: {e}")
+        raise
+
+    return vectorstore_path
 
 
 
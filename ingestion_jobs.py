@@ -0,0 +1,265 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from configuration import INGESTION_MAX_WORKERS, INGESTION_MAX_QUEUE, INGESTION_JOB_HISTORY
+from workload_pools import PoolSaturated
+from ingestion import create_vectorstore_from_pdfs, update_vectorstore
+from vectorstore_registry import vectorstore_key
+
+
+class IngestionJob:
+    """
+    State of one background vector store build, as reported by /jobs/{id}.
+    """
+
+    def __init__(self, filenames: list, vectorstore_name: str, remove_filenames: list = None, kind: str = "create",
+                 index_type: str = None):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.index_type = index_type
+        self.filenames = list(filenames)
+        self.remove_filenames = list(remove_filenames or [])
+        self.vectorstore_name = vectorstore_name
+        self.status = "queued"
+        self.stage = "queued"
+        self.error = None
+        self.vectorstore_path = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.files = {filename: {"stage": "queued", "error": None, "chunks": None} for filename in self.filenames}
+        self.total_chunks = None
+        self.duplicate_chunks = None
+        self.future = None
+
+    def to_dict(self) -> dict:
+        completed_steps = 0
+        for info in self.files.values():
+            if info["stage"] in ("converted", "chunked", "failed"):
+                completed_steps += 1
+            if info["stage"] in ("chunked", "failed"):
+                completed_steps += 1
+        # Two per-file steps (convert, chunk) plus the store-level embed and save steps
+        total_steps = 2 * len(self.files) + 2
+        if self.stage in ("embedded", "saved"):
+            completed_steps += 1
+        if self.stage == "saved":
+            completed_steps += 1
+
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "index_type": self.index_type,
+            "status": self.status,
+            "stage": self.stage,
+            "vectorstore_name": self.vectorstore_name,
+            "vectorstore_path": self.vectorstore_path,
+            "progress": round(completed_steps / total_steps, 3) if total_steps else 0.0,
+            "files": {filename: dict(info) for filename, info in self.files.items()},
+            "removed_files": self.remove_filenames,
+            "total_chunks": self.total_chunks,
+            "duplicate_chunks": self.duplicate_chunks,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class IngestionJobManager:
+    """
+    Runs vector store builds on a bounded worker pool and tracks their progress.
+
+    Jobs beyond the pool size wait in the executor queue and can be cancelled until a
+    worker picks them up. At most `max_queue` jobs may wait; further submissions raise
+    PoolSaturated. Only the most recent `history_limit` finished jobs are kept.
+
+    Jobs on the same store run one at a time, in submission order: each one reads the
+    store, changes it and writes it back, so concurrent jobs would drop each other's
+    chunks. Later jobs wait in a per-store queue, without holding a worker, and are handed
+    to the executor when the store's current job finishes.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, history_limit: int):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingestion")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.rejected = 0
+        self.history_limit = history_limit
+        self._jobs = OrderedDict()
+        # Reentrant: a done callback runs inline when the future has already finished
+        self._lock = threading.RLock()
+        self._store_queues = {}  # store key -> jobs waiting for the store's submitted job
+
+    def submit(self, filenames: list, vectorstore_name: str, remove_filenames: list = None,
+               kind: str = "create", index_type: str = None) -> IngestionJob:
+        """
+        Queue a job. kind="create" rebuilds the store from `filenames` with a FAISS index
+        of `index_type`; kind="update" adds `filenames` to and removes `remove_filenames`
+        from the existing store, keeping its index type.
+        """
+        job = IngestionJob(filenames, vectorstore_name, remove_filenames, kind, index_type)
+        key = vectorstore_key(vectorstore_name)
+        with self._lock:
+            queued = [queued_job for queued_job in self._jobs.values() if queued_job.status == "queued"]
+            if len(queued) >= self.max_queue:
+                self.rejected += 1
+                raise PoolSaturated("ingestion", self._retry_after(len(queued)))
+            self._jobs[job.job_id] = job
+            self._prune()
+            if key in self._store_queues:
+                self._store_queues[key].append(job)
+                print(f"📥 [Jobs] Queued {kind} job {job.job_id} behind another job on '{vectorstore_name}'")
+                return job
+            self._store_queues[key] = deque()
+            self._submit(job, key)
+        print(f"📥 [Jobs] Queued {kind} job {job.job_id} for '{vectorstore_name}'")
+        return job
+
+    def _submit(self, job: IngestionJob, key: str):
+        # Caller holds self._lock. The done callback also runs when the job is cancelled
+        # before it started, so the store's next job is never stranded.
+        job.future = self.executor.submit(self._run, job)
+        job.future.add_done_callback(lambda _: self._start_next(key))
+
+    def _start_next(self, key: str):
+        with self._lock:
+            waiting = self._store_queues.get(key)
+            while waiting:
+                job = waiting.popleft()
+                if job.status == "queued":
+                    self._submit(job, key)
+                    return
+            self._store_queues.pop(key, None)
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def describe(self, job_id: str):
+        """
+        Return a consistent snapshot of a job's state, or None if the job is unknown.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+    def list_jobs(self) -> list:
+        with self._lock:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job that is still queued. Returns False if it is already running or done.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != "queued":
+                return False
+            future = job.future
+            if future is None:
+                # Still waiting behind another job on its store; _start_next skips it
+                job.status = "cancelled"
+                job.finished_at = time.time()
+        if future is not None:
+            if not future.cancel():
+                return False
+            with self._lock:
+                job.status = "cancelled"
+                job.finished_at = time.time()
+        print(f"🛑 [Jobs] Cancelled ingestion job {job_id}")
+        return True
+
+    def _retry_after(self, queued: int) -> int:
+        # Caller holds self._lock
+        durations = [job.finished_at - job.started_at for job in self._jobs.values()
+                     if job.status == "completed" and job.started_at and job.finished_at]
+        average_duration = sum(durations) / len(durations) if durations else 60.0
+        return max(1, int(average_duration * (queued + 1) / self.max_workers))
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {}
+            waits = []
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+                if job.started_at:
+                    waits.append(job.started_at - job.created_at)
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queue_depth": counts.get("queued", 0),
+            "rejected": self.rejected,
+            "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            "max_wait_ms": round(max(waits) * 1000, 1) if waits else 0.0,
+            "jobs_by_status": counts
+        }
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in ("completed", "failed", "cancelled")]
+        for job_id in finished[: max(0, len(finished) - self.history_limit)]:
+            del self._jobs[job_id]
+
+    def _progress(self, job: IngestionJob, stage: str, filename: str = None, **details):
+        with self._lock:
+            if filename is not None and filename in job.files:
+                job.files[filename]["stage"] = stage
+                if stage == "failed":
+                    job.files[filename]["error"] = details.get("error")
+                if stage == "chunked":
+                    job.files[filename]["chunks"] = details.get("chunks")
+            elif filename is None:
+                job.stage = stage
+                if stage == "embedded":
+                    job.total_chunks = details.get("chunks")
+                    job.duplicate_chunks = details.get("duplicates")
+            if filename is not None and job.stage == "queued":
+                job.stage = "converting"
+
+    def _run(self, job: IngestionJob):
+        with self._lock:
+            job.status = "running"
+            job.started_at = time.time()
+        print(f"⚙️ [Jobs] Running ingestion job {job.job_id}")
+
+        progress_callback = lambda stage, filename=None, **details: self._progress(job, stage, filename, **details)
+        try:
+            if job.kind == "update":
+                vectorstore_path = update_vectorstore(
+                    job.vectorstore_name,
+                    add_filenames=job.filenames,
+                    remove_filenames=job.remove_filenames,
+                    progress_callback=progress_callback
+                )
+            else:
+                vectorstore_path = create_vectorstore_from_pdfs(
+                    job.filenames,
+                    job.vectorstore_name,
+                    progress_callback=progress_callback,
+                    index_type=job.index_type
+                )
+            with self._lock:
+                if vectorstore_path is None:
+                    job.status = "failed"
+                    job.error = "No valid documents were loaded." if job.kind == "create" else "Nothing to add or remove."
+                else:
+                    job.status = "completed"
+                    job.vectorstore_path = vectorstore_path
+        except Exception as e:
+            print(f"❌ [Jobs] Ingestion job {job.job_id} failed: {e}")
+            with self._lock:
+                job.status = "failed"
+                job.error = str(e)
+        finally:
+            with self._lock:
+                job.finished_at = time.time()
+
+
+ingestion_jobs = IngestionJobManager(
+    max_workers=INGESTION_MAX_WORKERS,
+    max_queue=INGESTION_MAX_QUEUE,
+    history_limit=INGESTION_JOB_HISTORY
+)
@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import time
+
+from configuration import model_name, encode_kwargs, llm_kwargs
+
+
+# Heavy models and libraries are created on first use instead of at import time, so the
+# API (and every spawned worker) starts in well under a second. Each resource is built
+# once per process; concurrent first callers wait for the same load.
+_resources = {}
+_load_locks = {}
+_locks_guard = threading.Lock()
+load_seconds = {}
+
+
+def _get(name: str, factory):
+    resource = _resources.get(name)
+    if resource is not None:
+        return resource
+
+    with _locks_guard:
+        lock = _load_locks.setdefault(name, threading.Lock())
+    with lock:
+        resource = _resources.get(name)
+        if resource is None:
+            started = time.perf_counter()
+            resource = factory()
+            load_seconds[name] = round(time.perf_counter() - started, 3)
+            print(f"⏱️ [Models] Loaded {name} in {load_seconds[name]:.2f}s")
+            _resources[name] = resource
+    return resource
+
+
+def _detect_device() -> str:
+    import torch
+
+    print("=" * 100)
+    try:
+        cuda_available = torch.cuda.is_available()
+        print(f"✅ CUDA Available: {cuda_available}")
+        device = "cuda" if cuda_available else "cpu"
+        print(f"🧠 Using torch version: {torch.__version__} | Device: {device}")
+    except Exception as e:
+        print(f"❌ Error checking Torch CUDA availability: {e}")
+        device = "cpu"
+    print("=" * 100)
+    return device
+
+
+def _build_embeddings():
+    from langchain.embeddings import HuggingFaceBgeEmbeddings
+
+    return HuggingFaceBgeEmbeddings(
+        model_name=model_name,
+        model_kwargs={'device': get_device()},
+        encode_kwargs=encode_kwargs
+    )
+
+
+def _build_llm():
+    from langchain_community.chat_models import ChatOllama
+
+    return ChatOllama(**llm_kwargs)
+
+
+def _load_stop_words():
+    import nltk
+    from nltk.corpus import stopwords
+
+    try:
+        words = stopwords.words('english')
+    except LookupError:
+        # Only download when the corpus is not installed yet
+        nltk.download('stopwords', quiet=True)
+        words = stopwords.words('english')
+    return frozenset(words)
+
+
+def _import_gensim():
+    import gensim
+    import gensim.corpora
+    import gensim.models
+
+    return gensim
+
+
+def get_device() -> str:
+    """
+    "cuda" if torch sees a GPU, else "cpu".
+    """
+    return _get("device", _detect_device)
+
+
+def get_embeddings():
+    """
+    The shared HuggingFace BGE embedding model.
+    """
+    return _get("embeddings", _build_embeddings)
+
+
+async def aget_embeddings():
+    """
+    Async variant of get_embeddings: the first load runs in a worker thread so it does
+    not block the event loop.
+    """
+    embeddings = _resources.get("embeddings")
+    if embeddings is None:
+        embeddings = await asyncio.to_thread(get_embeddings)
+    return embeddings
+
+
+def get_llm():
+    """
+    The shared ChatOllama client.
+    """
+    return _get("llm", _build_llm)
+
+
+def get_stop_words() -> frozenset:
+    """
+    English NLTK stopwords, downloaded on first use if missing.
+    """
+    return _get("stop_words", _load_stop_words)
+
+
+def get_gensim():
+    """
+    The gensim module with `corpora` and `models` imported.
+    """
+    return _get("gensim", _import_gensim)
+
+
+RESOURCES = {
+    "embeddings": get_embeddings,
+    "llm": get_llm,
+    "stop_words": get_stop_words,
+    "gensim": get_gensim,
+}
+
+
+def warm_up(names=None) -> dict:
+    """
+    Load the given resources (default: all) now rather than on the first request.
+
+    Returns:
+        dict: Load time in seconds per resource; 0.0 for ones that were already loaded.
+    """
+    timings = {}
+    for name in names or RESOURCES:
+        if name not in RESOURCES:
+            raise ValueError(f"Unknown resource '{name}'. Expected one of: {', '.join(RESOURCES)}")
+        already_loaded = name in _resources
+        RESOURCES[name]()
+        timings[name] = 0.0 if already_loaded else load_seconds.get(name, 0.0)
+    return timings
+
+
+def stats() -> dict:
+    return {
+        "loaded": sorted(_resources),
+        "load_seconds": dict(load_seconds),
+    }
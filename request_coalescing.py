@@ -0,0 +1,58 @@
+import asyncio
+import hashlib
+import json
+from collections import defaultdict
+
+
+class SingleFlight:
+    """
+    Deduplicates identical in-flight computations.
+
+    The first request for a key (the leader) starts the computation; concurrent requests
+    with the same key wait on it and all receive the same result or exception. The
+    computation runs as its own task, so a leader whose client disconnects does not
+    cancel it for the waiting followers. Must only be used from the event loop.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self.leaders = defaultdict(int)
+        self.coalesced = defaultdict(int)
+
+    @staticmethod
+    def make_key(kind: str, payload: dict) -> str:
+        encoded = json.dumps([kind, payload], sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    async def run(self, kind: str, payload: dict, compute):
+        """
+        Run `compute()` (a coroutine function) once for all concurrent callers with the
+        same (kind, payload), and return its result.
+
+        Args:
+            kind (str): Name of the operation, e.g. "summary"; also used for the counters.
+            payload (dict): Normalized request fields that determine the result.
+            compute (callable): Zero-argument coroutine function producing the result.
+        """
+        key = self.make_key(kind, payload)
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced[kind] += 1
+            print(f"🔗 [SingleFlight] Joined in-flight {kind} request")
+        else:
+            self.leaders[kind] += 1
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "executed": dict(self.leaders),
+            "coalesced": dict(self.coalesced),
+            "total_coalesced": sum(self.coalesced.values()),
+        }
+
+
+single_flight = SingleFlight()
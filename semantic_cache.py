@@ -0,0 +1,163 @@
+import threading
+import time
+
+import faiss
+import numpy as np
+
+from configuration import SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL_SECONDS, SEMANTIC_CACHE_MAX_ENTRIES
+from vectorstore_registry import vectorstore_key, vectorstore_version, on_vectorstore_invalidated
+
+
+class _StoreAnswerCache:
+    """
+    Cached answers for one vector store: question embeddings in a small inner-product
+    FAISS index (BGE embeddings are normalized, so inner product == cosine similarity)
+    plus the answers in insertion order.
+    """
+
+    def __init__(self, version: str):
+        self.version = version
+        self.index = None
+        self.entries = []
+
+    def rebuild(self):
+        if not self.entries:
+            self.index = None
+            return
+        vectors = np.vstack([entry["vector"] for entry in self.entries])
+        self.index = faiss.IndexFlatIP(vectors.shape[1])
+        self.index.add(vectors)
+
+
+class SemanticAnswerCache:
+    """
+    Per-vector-store cache of QA answers looked up by question similarity.
+
+    A new question whose embedding has cosine similarity >= `threshold` with a cached
+    question gets the cached answer and source. Entries expire after `ttl_seconds`, the
+    oldest entries are evicted beyond `max_entries` per store, and a store's entries are
+    dropped when the store is rebuilt. Answers from different retrieval modes are kept
+    apart, so a hybrid retry is not answered with the dense miss it is retrying.
+
+    Callers read the store version once before retrieval and pass it to both `lookup` and
+    `store`, so an answer built from a version that was replaced in the meantime is dropped
+    instead of being cached as valid for the new one.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries: int):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._stores = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _store_cache(self, key: str, retrieval_mode: str, version: str) -> _StoreAnswerCache:
+        cache = self._stores.get((key, retrieval_mode))
+        if cache is None or cache.version != version:
+            # First use, or the store was rebuilt (possibly by another worker process)
+            cache = _StoreAnswerCache(version)
+            self._stores[(key, retrieval_mode)] = cache
+        return cache
+
+    def _expire(self, cache: _StoreAnswerCache):
+        cutoff = time.time() - self.ttl_seconds
+        live = [entry for entry in cache.entries if entry["created_at"] >= cutoff]
+        live = live[-self.max_entries:]
+        if len(live) != len(cache.entries):
+            cache.entries = live
+            cache.rebuild()
+
+    def lookup(self, vector_store_name: str, question_vector, retrieval_mode: str = "dense", version: str = None):
+        """
+        Return the cached entry for the most similar earlier question above the
+        threshold, or None. `version` defaults to the store's current version.
+
+        Returns:
+            dict: {"question", "answer", "source", "similarity"} on a hit, else None.
+        """
+        key = vectorstore_key(vector_store_name)
+        if version is None:
+            version = vectorstore_version(vector_store_name)
+        query = np.asarray([question_vector], dtype=np.float32)
+
+        with self._lock:
+            cache = self._stores.get((key, retrieval_mode))
+            if cache is None or cache.version != version:
+                # Nothing cached yet, or only answers from another store version
+                self.misses += 1
+                return None
+            self._expire(cache)
+            if cache.index is not None:
+                scores, ids = cache.index.search(query, 1)
+                if ids[0][0] >= 0 and scores[0][0] >= self.threshold:
+                    entry = cache.entries[ids[0][0]]
+                    self.hits += 1
+                    return {
+                        "question": entry["question"],
+                        "answer": entry["answer"],
+                        "source": entry["source"],
+                        "similarity": float(scores[0][0]),
+                    }
+            self.misses += 1
+            return None
+
+    def store(self, vector_store_name: str, question: str, question_vector, answer: str, source: str,
+              retrieval_mode: str = "dense", version: str = None) -> bool:
+        """
+        Cache an answer retrieved from store `version`. Skipped (returns False) when the
+        store has been rewritten since.
+        """
+        key = vectorstore_key(vector_store_name)
+        current_version = vectorstore_version(vector_store_name)
+        if version is not None and version != current_version:
+            return False
+        vector = np.asarray(question_vector, dtype=np.float32)
+
+        with self._lock:
+            cache = self._store_cache(key, retrieval_mode, current_version)
+            cache.entries.append({
+                "question": question,
+                "vector": vector,
+                "answer": answer,
+                "source": source,
+                "created_at": time.time(),
+            })
+            if len(cache.entries) > self.max_entries:
+                cache.entries = cache.entries[-self.max_entries:]
+                cache.rebuild()
+            else:
+                if cache.index is None:
+                    cache.index = faiss.IndexFlatIP(vector.shape[0])
+                cache.index.add(vector.reshape(1, -1))
+        return True
+
+    def invalidate(self, store_key: str):
+        with self._lock:
+            stale = [cache_key for cache_key in self._stores if cache_key[0] == store_key]
+            for cache_key in stale:
+                del self._stores[cache_key]
+        if stale:
+            print(f"🧹 [SemanticCache] Dropped cached answers for: {store_key}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl_seconds,
+                "entries": sum(len(cache.entries) for cache in self._stores.values()),
+                "stores": len({key for key, _ in self._stores}),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+semantic_cache = SemanticAnswerCache(
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    ttl_seconds=SEMANTIC_CACHE_TTL_SECONDS,
+    max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+)
+on_vectorstore_invalidated(semantic_cache.invalidate)
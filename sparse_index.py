@@ -0,0 +1,297 @@
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from configuration import BM25_K1, BM25_B
+from vectorstore_registry import load_vectorstore, vectorstore_key, vectorstore_version, on_vectorstore_invalidated
+from vectorstore_registry import iter_texts
+
+
+# Saved inside each store directory, next to its snapshots (see columnar_docstore.py)
+SPARSE_INDEX_FILENAME = "bm25.npz"
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list:
+    """
+    Lowercased word tokens. Stopwords are kept: BM25's idf already discounts them, and
+    they matter in exact phrases like chapter and experiment names.
+    """
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class PackedStrings:
+    """
+    Read-only sequence of strings stored as one UTF-8 blob plus int64 offsets (as in the
+    columnar docstore), so one long token or id does not widen every entry the way a
+    fixed-width numpy unicode array does.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings) -> "PackedStrings":
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position: int) -> str:
+        return self.blob[self.offsets[position]:self.offsets[position + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        data = self.blob.tobytes()
+        offsets = self.offsets.tolist()
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            yield data[start:end].decode("utf-8")
+
+
+class BM25Index:
+    """
+    Sparse inverted index over a store's chunks, scored with Okapi BM25.
+
+    Postings are kept in CSR form: the postings of term `t` are
+    `doc_indexes[offsets[t]:offsets[t + 1]]` with matching `term_frequencies`. Terms and
+    docstore ids are PackedStrings. The index is saved as a single .npz of plain arrays
+    (no pickle) together with the store version it was built from.
+    """
+
+    def __init__(self, terms, doc_ids, offsets, doc_indexes, term_frequencies, doc_lengths,
+                 version: str, k1: float = BM25_K1, b: float = BM25_B):
+        self.terms = terms
+        self.doc_ids = doc_ids
+        self.offsets = offsets
+        self.doc_indexes = doc_indexes
+        self.term_frequencies = term_frequencies
+        self.doc_lengths = doc_lengths
+        self.version = version
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {term: term_id for term_id, term in enumerate(terms)}
+        self.average_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    @classmethod
+    def build(cls, doc_ids: list, texts, version: str) -> "BM25Index":
+        """
+        Build the index from docstore ids and their chunk texts (any iterable, consumed once).
+        """
+        vocabulary = {}
+        postings = defaultdict(list)
+        doc_lengths = []
+        for doc_index, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                postings[vocabulary.setdefault(term, len(vocabulary))].append((doc_index, frequency))
+
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        for term_id in range(len(vocabulary)):
+            offsets[term_id + 1] = offsets[term_id] + len(postings[term_id])
+        doc_indexes = np.empty(offsets[-1], dtype=np.int32)
+        term_frequencies = np.empty(offsets[-1], dtype=np.float32)
+        for term_id, entries in postings.items():
+            start, end = offsets[term_id], offsets[term_id + 1]
+            doc_indexes[start:end] = [doc_index for doc_index, _ in entries]
+            term_frequencies[start:end] = [frequency for _, frequency in entries]
+
+        return cls(
+            terms=PackedStrings.from_strings(vocabulary),
+            doc_ids=PackedStrings.from_strings(doc_ids),
+            offsets=offsets,
+            doc_indexes=doc_indexes,
+            term_frequencies=term_frequencies,
+            doc_lengths=np.asarray(doc_lengths, dtype=np.float32),
+            version=version,
+        )
+
+    def save(self, path: str):
+        # Written to a temporary file and swapped in, so readers never see a partial index
+        staging_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}.npz"
+        np.savez(
+            staging_path,
+            terms_blob=self.terms.blob,
+            terms_offsets=self.terms.offsets,
+            doc_ids_blob=self.doc_ids.blob,
+            doc_ids_offsets=self.doc_ids.offsets,
+            offsets=self.offsets,
+            doc_indexes=self.doc_indexes,
+            term_frequencies=self.term_frequencies,
+            doc_lengths=self.doc_lengths,
+            version=np.array(self.version or "", dtype=str),
+        )
+        os.replace(staging_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                terms=PackedStrings(data["terms_blob"], data["terms_offsets"]),
+                doc_ids=PackedStrings(data["doc_ids_blob"], data["doc_ids_offsets"]),
+                offsets=data["offsets"],
+                doc_indexes=data["doc_indexes"],
+                term_frequencies=data["term_frequencies"],
+                doc_lengths=data["doc_lengths"],
+                version=str(data["version"]) or None,
+            )
+
+    def search(self, query: str, k: int) -> list:
+        """
+        Top-k chunks for a query by BM25 score.
+
+        Returns:
+            List[Tuple[str, float]]: (docstore id, score), best first; only chunks sharing
+            at least one term with the query.
+        """
+        num_docs = len(self.doc_ids)
+        if not num_docs:
+            return []
+
+        scores = np.zeros(num_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.doc_indexes[start:end]
+            frequencies = self.term_frequencies[start:end]
+            document_frequency = end - start
+            idf = math.log(1 + (num_docs - document_frequency + 0.5) / (document_frequency + 0.5))
+            length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.average_length)
+            # Each document appears once per posting list, so fancy-index += is safe
+            scores[docs] += idf * frequencies * (self.k1 + 1) / (frequencies + length_norm)
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k)[:k]]
+        matched = matched[np.argsort(-scores[matched])]
+        return [(self.doc_ids[i], float(scores[i])) for i in matched]
+
+
+def sparse_index_path(vector_store_name: str) -> str:
+    return os.path.join(vectorstore_key(vector_store_name), SPARSE_INDEX_FILENAME)
+
+
+def build_sparse_index(vector_store_name: str, vector_store=None) -> BM25Index:
+    """
+    Build the BM25 index over every chunk of a store and save it next to the FAISS index.
+    """
+    version = vectorstore_version(vector_store_name)
+    if vector_store is None:
+        vector_store = load_vectorstore(vector_store_name)
+
+    start_time = time.perf_counter()
+    doc_ids = []  # filled while BM25Index.build consumes the texts
+
+    def texts():
+        for doc_id, text in iter_texts(vector_store):
+            doc_ids.append(doc_id)
+            yield text
+
+    index = BM25Index.build(doc_ids, texts(), version)
+    path = sparse_index_path(vector_store_name)
+    index.save(path)
+    elapsed = time.perf_counter() - start_time
+    print(f"🔤 [BM25] Indexed {len(doc_ids)} chunks ({len(index.terms)} terms) in {elapsed:.2f}s: {path}")
+    return index
+
+
+class SparseIndexRegistry:
+    """
+    Keeps each store's BM25 index in memory, loading the saved copy or rebuilding it
+    when the store version no longer matches (e.g. stores built before BM25 existed).
+    """
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self.hits = 0
+        self.disk_loads = 0
+        self.builds = 0
+
+    def peek(self, vector_store_name: str):
+        """
+        The in-memory index if it is up to date, without loading or building anything.
+        """
+        key = vectorstore_key(vector_store_name)
+        version = vectorstore_version(vector_store_name)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None and index.version == version:
+                self.hits += 1
+                return index
+            return None
+
+    def get(self, vector_store_name: str, vector_store=None) -> BM25Index:
+        index = self.peek(vector_store_name)
+        if index is not None:
+            return index
+
+        key = vectorstore_key(vector_store_name)
+        version = vectorstore_version(vector_store_name)
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            index = self.peek(vector_store_name)
+            if index is not None:
+                return index
+
+            loaded = False
+            try:
+                index = BM25Index.load(sparse_index_path(vector_store_name))
+                loaded = index.version == version
+            except (OSError, KeyError, ValueError):
+                # Missing, unreadable, or saved before terms and ids were packed
+                pass
+            if not loaded:
+                index = build_sparse_index(vector_store_name, vector_store)
+
+            with self._lock:
+                if loaded:
+                    self.disk_loads += 1
+                else:
+                    self.builds += 1
+                self._indexes[key] = index
+            return index
+
+    def build(self, vector_store_name: str, vector_store=None) -> BM25Index:
+        """
+        (Re)build and save a store's BM25 index, e.g. right after the store was written.
+        """
+        key = vectorstore_key(vector_store_name)
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            index = build_sparse_index(vector_store_name, vector_store)
+            with self._lock:
+                self.builds += 1
+                self._indexes[key] = index
+            return index
+
+    def invalidate(self, store_key: str):
+        with self._lock:
+            self._indexes.pop(store_key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "indexes": len(self._indexes),
+                "hits": self.hits,
+                "disk_loads": self.disk_loads,
+                "builds": self.builds,
+            }
+
+
+sparse_indexes = SparseIndexRegistry()
+on_vectorstore_invalidated(sparse_indexes.invalidate)
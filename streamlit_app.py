@@ -114,11 +114,61 @@ def create_vectorstore(filenames: List[str], vectorstore_name: str):
             "filenames": filenames,
             "vectorstore_name": vectorstore_name
         }
-        response = requests.post(f"{API_BASE_URL}/create-vectorstore/", json=payload, timeout=300)
+        response = requests.post(f"{API_BASE_URL}/create-vectorstore/", json=payload, timeout=30)
         return response.json()
     except Exception as e:
         return {"error": str(e)}
 
+def get_job_status(job_id: str):
+    """Fetch progress of a background ingestion job"""
+    try:
+        response = requests.get(f"{API_BASE_URL}/jobs/{job_id}", timeout=5)
+        return response.json()
+    except Exception as e:
+        return {"error": str(e)}
+
+def wait_for_job(job_id: str, poll_interval: float = 2.0, max_errors: int = 5, timeout: float = 3600.0):
+    """
+    Poll an ingestion job and render its per-file progress until it finishes. Gives up after
+    `max_errors` consecutive failed status fetches (e.g. the API restarted and lost the job)
+    or after `timeout` seconds, returning a job with status "unknown" and the reason.
+    """
+    import time
+    progress_bar = st.progress(0.0)
+    status_text = st.empty()
+    files_text = st.empty()
+    deadline = time.monotonic() + timeout
+    errors = 0
+    while True:
+        if time.monotonic() > deadline:
+            message = f"Job {job_id} did not finish within {timeout:.0f} seconds"
+            status_text.error(f"❌ {message}")
+            return {"status": "unknown", "error": message}
+
+        result = get_job_status(job_id)
+        if "error" in result or "job" not in result:
+            errors += 1
+            message = f"Unable to fetch job status: {result.get('error', result.get('message'))}"
+            if errors >= max_errors:
+                status_text.error(f"❌ {message} (gave up after {errors} attempts)")
+                return {"status": "unknown", "error": message}
+            status_text.warning(f"⚠️ {message}")
+            time.sleep(poll_interval)
+            continue
+        errors = 0
+
+        job = result["job"]
+        progress_bar.progress(min(1.0, job.get("progress", 0.0)))
+        status_text.info(f"⚙️ Job {job['status']} – stage: {job['stage']}")
+        files_text.markdown("\n".join(
+            f"  • {filename}: {info['stage']}" + (f" ({info['chunks']} chunks)" if info.get("chunks") else "")
+            for filename, info in job["files"].items()
+        ))
+        if job["status"] in ("completed", "failed", "cancelled"):
+            status_text.empty()
+            return job
+        time.sleep(poll_interval)
+
 def get_pdf_download_link(pdf_path: str, filename: str):
     """Generate download link for PDF file"""
     try:
@@ -152,10 +202,48 @@ def generate_content(endpoint: str, payload: dict):
     """Generic function to call content generation endpoints"""
     try:
         response = requests.post(f"{API_BASE_URL}/{endpoint}/", json=payload, timeout=120)
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After", "a few")
+            return {"error": f"Server is busy. Please retry in {retry_after} seconds."}
         return response.json()
     except Exception as e:
         return {"error": str(e)}
 
+def stream_content(endpoint: str, payload: dict, placeholder, render=None):
+    """Call a streaming (NDJSON) endpoint and render tokens into a placeholder as they arrive"""
+    text = ""
+    final = {}
+    render = render or (lambda target, content: target.markdown(content + "▌"))
+    try:
+        # (connect, read) timeout: the read timeout applies between tokens, not to the whole answer
+        with requests.post(f"{API_BASE_URL}/{endpoint}/stream", json=payload, stream=True, timeout=(5, 120)) as response:
+            if response.status_code == 429:
+                retry_after = response.headers.get("Retry-After", "a few")
+                return {"error": f"Server is busy. Please retry in {retry_after} seconds."}
+            if response.status_code != 200:
+                try:
+                    message = response.json().get("message", response.text)
+                except ValueError:
+                    message = response.text
+                return {"error": message}
+
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                frame = json.loads(line)
+                if frame["type"] == "token":
+                    text += frame["content"]
+                    render(placeholder, text)
+                elif frame["type"] == "final":
+                    final = frame
+                elif frame["type"] == "error":
+                    return {"error": frame["message"]}
+    except Exception as e:
+        return {"error": str(e)}
+
+    final["text"] = text
+    return final
+
 def render_home_page():
     """Render the home/landing page"""
     st.markdown('<h1 class="main-header">📚 StudyBuddy – Open Source RAG-Based AI Notebook and Google NotebookLM Alternative</h1>', unsafe_allow_html=True)
@@ -346,6 +434,10 @@ def render_analytics_page():
                     '/generate-quiz/': '🧠 Quiz',
                     '/generate-FAQ/': '❔ FAQ',
                     '/generate-important-topics/': '🏷️ Topics',
+                    '/QA-Guide/stream': '❓ Q&A (Streaming)',
+                    '/generate-summary/stream': '📝 Summary (Streaming)',
+                    '/generate-diagram/stream': '📊 Diagram (Streaming)',
+                    '/generate-FAQ/stream': '❔ FAQ (Streaming)',
                     '/heartbeat': '💗 Health Check',
                     '/metrics': '📊 Metrics'
                 }
@@ -514,23 +606,29 @@ def main():
         
         if st.button("🚀 Create Vector Store", type="primary"):
             if uploaded_files and vectorstore_name:
-                with st.spinner("Saving files and creating vector store... This may take a few minutes."):
+                with st.spinner("Saving files..."):
                     # Save uploaded files
                     saved_files, save_error = save_uploaded_files(uploaded_files)
                     
-                    if save_error:
-                        st.error(f"❌ Error saving files: {save_error}")
+                if save_error:
+                    st.error(f"❌ Error saving files: {save_error}")
+                else:
+                    st.success(f"✅ Saved {len(saved_files)} files to Data directory")
+                    
+                    # Queue vector store creation and follow its progress
+                    result = create_vectorstore(saved_files, vectorstore_name)
+                    
+                    if "error" in result or "job_id" not in result:
+                        st.error(f"❌ Error creating vector store: {result.get('error', result.get('message'))}")
                     else:
-                        st.success(f"✅ Saved {len(saved_files)} files to Data directory")
+                        st.info(f"📥 Ingestion job queued: {result['job_id']}")
+                        job = wait_for_job(result["job_id"])
                         
-                        # Create vector store
-                        result = create_vectorstore(saved_files, vectorstore_name)
-                        
-                        if "error" in result:
-                            st.error(f"❌ Error creating vector store: {result['error']}")
-                        else:
-                            st.success(f"✅ {result.get('status', 'Success')}")
+                        if job["status"] == "completed":
+                            st.success("✅ Success")
                             st.info(f"📁 Vector store created: {vectorstore_name}")
+                        else:
+                            st.error(f"❌ Vector store creation {job['status']}: {job.get('error') or ''}")
             else:
                 st.warning("⚠️ Please upload PDF files and provide a vector store name.")
     
@@ -570,20 +668,24 @@ def main():
             • Questions can be conceptual or factual
             """)
         
+        hybrid_search = st.checkbox("🔀 Hybrid search (match exact keywords and formulas too)", key="hybrid_qa")
+        
         if st.button("🔍 Get Answer", type="primary"):
             if question and vectorstore_name:
-                with st.spinner("Searching for answer..."):
-                    result = generate_content("QA-Guide", {
-                        "question": question,
-                        "vectorstore_name": vectorstore_name
-                    })
+                st.subheader("📝 Answer:")
+                answer_placeholder = st.empty()
+                result = stream_content("QA-Guide", {
+                    "question": question,
+                    "vectorstore_name": vectorstore_name,
+                    "retrieval_mode": "hybrid" if hybrid_search else "dense"
+                }, answer_placeholder)
                 
                 if "error" in result:
+                    answer_placeholder.empty()
                     st.error(f"❌ Error: {result['error']}")
                 else:
+                    answer_placeholder.write(result.get("text") or "No answer generated")
                     st.success("✅ Answer Generated!")
-                    st.subheader("📝 Answer:")
-                    st.write(result.get("answer", "No answer generated"))
                     st.subheader("📄 Source Document:")
                     source_path = result.get("source", "")
                     if source_path and os.path.exists(source_path):
@@ -636,21 +738,27 @@ def main():
             • Bullet-point format
             """)
         
+        force_refresh = st.checkbox("🔄 Regenerate (ignore cached result)", key="force_refresh_summary")
+        hybrid_search = st.checkbox("🔀 Hybrid search (match exact keywords and formulas too)", key="hybrid_summary")
+        
         if st.button("📄 Generate Summary", type="primary"):
             if subject and vectorstore_name:
-                with st.spinner("Generating summary..."):
-                    result = generate_content("generate-summary", {
-                        "subject": subject,
-                        "vectorstore_name": vectorstore_name
-                    })
+                st.subheader(f"📝 Summary: {subject}")
+                summary_placeholder = st.empty()
+                result = stream_content("generate-summary", {
+                    "subject": subject,
+                    "vectorstore_name": vectorstore_name,
+                    "force_refresh": force_refresh,
+                    "retrieval_mode": "hybrid" if hybrid_search else "dense"
+                }, summary_placeholder)
                 
                 if "error" in result:
+                    summary_placeholder.empty()
                     st.error(f"❌ Error: {result['error']}")
                 else:
+                    summary_content = result.get("text") or "No summary generated"
+                    summary_placeholder.markdown(summary_content)
                     st.success("✅ Summary Generated!")
-                    summary_content = result.get("summary", "No summary generated")
-                    st.subheader(f"📝 Summary: {subject}")
-                    st.markdown(summary_content)
                     
                     # Download button
                     create_download_button(summary_content, f"summary_{subject.replace(' ', '_')}", "Summary")
@@ -698,21 +806,27 @@ def main():
             • Easy to understand format
             """)
         
+        force_refresh = st.checkbox("🔄 Regenerate (ignore cached result)", key="force_refresh_diagram")
+        hybrid_search = st.checkbox("🔀 Hybrid search (match exact keywords and formulas too)", key="hybrid_diagram")
+        
         if st.button("🎨 Create Diagram", type="primary"):
             if subject and vectorstore_name:
-                with st.spinner("Creating diagram..."):
-                    result = generate_content("generate-diagram", {
-                        "subject": subject,
-                        "vectorstore_name": vectorstore_name
-                    })
+                st.subheader(f"📊 Diagram: {subject}")
+                diagram_placeholder = st.empty()
+                result = stream_content("generate-diagram", {
+                    "subject": subject,
+                    "vectorstore_name": vectorstore_name,
+                    "force_refresh": force_refresh,
+                    "retrieval_mode": "hybrid" if hybrid_search else "dense"
+                }, diagram_placeholder, render=lambda target, content: target.code(content, language="text"))
                 
                 if "error" in result:
+                    diagram_placeholder.empty()
                     st.error(f"❌ Error: {result['error']}")
                 else:
+                    diagram_content = result.get("text") or "No diagram generated"
+                    diagram_placeholder.code(diagram_content, language="text")
                     st.success("✅ Diagram Created!")
-                    diagram_content = result.get("diagram", "No diagram generated")
-                    st.subheader(f"📊 Diagram: {subject}")
-                    st.code(diagram_content, language="text")
                     
                     # Download button
                     create_download_button(diagram_content, f"diagram_{subject.replace(' ', '_')}", "Diagram")
@@ -873,23 +987,30 @@ def main():
             • Study guide material
             """)
         
+        force_refresh = st.checkbox("🔄 Regenerate (ignore cached result)", key="force_refresh_faq")
+        hybrid_search = st.checkbox("🔀 Hybrid search (match exact keywords and formulas too)", key="hybrid_faq")
+        
         if st.button("❔ Generate FAQ", type="primary"):
             if subject and vectorstore_name:
-                with st.spinner("Generating FAQ..."):
-                    result = generate_content("generate-FAQ", {
-                        "subject": subject,
-                        "vector_store_name": vectorstore_name,
-                        "num_questions": num_questions
-                    })
+                st.subheader(f"❔ FAQ: {subject}")
+                faq_placeholder = st.empty()
+                result = stream_content("generate-FAQ", {
+                    "subject": subject,
+                    "vector_store_name": vectorstore_name,
+                    "num_questions": num_questions,
+                    "force_refresh": force_refresh,
+                    "retrieval_mode": "hybrid" if hybrid_search else "dense"
+                }, faq_placeholder)
+                # The raw stream is replaced by the formatted FAQ below
+                faq_placeholder.empty()
                 
                 if "error" in result:
                     st.error(f"❌ Error: {result['error']}")
                 else:
                     st.success("✅ FAQ Generated!")
-                    st.subheader(f"❔ FAQ: {subject}")
                     
                     # Format FAQ for better presentation
-                    faq_content = result.get("faq", "No FAQ generated")
+                    faq_content = result.get("text") or "No FAQ generated"
                     
                     # Split by numbered questions and format
                     import re
@@ -949,11 +1070,14 @@ def main():
             • Content organization
             """)
         
+        force_refresh = st.checkbox("🔄 Regenerate (ignore cached result)", key="force_refresh_topics")
+        
         if st.button("🏷️ Extract Topics", type="primary"):
             if vectorstore_name:
                 with st.spinner("Extracting topics... This may take a moment."):
                     result = generate_content("generate-important-topics", {
-                        "vectorstore_name": vectorstore_name
+                        "vectorstore_name": vectorstore_name,
+                        "force_refresh": force_refresh
                     })
                 
                 if "error" in result:
@@ -962,6 +1086,10 @@ def main():
                     st.success("✅ Topics Extracted!")
                     topics_content = result.get("topics_description", "No topics generated")
                     st.subheader(f"🏷️ Important Topics from: {vectorstore_name}")
+                    if result.get("num_topics"):
+                        coherence = result.get("coherence")
+                        coherence_text = f" (coherence {coherence:.3f})" if coherence is not None else ""
+                        st.caption(f"🎯 {result['num_topics']} topics{coherence_text}")
                     st.markdown(topics_content)
                     
                     # Download button
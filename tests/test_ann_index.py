@@ -0,0 +1,67 @@
+import faiss
+import numpy as np
+import pytest
+from langchain.docstore.in_memory import InMemoryDocstore
+from langchain.embeddings import FakeEmbeddings
+from langchain.vectorstores import FAISS
+
+from ann_index import build_index, describe_index, remove_documents
+
+
+DIM = 16
+
+
+def make_store(index_type: str, num_vectors: int = 400):
+    vectors = np.random.default_rng(0).standard_normal((num_vectors, DIM)).astype(np.float32)
+    index = build_index(vectors, index_type, min_vectors=100)
+    assert describe_index(index)["type"] == index_type
+    vectorstore = FAISS(
+        embedding_function=FakeEmbeddings(size=DIM),
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
+    add_vectors(vectorstore, [f"old-{i}" for i in range(num_vectors)], vectors)
+    return vectorstore, vectors
+
+
+def add_vectors(vectorstore, doc_ids: list, vectors: np.ndarray):
+    vectorstore.add_embeddings(list(zip(doc_ids, vectors.tolist())), ids=doc_ids)
+
+
+def nearest_ids(vectorstore, vectors: np.ndarray) -> list:
+    index = vectorstore.index
+    if "nlist" in describe_index(index):
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = ivf.nlist
+    _, labels = index.search(vectors, 1)
+    assert labels.min() >= 0 and labels.max() < index.ntotal
+    return [vectorstore.index_to_docstore_id[int(label)] for label in labels[:, 0]]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "ivf_pq", "hnsw"])
+def test_remove_then_add_keeps_labels_consistent(index_type, monkeypatch):
+    # Small PQ codebooks so training on a few hundred vectors is quick
+    monkeypatch.setattr("ann_index.IVF_PQ_M", 8)
+    monkeypatch.setattr("ann_index.IVF_PQ_NBITS", 4)
+    vectorstore, vectors = make_store(index_type)
+    removed = [f"old-{i}" for i in range(0, 400, 2)]
+    remove_documents(vectorstore, removed)
+
+    new_vectors = np.random.default_rng(1).standard_normal((50, DIM)).astype(np.float32)
+    add_vectors(vectorstore, [f"new-{i}" for i in range(50)], new_vectors)
+
+    index = vectorstore.index
+    assert describe_index(index)["type"] == index_type
+    assert index.ntotal == len(vectorstore.index_to_docstore_id) == 250
+    assert sorted(vectorstore.index_to_docstore_id) == list(range(250))
+    assert all(vectorstore.docstore.search(doc_id) == f"ID {doc_id} not found." for doc_id in removed)
+
+    kept_vectors = np.concatenate([vectors[1::2], new_vectors])
+    kept_ids = [f"old-{i}" for i in range(1, 400, 2)] + [f"new-{i}" for i in range(50)]
+    found = nearest_ids(vectorstore, kept_vectors)
+    if index_type == "ivf_pq":
+        # Compressed codes are too lossy for exact self-matches; every hit must still be a kept chunk
+        assert set(found) <= set(kept_ids)
+    else:
+        assert found == kept_ids
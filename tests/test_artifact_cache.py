@@ -0,0 +1,43 @@
+import artifact_cache as artifact_cache_module
+from artifact_cache import ArtifactCache, normalize_subject
+
+
+def test_opening_is_deferred_to_first_use(tmp_path):
+    path = tmp_path / "missing" / "artifacts.sqlite3"
+    ArtifactCache(str(path))
+    assert not path.parent.exists()
+
+
+def test_unwritable_path_does_not_fail_construction():
+    ArtifactCache("/PROVIDE_YOUR_PATH/cache/artifacts.sqlite3")
+
+
+def test_round_trip_per_version(tmp_path, monkeypatch):
+    versions = {"physics": "snapshot-1"}
+    monkeypatch.setattr(artifact_cache_module, "vectorstore_version", lambda name: versions[name])
+    cache = ArtifactCache(str(tmp_path / "artifacts.sqlite3"))
+
+    assert cache.put("summary", "Sound Waves?", "physics", None, "text", version="snapshot-1")
+    assert cache.get("summary", "sound  waves", "physics") == "text"
+    assert cache.get("summary", "sound waves", "physics", {"retrieval_mode": "hybrid"}) is None
+    assert cache.get("diagram", "sound waves", "physics") is None
+
+    # Generated from a version that was replaced meanwhile: not stored
+    versions["physics"] = "snapshot-2"
+    assert not cache.put("summary", "light", "physics", None, "stale", version="snapshot-1")
+    assert cache.get("summary", "light", "physics") is None
+    assert cache.get("summary", "sound waves", "physics") is None
+    assert cache.get("summary", "sound waves", "physics", version="snapshot-1") == "text"
+
+
+def test_invalidate_drops_the_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_cache_module, "vectorstore_version", lambda name: "snapshot-1")
+    cache = ArtifactCache(str(tmp_path / "artifacts.sqlite3"))
+    cache.put("faq", "sound", "physics", None, "faq text")
+    cache.invalidate(artifact_cache_module.vectorstore_key("physics"))
+    assert cache.get("faq", "sound", "physics") is None
+
+
+def test_normalize_subject():
+    assert normalize_subject("  Thrust and\nPressure?! ") == "thrust and pressure"
+    assert normalize_subject(None) == ""
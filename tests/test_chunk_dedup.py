@@ -0,0 +1,57 @@
+import pytest
+
+from chunk_dedup import ChunkDeduplicator, hamming_distance, simhash
+
+
+PASSAGE = (
+    "A sound wave is a longitudinal wave in which the particles of the medium vibrate "
+    "back and forth along the direction in which the wave travels. Regions where the "
+    "particles are pushed together are called compressions and regions where they are "
+    "spread apart are called rarefactions. The distance between two consecutive "
+    "compressions is the wavelength of the wave, and the number of compressions passing "
+    "a point each second is its frequency."
+)
+
+OTHER_PASSAGE = (
+    "Photosynthesis takes place in the chloroplasts of green plants. Chlorophyll absorbs "
+    "light energy, which is used to split water molecules and to reduce carbon dioxide "
+    "to glucose. Oxygen is released as a by-product through the stomata of the leaves, "
+    "and the glucose is stored as starch or used for respiration in the plant cells."
+)
+
+
+def test_exact_duplicate_ignores_case_and_whitespace():
+    dedup = ChunkDeduplicator()
+    assert dedup.check(PASSAGE, "first") is None
+    assert dedup.check("  " + PASSAGE.upper().replace(" ", "\n "), "second") == "first"
+    assert dedup.stats() == {"kept": 1, "exact_duplicates": 1, "near_duplicates": 0, "embeddings_saved": 1}
+
+
+@pytest.mark.parametrize("near_copy", [
+    PASSAGE.replace(",", "").replace(".", ";"),  # punctuation differs, words match
+    "12 " + PASSAGE,  # page number picked up at the chunk boundary
+])
+def test_near_duplicate_returns_kept_handle(near_copy):
+    assert hamming_distance(simhash(PASSAGE), simhash(near_copy)) <= ChunkDeduplicator().max_distance
+
+    dedup = ChunkDeduplicator()
+    assert dedup.check(PASSAGE, "first") is None
+    assert dedup.check(near_copy, "second") == "first"
+    assert dedup.stats()["near_duplicates"] == 1
+
+
+def test_chunks_beyond_threshold_are_kept():
+    dedup = ChunkDeduplicator()
+    assert hamming_distance(simhash(PASSAGE), simhash(OTHER_PASSAGE)) > dedup.max_distance
+    assert dedup.check(PASSAGE, "first") is None
+    assert dedup.check(OTHER_PASSAGE, "second") is None
+    assert dedup.stats() == {"kept": 2, "exact_duplicates": 0, "near_duplicates": 0, "embeddings_saved": 0}
+
+
+def test_short_chunks_only_get_exact_dedup():
+    assert simhash("Figure 3.2") is None
+
+    dedup = ChunkDeduplicator()
+    assert dedup.check("Figure 3.2", "first") is None
+    assert dedup.check("Figure 3.3", "second") is None
+    assert dedup.check("figure 3.2", "third") == "first"
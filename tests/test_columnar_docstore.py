@@ -0,0 +1,120 @@
+import os
+
+import faiss
+import numpy as np
+import pytest
+from langchain.docstore.in_memory import InMemoryDocstore
+from langchain.embeddings import FakeEmbeddings
+from langchain.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from columnar_docstore import (
+    DOCSTORE_DIRNAME, ColumnarDocstore, DocstoreWriter, convert_legacy_store, current_snapshot,
+    new_snapshot, publish_snapshot, read_faiss_store, snapshot_version, write_docstore,
+)
+
+
+DOCUMENTS = [
+    ("id-b", Document(page_content="Sound is a longitudinal wave.", metadata={"source": "physics.pdf", "page": 3})),
+    ("id-a", Document(page_content="Ångström: 10⁻¹⁰ m", metadata={"source": "physics.pdf", "page": 4})),
+    ("id-c", Document(page_content="", metadata={"source": "notes.pdf", "tags": ["draft", "wip"]})),
+]
+
+
+def open_docstore(store_path: str, use_mmap: bool) -> ColumnarDocstore:
+    return ColumnarDocstore(os.path.join(current_snapshot(store_path), DOCSTORE_DIRNAME), mmap=use_mmap)
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_round_trip(tmp_path, use_mmap):
+    store_path = str(tmp_path)
+    snapshot_path = new_snapshot(store_path)
+    write_docstore(snapshot_path, DOCUMENTS)
+    publish_snapshot(store_path, snapshot_path)
+
+    docstore = open_docstore(store_path, use_mmap)
+    assert len(docstore) == 3
+    for doc_id, document in DOCUMENTS:
+        found = docstore.search(doc_id)
+        assert found.page_content == document.page_content
+        assert found.metadata == document.metadata
+    assert docstore.search("id-missing") == "ID id-missing not found."
+    assert [doc_id for doc_id, _ in docstore.items()] == ["id-b", "id-a", "id-c"]
+    assert list(docstore.iter_texts()) == [(doc_id, document.page_content) for doc_id, document in DOCUMENTS]
+    assert "tags" not in docstore.search("id-a").metadata
+
+
+def test_metadata_updates_are_merged_on_commit(tmp_path):
+    store_path = str(tmp_path)
+    snapshot_path = new_snapshot(store_path)
+    writer = DocstoreWriter(snapshot_path)
+    for doc_id, document in DOCUMENTS:
+        writer.add(doc_id, document)
+    writer.update_metadata("id-b", {"duplicates": 2})
+    writer.update_metadata("id-b", {"page": 5})
+    writer.update_metadata("id-c", {"duplicates": 1})
+    writer.commit()
+    publish_snapshot(store_path, snapshot_path)
+
+    docstore = open_docstore(store_path, use_mmap=False)
+    assert docstore.search("id-b").metadata == {"source": "physics.pdf", "page": 5, "duplicates": 2}
+    assert docstore.search("id-a").metadata == {"source": "physics.pdf", "page": 4}
+    assert docstore.search("id-c").metadata == {"source": "notes.pdf", "tags": ["draft", "wip"], "duplicates": 1}
+
+
+def test_open_docstore_keeps_its_snapshot(tmp_path):
+    store_path = str(tmp_path)
+    first = new_snapshot(store_path)
+    write_docstore(first, DOCUMENTS[:1])
+    publish_snapshot(store_path, first)
+    docstore = open_docstore(store_path, use_mmap=False)
+    first_version = snapshot_version(store_path)
+
+    second = new_snapshot(store_path)
+    write_docstore(second, DOCUMENTS)
+    publish_snapshot(store_path, second)
+
+    assert snapshot_version(store_path) != first_version
+    assert len(docstore) == 1
+    assert docstore.search("id-b").page_content == DOCUMENTS[0][1].page_content
+    assert len(open_docstore(store_path, use_mmap=False)) == 3
+
+
+def legacy_store(store_path: str) -> FAISS:
+    """A store as saved before snapshots: index.faiss next to a pickled index.pkl."""
+    vectors = np.random.default_rng(0).standard_normal((len(DOCUMENTS), 8)).astype(np.float32)
+    index = faiss.IndexFlatL2(8)
+    index.add(vectors)
+    vectorstore = FAISS(
+        embedding_function=FakeEmbeddings(size=8),
+        index=index,
+        docstore=InMemoryDocstore(dict(DOCUMENTS)),
+        index_to_docstore_id={position: doc_id for position, (doc_id, _) in enumerate(DOCUMENTS)},
+    )
+    vectorstore.save_local(store_path)
+    return vectorstore
+
+
+def test_reading_an_unknown_store_creates_nothing(tmp_path):
+    store_path = str(tmp_path / "missing")
+    with pytest.raises(FileNotFoundError):
+        read_faiss_store(store_path, FakeEmbeddings(size=8))
+    assert not os.path.exists(store_path)
+
+
+def test_legacy_store_is_converted_once_and_not_on_read(tmp_path):
+    store_path = str(tmp_path)
+    legacy_store(store_path)
+
+    with pytest.raises(FileNotFoundError):
+        read_faiss_store(store_path, FakeEmbeddings(size=8))
+    assert os.path.exists(os.path.join(store_path, "index.pkl"))
+
+    assert convert_legacy_store(store_path) is True
+    assert convert_legacy_store(store_path) is False
+    assert not os.path.exists(os.path.join(store_path, "index.pkl"))
+
+    vectorstore = read_faiss_store(store_path, FakeEmbeddings(size=8))
+    assert vectorstore.index.ntotal == len(DOCUMENTS)
+    assert [vectorstore.index_to_docstore_id[position] for position in range(len(DOCUMENTS))] == ["id-b", "id-a", "id-c"]
+    assert vectorstore.docstore.search("id-c").metadata == DOCUMENTS[2][1].metadata
@@ -0,0 +1,40 @@
+from embedding_cache import EmbeddingCache
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts: list) -> list:
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_opening_is_deferred_to_first_use(tmp_path):
+    path = tmp_path / "missing" / "embeddings.sqlite3"
+    EmbeddingCache(str(path), model="bge", normalize=True)
+    assert not path.parent.exists()
+
+
+def test_only_misses_are_embedded_once(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    embed = CountingEmbedder()
+    cache = EmbeddingCache(path, model="bge", normalize=True)
+
+    assert cache.embed_texts(["a", "bb", "a"], embed_fn=embed) == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert embed.calls == [["a", "bb"]]
+
+    # Persisted: a new process (instance) only embeds the new text
+    cache = EmbeddingCache(path, model="bge", normalize=True)
+    assert cache.embed_texts(["bb", "ccc"], embed_fn=embed) == [[2.0, 1.0], [3.0, 1.0]]
+    assert embed.calls[1:] == [["ccc"]]
+    assert cache.stats()["hits"] == 1 and cache.stats()["entries"] == 3
+
+
+def test_entries_are_scoped_by_model(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    embed = CountingEmbedder()
+    EmbeddingCache(path, model="bge", normalize=True).embed_texts(["a"], embed_fn=embed)
+    EmbeddingCache(path, model="other", normalize=True).embed_texts(["a"], embed_fn=embed)
+    EmbeddingCache(path, model="bge", normalize=False).embed_texts(["a"], embed_fn=embed)
+    assert embed.calls == [["a"], ["a"], ["a"]]
@@ -0,0 +1,60 @@
+import pytest
+
+from hybrid_retrieval import reciprocal_rank_fusion
+from sparse_index import BM25Index
+
+
+DOC_IDS = ["waves", "waves-long", "light", "plants"]
+TEXTS = [
+    "Sound waves are longitudinal waves.",
+    "Sound waves are longitudinal waves. Their speed depends on the medium, the "
+    "temperature of the medium and its density, and is highest in solids.",
+    "Light waves are transverse waves and need no medium.",
+    "Plants make glucose by photosynthesis.",
+]
+
+
+@pytest.fixture
+def index():
+    return BM25Index.build(DOC_IDS, iter(TEXTS), version="snapshot-1")
+
+
+def test_only_matching_chunks_are_returned(index):
+    assert [doc_id for doc_id, _ in index.search("photosynthesis", k=10)] == ["plants"]
+    assert index.search("quantum entanglement", k=10) == []
+
+
+def test_rarer_terms_and_shorter_chunks_score_higher(index):
+    ranked = [doc_id for doc_id, _ in index.search("sound waves", k=10)]
+    # "sound" is in two chunks and "waves" in three; the short chunk beats its longer copy
+    assert ranked[:2] == ["waves", "waves-long"]
+    assert ranked[2:] == ["light"]
+
+    scores = [score for _, score in index.search("sound waves", k=10)]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_k_limits_results(index):
+    assert [doc_id for doc_id, _ in index.search("waves medium", k=2)] == \
+        [doc_id for doc_id, _ in index.search("waves medium", k=10)][:2]
+
+
+def test_save_and_load(index, tmp_path):
+    path = str(tmp_path / "bm25.npz")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert loaded.version == "snapshot-1"
+    assert list(loaded.doc_ids) == DOC_IDS
+    assert loaded.search("longitudinal medium", k=10) == index.search("longitudinal medium", k=10)
+
+
+def test_rrf_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "a"]], rrf_k=60)
+    # b: 1/62 + 1/61, a: 1/61 + 1/63, c: 1/63 + 1/62
+    assert fused == ["b", "a", "c"]
+
+
+def test_rrf_ranks_ids_in_both_lists_above_single_list_ids():
+    fused = reciprocal_rank_fusion([["dense-only", "shared"], ["sparse-only", "shared"]], rrf_k=60)
+    assert fused[0] == "shared"
+    assert set(fused[1:]) == {"dense-only", "sparse-only"}
@@ -0,0 +1,118 @@
+import os
+import zlib
+
+import faiss
+import numpy as np
+import pytest
+from langchain.embeddings import FakeEmbeddings
+from langchain.schema import Document
+
+import ingestion
+import vectorstore_registry
+from ann_index import StreamingIndexBuilder, describe_index
+from columnar_docstore import read_faiss_store
+from embedding_cache import EmbeddingCache
+
+
+DIM = 16
+CHUNKS_PER_FILE = 40
+
+
+def file_text(name: str) -> str:
+    # One ~900 character paragraph of random words per chunk, distinct across files
+    rng = np.random.default_rng(zlib.crc32(name.encode()))
+    paragraphs = []
+    for _ in range(CHUNKS_PER_FILE):
+        words = ["".join(rng.choice(list("abcdefghijklmnopqrstuvwxyz"), size=7)) for _ in range(110)]
+        paragraphs.append(" ".join(words))
+    return "\n\n".join(paragraphs)
+
+
+def embed(text: str) -> list:
+    return np.random.default_rng(zlib.crc32(text.encode())).standard_normal(DIM).tolist()
+
+
+@pytest.fixture
+def pdfs(tmp_path, monkeypatch):
+    """Fake PDF corpus: {filename: text}, converted without docling and embedded deterministically."""
+    corpus = {}
+    directory = str(tmp_path / "pdfs")
+    monkeypatch.setattr(ingestion, "DIRECTORY_PATH", directory)
+    monkeypatch.setattr(ingestion, "VECTORSORE_PATH", str(tmp_path / "Vectorstore"))
+    monkeypatch.setattr(vectorstore_registry, "VECTORSORE_PATH", str(tmp_path / "Vectorstore"))
+    os.makedirs(tmp_path / "Vectorstore")
+
+    def iter_pdf_documents(pdf_filenames, progress_callback=None, conversion_workers=1):
+        for filename in pdf_filenames:
+            source = os.path.join(directory, filename)
+            yield filename, Document(page_content=corpus[filename], metadata={"source": source})
+
+    monkeypatch.setattr(ingestion, "iter_pdf_documents", iter_pdf_documents)
+    monkeypatch.setattr(ingestion, "embed_chunks_bucketed", lambda texts: [embed(text) for text in texts])
+    monkeypatch.setattr(ingestion, "embedding_cache", EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), model="test", normalize=False))
+    monkeypatch.setattr(ingestion, "get_embeddings", lambda: FakeEmbeddings(size=DIM))
+    monkeypatch.setattr(ingestion, "refresh_derived_indexes", lambda *args, **kwargs: None)
+    # Small stores still get the approximate index under test
+    monkeypatch.setattr(ingestion, "StreamingIndexBuilder", lambda index_type: StreamingIndexBuilder(index_type, min_vectors=20))
+    return corpus
+
+
+def read_store(name: str):
+    return read_faiss_store(os.path.join(ingestion.VECTORSORE_PATH, name), FakeEmbeddings(size=DIM), writable=True)
+
+
+def sources(vectorstore) -> dict:
+    counts = {}
+    for doc in vectorstore.docstore._dict.values():
+        source = os.path.basename(doc.metadata["source"])
+        counts[source] = counts.get(source, 0) + 1
+    return counts
+
+
+def assert_self_search(vectorstore):
+    index = vectorstore.index
+    if "nlist" in describe_index(index):
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = ivf.nlist
+    doc_ids = [vectorstore.index_to_docstore_id[label] for label in range(index.ntotal)]
+    vectors = np.array([embed(vectorstore.docstore.search(doc_id).page_content) for doc_id in doc_ids], dtype=np.float32)
+    _, labels = index.search(vectors, 1)
+    assert [vectorstore.index_to_docstore_id[int(label)] for label in labels[:, 0]] == doc_ids
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw"])
+def test_update_adds_and_removes_files(pdfs, index_type):
+    for name in ["a.pdf", "b.pdf", "c.pdf", "d.pdf"]:
+        pdfs[name] = file_text(name)
+    ingestion.create_vectorstore_from_pdfs(["a.pdf", "b.pdf", "c.pdf"], "store", conversion_workers=1, index_type=index_type)
+    assert describe_index(read_store("store").index)["type"] == index_type
+
+    ingestion.update_vectorstore("store", add_filenames=["d.pdf"], remove_filenames=["b.pdf"], conversion_workers=1)
+
+    vectorstore = read_store("store")
+    assert describe_index(vectorstore.index)["type"] == index_type
+    assert sources(vectorstore) == {"a.pdf": CHUNKS_PER_FILE, "c.pdf": CHUNKS_PER_FILE, "d.pdf": CHUNKS_PER_FILE}
+    assert vectorstore.index.ntotal == len(vectorstore.index_to_docstore_id) == 3 * CHUNKS_PER_FILE
+    assert sorted(vectorstore.index_to_docstore_id) == list(range(3 * CHUNKS_PER_FILE))
+    assert_self_search(vectorstore)
+
+
+def test_update_deduplicates_against_stored_chunks(pdfs):
+    pdfs["a.pdf"] = pdfs["e.pdf"] = file_text("a.pdf")
+    pdfs["b.pdf"] = file_text("b.pdf")
+    ingestion.create_vectorstore_from_pdfs(["a.pdf", "b.pdf"], "store", conversion_workers=1, index_type="flat")
+
+    # Every chunk of e.pdf duplicates a stored chunk of a.pdf: nothing new is embedded
+    ingestion.update_vectorstore("store", add_filenames=["e.pdf"], conversion_workers=1)
+    vectorstore = read_store("store")
+    assert sources(vectorstore) == {"a.pdf": CHUNKS_PER_FILE, "b.pdf": CHUNKS_PER_FILE}
+    duplicates = [doc.metadata.get("duplicate_sources") for doc in vectorstore.docstore._dict.values()
+                  if doc.metadata["source"].endswith("a.pdf")]
+    assert duplicates == [[os.path.join(ingestion.DIRECTORY_PATH, "e.pdf")]] * CHUNKS_PER_FILE
+
+    # Removing a.pdf keeps its chunks for e.pdf
+    ingestion.update_vectorstore("store", remove_filenames=["a.pdf"], conversion_workers=1)
+    vectorstore = read_store("store")
+    assert sources(vectorstore) == {"e.pdf": CHUNKS_PER_FILE, "b.pdf": CHUNKS_PER_FILE}
+    assert all("duplicate_sources" not in doc.metadata for doc in vectorstore.docstore._dict.values())
+    assert_self_search(vectorstore)
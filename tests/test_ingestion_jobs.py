@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+import ingestion_jobs
+from ingestion_jobs import IngestionJobManager
+from workload_pools import PoolSaturated
+
+
+class FakeIngestion:
+    """Stands in for create/update_vectorstore; each call blocks until released."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, progress_callback=None, **kwargs):
+        with self._lock:
+            # create_vectorstore_from_pdfs(filenames, name, ...) / update_vectorstore(name, add_filenames=...)
+            self.calls.append(kwargs.get("add_filenames", args[0]))
+        progress_callback("converted", "a.pdf", characters=10)
+        progress_callback("chunked", "a.pdf", chunks=3)
+        progress_callback("embedded", chunks=3, duplicates=1)
+        self.release.wait(5)
+        progress_callback("saved", path="store")
+        return "store"
+
+
+@pytest.fixture
+def fake_ingestion(monkeypatch):
+    fake = FakeIngestion()
+    monkeypatch.setattr(ingestion_jobs, "create_vectorstore_from_pdfs", fake)
+    monkeypatch.setattr(ingestion_jobs, "update_vectorstore", fake)
+    return fake
+
+
+def wait_until(condition):
+    for _ in range(500):
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("condition not met in time")
+
+
+def wait(jobs: list):
+    for job in jobs:
+        job.future.result(timeout=5)
+
+
+def test_jobs_on_one_store_run_in_order(fake_ingestion):
+    manager = IngestionJobManager(max_workers=4, max_queue=10, history_limit=10)
+    first = manager.submit(["a.pdf"], "store")
+    second = manager.submit(["b.pdf"], "store", kind="update")
+    other = manager.submit(["c.pdf"], "other")
+    assert second.future is None
+
+    fake_ingestion.release.set()
+    wait([first, other])
+    # The second job is handed to the executor when the first one finishes
+    wait_until(lambda: second.future is not None)
+    wait([second])
+
+    assert [call for call in fake_ingestion.calls if call != ["c.pdf"]] == [["a.pdf"], ["b.pdf"]]
+    assert [manager.describe(job.job_id)["status"] for job in (first, second, other)] == ["completed"] * 3
+    described = manager.describe(first.job_id)
+    assert described["progress"] == 1.0
+    assert (described["total_chunks"], described["duplicate_chunks"]) == (3, 1)
+
+
+def test_job_waiting_for_its_store_can_be_cancelled(fake_ingestion):
+    manager = IngestionJobManager(max_workers=2, max_queue=10, history_limit=10)
+    first = manager.submit(["a.pdf"], "store")
+    second = manager.submit(["b.pdf"], "store")
+
+    assert manager.cancel(second.job_id)
+    fake_ingestion.release.set()
+    wait([first])
+    assert manager.describe(second.job_id)["status"] == "cancelled"
+    assert second.future is None and len(fake_ingestion.calls) == 1
+
+
+def test_full_queue_is_rejected(fake_ingestion):
+    manager = IngestionJobManager(max_workers=1, max_queue=1, history_limit=10)
+    first = manager.submit(["a.pdf"], "store")
+    wait_until(lambda: first.status == "running")
+    manager.submit(["b.pdf"], "store")
+    with pytest.raises(PoolSaturated):
+        manager.submit(["c.pdf"], "other")
+    assert manager.stats()["rejected"] == 1
+    fake_ingestion.release.set()
+    wait([first])
@@ -0,0 +1,132 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableGenerator
+
+import QA_Rag
+
+
+class EchoChain:
+    async def ainvoke(self, inputs: dict) -> str:
+        await asyncio.sleep(0)
+        return f"answer: {inputs['question']}"
+
+
+class FailingStoreCache:
+    def lookup(self, *args):
+        return None
+
+    def store(self, *args):
+        raise RuntimeError("dimension mismatch")
+
+
+def fake_batch(monkeypatch, cache):
+    async def aload_vectorstore(name):
+        return object()
+
+    async def aget_embeddings():
+        return object()
+
+    monkeypatch.setattr(QA_Rag, "aload_vectorstore", aload_vectorstore)
+    monkeypatch.setattr(QA_Rag, "aget_embeddings", aget_embeddings)
+    monkeypatch.setattr(QA_Rag, "vectorstore_version", lambda name: "snapshot-1")
+    monkeypatch.setattr(QA_Rag, "embed_queries", lambda embeddings, questions: np.ones((len(questions), 4), np.float32))
+    monkeypatch.setattr(QA_Rag, "retrieve_batch", lambda store, name, questions, *args: [
+        [Document(page_content=question, metadata={"source": "notes.pdf"})] for question in questions
+    ])
+    monkeypatch.setattr(QA_Rag.chain_registry, "chain", lambda task: EchoChain())
+    monkeypatch.setattr(QA_Rag, "semantic_cache", cache)
+
+
+def run_batch(questions: list, **kwargs) -> list:
+    async def collect():
+        return [result async for result in QA_Rag.agenerate_answers_batch(questions, "store", **kwargs)]
+    return asyncio.run(collect())
+
+
+def test_cache_store_failure_keeps_answers(monkeypatch):
+    fake_batch(monkeypatch, FailingStoreCache())
+    results = run_batch(["q1", "q2", "q3"])
+    assert sorted(result["index"] for result in results) == [0, 1, 2]
+    assert all(result["answer"] == f"answer: q{result['index'] + 1}" for result in results)
+    assert all(result["source"] == "notes.pdf" for result in results)
+
+
+def test_generations_take_generation_slots(monkeypatch):
+    fake_batch(monkeypatch, FailingStoreCache())
+    held = {"retrieval": 0, "generation": 0}
+
+    def admit(name):
+        @asynccontextmanager
+        async def slot():
+            held[name] += 1
+            yield
+        return slot
+
+    run_batch(["q1", "q2", "q3"], admit_retrieval=admit("retrieval"), admit_generation=admit("generation"))
+    assert held == {"retrieval": 1, "generation": 3}
+
+
+class RecordingCache:
+    def __init__(self):
+        self.answers = {}
+
+    def lookup(self, name, vector, retrieval_mode, version):
+        if vector[0] in self.answers:
+            return {"similarity": 1.0, "question": vector[0], **self.answers[vector[0]]}
+        return None
+
+    def store(self, name, question, vector, answer, source, retrieval_mode, version):
+        self.answers[vector[0]] = {"answer": answer, "source": source}
+
+
+def fake_answer_chain(monkeypatch, cache):
+    fake_batch(monkeypatch, cache)
+    generations = []
+
+    class Embeddings:
+        async def aembed_query(self, question: str) -> list:
+            return [question]
+
+    class Retriever:
+        async def ainvoke(self, question: str) -> list:
+            return [Document(page_content=question, metadata={"source": "notes.pdf"})]
+
+    async def aget_embeddings():
+        return Embeddings()
+
+    async def aretriever(*args):
+        return Retriever()
+
+    async def tokens(inputs):
+        async for chain_inputs in inputs:
+            generations.append(chain_inputs["question"])
+        for token in ["an", "swer"]:
+            yield token
+
+    monkeypatch.setattr(QA_Rag, "aget_embeddings", aget_embeddings)
+    monkeypatch.setattr(QA_Rag.chain_registry, "aretriever", aretriever)
+    monkeypatch.setattr(QA_Rag.chain_registry, "chain", lambda task: RunnableGenerator(tokens))
+    return generations
+
+
+def test_streamed_answers_use_the_semantic_cache(monkeypatch):
+    cache = RecordingCache()
+    generations = fake_answer_chain(monkeypatch, cache)
+
+    async def stream(question: str):
+        chain, inputs, docs = await QA_Rag.aprepare_answer_chain(question, "store")
+        if chain is None:
+            return inputs["answer"], docs
+        return "".join([token async for token in chain.astream(inputs)]), docs
+
+    answer, docs = asyncio.run(stream("q1"))
+    assert answer == "answer" and cache.answers == {"q1": {"answer": "answer", "source": "notes.pdf"}}
+
+    # A repeated question is answered from the cache, without another generation
+    answer, docs = asyncio.run(stream("q1"))
+    assert (answer, docs[0].metadata["source"]) == ("answer", "notes.pdf")
+    assert asyncio.run(QA_Rag.agenerate_answer("q1", "store")) == ("answer", "notes.pdf")
+    assert generations == ["q1"]
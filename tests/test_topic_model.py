@@ -0,0 +1,45 @@
+import multiprocessing
+import time
+
+from langchain.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+import topic_model
+from topic_model import reservoir_sample, select_num_topics
+
+
+class Store:
+    """Just enough of a FAISS store for count_documents / iter_texts."""
+
+    def __init__(self, texts):
+        self.docstore = InMemoryDocstore({str(i): Document(page_content=text) for i, text in enumerate(texts)})
+
+
+def probe(texts, num_topics, passes, coherence):
+    # Every count but 2 runs far past the budget
+    if num_topics != 2:
+        time.sleep(60)
+    return num_topics, 0.5
+
+
+def test_reservoir_sample_is_bounded_and_uniform():
+    assert reservoir_sample(range(3), 10) == [0, 1, 2]
+    counts = [0] * 10
+    for seed in range(2000):
+        for item in reservoir_sample(range(10), 3, seed):
+            counts[item] += 1
+    # Every item is picked with probability 3/10
+    assert all(abs(count / 2000 - 0.3) < 0.05 for count in counts)
+
+
+def test_sweep_budget_terminates_running_probes(monkeypatch):
+    monkeypatch.setattr(topic_model, "score_topic_count", probe)
+    monkeypatch.setattr(topic_model, "preprocess", lambda text, stop_words: text.split())
+    monkeypatch.setattr(topic_model, "TOPIC_SWEEP_TIME_BUDGET_SECONDS", 5)
+    monkeypatch.setattr(topic_model, "TOPIC_MODEL_WORKERS", 3)
+
+    start_time = time.perf_counter()
+    best, score, scores = select_num_topics(Store([f"chunk {i} text" for i in range(40)]), set(), max_topics=5)
+    assert time.perf_counter() - start_time < 30
+    assert (best, score, scores) == (2, 0.5, {2: 0.5})
+    assert multiprocessing.active_children() == []
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from langchain_core.documents import Document
+
+import QA_Rag
+from workload_pools import PoolSaturated, WorkloadPool
+
+
+class NoCache:
+    def lookup(self, *args):
+        return None
+
+    def store(self, *args):
+        pass
+
+
+class FakeEmbeddings:
+    async def aembed_query(self, text: str) -> list:
+        return [1.0, 0.0]
+
+
+def fake_answer(monkeypatch, aprepare_answer_chain):
+    async def aget_embeddings():
+        return FakeEmbeddings()
+
+    monkeypatch.setattr(QA_Rag, "aprepare_answer_chain", aprepare_answer_chain)
+    monkeypatch.setattr(QA_Rag, "aget_embeddings", aget_embeddings)
+    monkeypatch.setattr(QA_Rag, "vectorstore_version", lambda name: "snapshot-1")
+    monkeypatch.setattr(QA_Rag, "semantic_cache", NoCache())
+
+
+def test_admission_is_checked_once():
+    pool = WorkloadPool("test", max_workers=1, max_queue=0)
+    with pytest.raises(PoolSaturated):
+        pool.check_admission()
+    assert pool.rejected == 1
+
+    async def admit_unchecked():
+        async with pool.admit(check=False):
+            return pool.in_flight
+
+    # Already checked up front: the slot is taken without rejecting (or counting) again
+    assert asyncio.run(admit_unchecked()) == 1
+    assert pool.rejected == 1
+
+
+def test_answer_releases_retrieval_slot_before_generation(monkeypatch):
+    retrieval = WorkloadPool("retrieval", max_workers=1, max_queue=1)
+    generation = WorkloadPool("generation", max_workers=1, max_queue=1)
+    held = {}
+
+    class RecordingChain:
+        async def ainvoke(self, inputs: dict) -> str:
+            held["generating"] = (retrieval.in_flight, generation.in_flight)
+            return "answer"
+
+    async def aprepare_answer_chain(question, *args):
+        held["retrieving"] = (retrieval.in_flight, generation.in_flight)
+        return RecordingChain(), {"question": question}, [Document(page_content="", metadata={"source": "notes.pdf"})]
+
+    fake_answer(monkeypatch, aprepare_answer_chain)
+
+    answer = asyncio.run(QA_Rag.agenerate_answer(
+        "q", "store", admit_retrieval=retrieval.admit, admit_generation=generation.admit
+    ))
+    assert answer == ("answer", "notes.pdf")
+    assert held == {"retrieving": (1, 0), "generating": (0, 1)}
+
+
+def test_answer_rejection_is_raised(monkeypatch):
+    generation = WorkloadPool("generation", max_workers=1, max_queue=0)
+    generation.waiting = 1
+
+    async def aprepare_answer_chain(question, *args):
+        return object(), {}, []
+
+    fake_answer(monkeypatch, aprepare_answer_chain)
+
+    with pytest.raises(PoolSaturated):
+        asyncio.run(QA_Rag.agenerate_answer("q", "store", admit_generation=generation.admit))
@@ -0,0 +1,386 @@
+import json
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import threading
+import time
+
+from configuration import TOPIC_MODEL_PASSES, TOPIC_MODEL_STREAMING_MIN_DOCS
+from configuration import TOPIC_MODEL_WORKERS, TOPIC_MODEL_CHUNKSIZE
+from configuration import TOPIC_COUNT_CANDIDATES, TOPIC_COUNT_MAX, TOPIC_COHERENCE_MEASURE
+from configuration import TOPIC_SWEEP_SAMPLE_SIZE, TOPIC_SWEEP_PASSES, TOPIC_SWEEP_TIME_BUDGET_SECONDS
+from models import get_gensim, get_stop_words
+from topic_sweep_worker import score_topic_count
+from vectorstore_registry import load_vectorstore, vectorstore_key, vectorstore_version, on_vectorstore_invalidated
+from vectorstore_registry import iter_texts, count_documents
+
+
+# Saved inside each store directory, next to its snapshots (see columnar_docstore.py)
+TOPIC_MODEL_DIRECTORY = "lda"
+
+
+def preprocess(doc, stop_words):
+    """
+    Tokenize and clean a document by removing stopwords and non-alphabetic words.
+    """
+    return [word for word in get_gensim().utils.simple_preprocess(doc) if word not in stop_words]
+
+
+def default_num_topics(num_docs: int) -> int:
+    return max(1, num_docs // 2)  # At least 1 topic
+
+
+def reservoir_sample(items, size: int, seed: int = 0) -> list:
+    """
+    Uniform random sample of `size` items from an iterable of unknown length, holding
+    only the sample in memory (Algorithm R).
+    """
+    rng = random.Random(seed)
+    sample = []
+    for seen, item in enumerate(items):
+        if seen < size:
+            sample.append(item)
+        else:
+            slot = rng.randint(0, seen)
+            if slot < size:
+                sample[slot] = item
+    return sample
+
+
+def select_num_topics(vector_store, stop_words, max_topics: int = TOPIC_COUNT_MAX):
+    """
+    Pick the topic count with the best coherence instead of one topic per two chunks.
+
+    Candidate counts from TOPIC_COUNT_CANDIDATES (up to `max_topics` and num_docs // 2)
+    are trained in parallel worker processes on a reservoir sample of the store's chunks
+    (only the sample's text is held in memory) and scored with TOPIC_COHERENCE_MEASURE.
+    When the time budget runs out the worker processes are terminated, so probes still
+    running stop using CPU; small counts are submitted first since they finish fastest.
+
+    Returns:
+        Tuple[int, float, dict]: (chosen count, its coherence or None, {count: coherence}).
+    """
+    upper = default_num_topics(count_documents(vector_store))
+    if max_topics:
+        upper = min(upper, max_topics)
+    candidates = sorted({count for count in TOPIC_COUNT_CANDIDATES if 2 <= count <= upper})
+    if not candidates:
+        # Too few chunks to compare topic counts
+        return upper, None, {}
+
+    chunks = reservoir_sample((text for _, text in iter_texts(vector_store)), TOPIC_SWEEP_SAMPLE_SIZE)
+    texts = [tokens for tokens in (preprocess(chunk, stop_words) for chunk in chunks) if tokens]
+
+    start_time = time.perf_counter()
+    deadline = start_time + TOPIC_SWEEP_TIME_BUDGET_SECONDS
+    scores = {}
+    # A multiprocessing Pool rather than a ProcessPoolExecutor: only a Pool can terminate
+    # workers that are still running a probe
+    pool = multiprocessing.get_context("spawn").Pool(processes=min(TOPIC_MODEL_WORKERS, len(candidates)))
+    try:
+        results = [
+            pool.apply_async(score_topic_count, (texts, count, TOPIC_SWEEP_PASSES, TOPIC_COHERENCE_MEASURE))
+            for count in candidates
+        ]
+        for result in results:
+            result.wait(max(0.0, deadline - time.perf_counter()))
+            if not result.ready():
+                continue
+            try:
+                count, score = result.get()
+            except Exception as e:
+                print(f"⚠️ [TopicModel] Coherence probe failed: {e}")
+                continue
+            if not math.isnan(score):
+                scores[count] = round(score, 4)
+    finally:
+        # Stops the probes still running after the budget, not just the queued ones
+        pool.terminate()
+        pool.join()
+
+    elapsed = time.perf_counter() - start_time
+    if not scores:
+        print(f"⚠️ [TopicModel] No coherence probe finished in {elapsed:.1f}s; using {candidates[0]} topics")
+        return candidates[0], None, {}
+
+    best = max(scores, key=scores.get)
+    print(f"🎯 [TopicModel] Chose {best} topics ({TOPIC_COHERENCE_MEASURE}={scores[best]}) from "
+          f"{len(scores)}/{len(candidates)} candidates on {len(texts)} chunks in {elapsed:.1f}s")
+    return best, scores[best], scores
+
+
+class TopicModel:
+    """
+    A trained LDA model for one vector store, with its dictionary and the store version
+    it was trained on.
+    """
+
+    def __init__(self, lda_model, dictionary, version: str, num_topics: int, num_docs: int,
+                 coherence: float = None):
+        self.lda_model = lda_model
+        self.dictionary = dictionary
+        self.version = version
+        self.num_topics = num_topics
+        self.num_docs = num_docs
+        self.coherence = coherence
+
+    def describe(self) -> dict:
+        return {"num_topics": self.num_topics, "coherence": self.coherence, "num_docs": self.num_docs}
+
+    def topic_word_lists(self, words_per_topic: int):
+        """
+        Keyword lists of the model's topics, like `print_topics(num_words=...)`.
+
+        Returns:
+            List[List[str]]: A list of topic keyword lists.
+        """
+        topics = self.lda_model.show_topics(num_topics=self.num_topics, num_words=words_per_topic, formatted=False)
+        return [[word for word, _ in topic_words] for _, topic_words in topics]
+
+
+def topic_model_path(vector_store_name: str) -> str:
+    return os.path.join(vectorstore_key(vector_store_name), TOPIC_MODEL_DIRECTORY)
+
+
+def iter_tokenized_chunks(vector_store, stop_words):
+    """
+    Stream the tokenized chunks of a store one at a time, so no list of every
+    tokenized chunk is ever held in memory.
+    """
+    for _, text in iter_texts(vector_store):
+        yield preprocess(text, stop_words)
+
+
+def train_topic_model(vector_store_name: str, vector_store=None, num_topics: int = None,
+                      streaming: bool = None, reuse_num_topics: bool = False) -> TopicModel:
+    """
+    Train an LDA model on every chunk of a store and save the dictionary, BoW corpus
+    and model in the store's `lda/` directory.
+
+    Small stores are tokenized in memory and trained with `LdaModel`. Large stores (or
+    `streaming=True`) are streamed from the docstore into an on-disk MmCorpus and trained
+    with `LdaMulticore`, so peak memory stays flat as the store grows.
+
+    Args:
+        vector_store_name (str): Store name or path.
+        vector_store (FAISS, optional): Already loaded store; loaded from disk if omitted.
+        num_topics (int, optional): Chosen by a coherence sweep (`select_num_topics`) if omitted.
+        streaming (bool, optional): Defaults to num_docs >= TOPIC_MODEL_STREAMING_MIN_DOCS.
+        reuse_num_topics (bool): Keep the topic count of the store's previous model instead
+            of sweeping again (incremental updates), as long as the store still has enough
+            chunks for it.
+    """
+    version = vectorstore_version(vector_store_name)
+    if vector_store is None:
+        vector_store = load_vectorstore(vector_store_name)
+
+    start_time = time.perf_counter()
+    gensim = get_gensim()
+    stop_words = get_stop_words()
+    num_docs = count_documents(vector_store)
+    coherence, sweep = None, {}
+    if not num_topics and reuse_num_topics:
+        previous = read_topic_model_meta(vector_store_name)
+        if previous is not None and previous["num_topics"] <= default_num_topics(num_docs):
+            num_topics, coherence, sweep = previous["num_topics"], previous.get("coherence"), previous.get("sweep", {})
+            print(f"♻️ [TopicModel] Reusing {num_topics} topics from the previous sweep")
+    if not num_topics:
+        num_topics, coherence, sweep = select_num_topics(vector_store, stop_words)
+    if streaming is None:
+        streaming = num_docs >= TOPIC_MODEL_STREAMING_MIN_DOCS
+
+    # Write to a temporary directory and swap it in, so readers never see a half-written model
+    path = topic_model_path(vector_store_name)
+    staging_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    shutil.rmtree(staging_path, ignore_errors=True)
+    os.makedirs(staging_path)
+    corpus_path = os.path.join(staging_path, "corpus.mm")
+
+    if streaming:
+        # Two passes over the docstore: one for the vocabulary, one to write the BoW
+        # corpus to disk. Training then reads the corpus back from disk in chunks.
+        dictionary = gensim.corpora.Dictionary(iter_tokenized_chunks(vector_store, stop_words))
+        gensim.corpora.MmCorpus.serialize(
+            corpus_path,
+            (dictionary.doc2bow(tokens) for tokens in iter_tokenized_chunks(vector_store, stop_words))
+        )
+        corpus = gensim.corpora.MmCorpus(corpus_path)
+        lda_model = gensim.models.LdaMulticore(
+            corpus, num_topics=num_topics, id2word=dictionary, passes=TOPIC_MODEL_PASSES,
+            workers=TOPIC_MODEL_WORKERS, chunksize=TOPIC_MODEL_CHUNKSIZE
+        )
+    else:
+        processed_docs = list(iter_tokenized_chunks(vector_store, stop_words))
+        dictionary = gensim.corpora.Dictionary(processed_docs)
+        corpus = [dictionary.doc2bow(doc) for doc in processed_docs]
+        lda_model = gensim.models.LdaModel(corpus, num_topics=num_topics, id2word=dictionary, passes=TOPIC_MODEL_PASSES)
+        gensim.corpora.MmCorpus.serialize(corpus_path, corpus)
+
+    dictionary.save(os.path.join(staging_path, "dictionary.gensim"))
+    lda_model.save(os.path.join(staging_path, "lda.model"))
+    with open(os.path.join(staging_path, "meta.json"), "w") as f:
+        json.dump({"version": version, "num_topics": num_topics, "num_docs": num_docs,
+                   "coherence": coherence, "coherence_measure": TOPIC_COHERENCE_MEASURE, "sweep": sweep,
+                   "passes": TOPIC_MODEL_PASSES, "streaming": streaming, "trained_at": time.time()}, f)
+    # Move the old model aside rather than deleting it first, so the model directory is
+    # only missing between two renames instead of for a whole rmtree
+    retired_path = f"{path}.old-{os.getpid()}-{threading.get_ident()}"
+    try:
+        os.rename(path, retired_path)
+    except FileNotFoundError:
+        retired_path = None
+    os.replace(staging_path, path)
+    if retired_path is not None:
+        shutil.rmtree(retired_path, ignore_errors=True)
+
+    elapsed = time.perf_counter() - start_time
+    mode = f"LdaMulticore, {TOPIC_MODEL_WORKERS} workers, streamed" if streaming else "LdaModel, in memory"
+    print(f"🧮 [TopicModel] Trained {num_topics} topics on {num_docs} chunks in {elapsed:.2f}s ({mode}): {path}")
+    return TopicModel(lda_model, dictionary, version, num_topics, num_docs, coherence)
+
+
+def read_topic_model_meta(vector_store_name: str, version: str = None):
+    """
+    The saved model's meta.json, or None if there is none (or it was trained on a store
+    version other than `version`).
+    """
+    try:
+        with open(os.path.join(topic_model_path(vector_store_name), "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if version is not None and meta["version"] != version:
+        return None
+    return meta
+
+
+def load_topic_model(vector_store_name: str, version: str = None):
+    """
+    Load the saved topic model of a store, or None if there is none (or it was trained
+    on a store version other than `version`).
+    """
+    meta = read_topic_model_meta(vector_store_name, version)
+    if meta is None:
+        return None
+    path = topic_model_path(vector_store_name)
+
+    gensim = get_gensim()
+    dictionary = gensim.corpora.Dictionary.load(os.path.join(path, "dictionary.gensim"))
+    lda_model = gensim.models.LdaModel.load(os.path.join(path, "lda.model"))
+    return TopicModel(lda_model, dictionary, meta["version"], meta["num_topics"], meta["num_docs"],
+                      meta.get("coherence"))
+
+
+class TopicModelCache:
+    """
+    Serves each store's LDA model from memory or from its saved copy, and retrains it
+    only when the store version (or the requested topic count) no longer matches.
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+        self._train_locks = {}
+        self.memory_hits = 0
+        self.disk_loads = 0
+        self.trainings = 0
+
+    @staticmethod
+    def _matches(model, version, num_topics) -> bool:
+        return (
+            model is not None
+            and model.version == version
+            and (num_topics is None or model.num_topics == num_topics)
+        )
+
+    def get(self, vector_store_name: str, num_topics: int = None) -> TopicModel:
+        """
+        Return an up-to-date topic model for the store.
+
+        Args:
+            vector_store_name (str): Store name or path.
+            num_topics (int, optional): Required topic count; any saved count is accepted if omitted.
+        """
+        key = vectorstore_key(vector_store_name)
+        version = vectorstore_version(vector_store_name)
+        if version is None:
+            raise FileNotFoundError(f"Vector store not found: {key}")
+
+        with self._lock:
+            model = self._models.get(key)
+            if self._matches(model, version, num_topics):
+                self.memory_hits += 1
+                return model
+            train_lock = self._train_locks.setdefault(key, threading.Lock())
+
+        with train_lock:
+            with self._lock:
+                model = self._models.get(key)
+                if self._matches(model, version, num_topics):
+                    self.memory_hits += 1
+                    return model
+
+            model = load_topic_model(vector_store_name, version)
+            loaded = self._matches(model, version, num_topics)
+            if loaded:
+                print(f"📂 [TopicModel] Loaded saved model ({model.num_topics} topics) for: {key}")
+            else:
+                model = train_topic_model(vector_store_name, num_topics=num_topics)
+
+            with self._lock:
+                if loaded:
+                    self.disk_loads += 1
+                else:
+                    self.trainings += 1
+                self._models[key] = model
+            return model
+
+    def train(self, vector_store_name: str, vector_store=None, reuse_num_topics: bool = False) -> TopicModel:
+        """
+        (Re)train and save a store's topic model, e.g. right after the store was written.
+        See train_topic_model for `reuse_num_topics`.
+        """
+        key = vectorstore_key(vector_store_name)
+        with self._lock:
+            train_lock = self._train_locks.setdefault(key, threading.Lock())
+        with train_lock:
+            model = train_topic_model(vector_store_name, vector_store, reuse_num_topics=reuse_num_topics)
+            with self._lock:
+                self.trainings += 1
+                self._models[key] = model
+            return model
+
+    def describe(self, vector_store_name: str):
+        """
+        Topic count, coherence and chunk count of the store's current model without
+        loading or training it; None if no up-to-date model exists.
+        """
+        key = vectorstore_key(vector_store_name)
+        version = vectorstore_version(vector_store_name)
+        with self._lock:
+            model = self._models.get(key)
+        if self._matches(model, version, None):
+            return model.describe()
+        meta = read_topic_model_meta(vector_store_name, version)
+        if meta is None:
+            return None
+        return {"num_topics": meta["num_topics"], "coherence": meta.get("coherence"), "num_docs": meta["num_docs"]}
+
+    def invalidate(self, store_key: str):
+        with self._lock:
+            self._models.pop(store_key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "models": len(self._models),
+                "memory_hits": self.memory_hits,
+                "disk_loads": self.disk_loads,
+                "trainings": self.trainings,
+            }
+
+
+topic_models = TopicModelCache()
+on_vectorstore_invalidated(topic_models.invalidate)
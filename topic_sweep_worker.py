@@ -0,0 +1,29 @@
+# Runs in the topic-count sweep's worker processes (see topic_model.py). Like
+# conversion_worker.py it imports nothing from the app, so spawned workers only load gensim.
+
+
+def score_topic_count(texts, num_topics: int, passes: int, coherence: str, seed: int = 0):
+    """
+    Train a small LDA model on a tokenized subsample and score its topic coherence.
+
+    Args:
+        texts (List[List[str]]): Tokenized chunks of the subsample.
+        num_topics (int): Candidate topic count.
+        passes (int): LDA passes for the probe model.
+        coherence (str): gensim coherence measure, e.g. "c_v" or "u_mass".
+        seed (int): Random state, so every candidate is trained the same way.
+
+    Returns:
+        Tuple[int, float]: (num_topics, coherence score).
+    """
+    from gensim import corpora
+    from gensim.models import CoherenceModel, LdaModel
+
+    dictionary = corpora.Dictionary(texts)
+    corpus = [dictionary.doc2bow(tokens) for tokens in texts]
+    lda_model = LdaModel(corpus, num_topics=num_topics, id2word=dictionary, passes=passes, random_state=seed)
+    coherence_model = CoherenceModel(
+        model=lda_model, texts=texts, corpus=corpus, dictionary=dictionary,
+        coherence=coherence, processes=1
+    )
+    return num_topics, float(coherence_model.get_coherence())
@@ -0,0 +1,290 @@
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+
+from configuration import VECTORSORE_PATH
+from configuration import VECTORSTORE_CACHE_MAX_ENTRIES, VECTORSTORE_CACHE_MAX_MEMORY_MB, VECTORSTORE_LOAD_MODE
+from models import get_embeddings
+from ann_index import configure_search_defaults, resident_index_bytes
+from columnar_docstore import ColumnarDocstore, read_faiss_store, snapshot_version, convert_legacy_store, INDEX_FILENAME
+
+
+
+# Callbacks run with the store key whenever a store is rewritten on disk
+_invalidation_listeners = []
+# Callbacks run with the store key when a store is evicted from this process's cache
+_eviction_listeners = []
+
+
+def vectorstore_key(vector_store_name: str) -> str:
+    """
+    Canonical cache key for a store: callers pass either a bare store name or an absolute store path.
+    """
+    return os.path.normpath(os.path.join(VECTORSORE_PATH, vector_store_name))
+
+
+def vectorstore_version(vector_store_name: str):
+    """
+    Version stamp of a store on disk (the name of its current snapshot), or None if it does not exist.
+    Changes every time the store is rebuilt or updated, also by another worker process.
+    """
+    key = vectorstore_key(vector_store_name)
+    version = snapshot_version(key)
+    if version is not None:
+        return version
+    # Saved before snapshots existed; converted at startup (see convert_legacy_vectorstores)
+    try:
+        return f"legacy-{os.stat(os.path.join(key, INDEX_FILENAME)).st_mtime_ns}"
+    except OSError:
+        return None
+
+
+def convert_legacy_vectorstores() -> list:
+    """
+    Convert every store under VECTORSORE_PATH that was saved before snapshots existed.
+    Run once at API startup, before any request reads a store; safe to run from several
+    worker processes at once (see convert_legacy_store).
+
+    Returns:
+        List[str]: Names of the stores converted by this call.
+    """
+    if not os.path.isdir(VECTORSORE_PATH):
+        return []
+    converted = []
+    for name in sorted(os.listdir(VECTORSORE_PATH)):
+        store_path = os.path.join(VECTORSORE_PATH, name)
+        if not os.path.isdir(store_path):
+            continue
+        try:
+            if convert_legacy_store(store_path):
+                converted.append(name)
+        except Exception as e:
+            print(f"⚠️ [Registry] Failed to convert legacy vector store '{name}': {e}")
+    return converted
+
+
+def on_vectorstore_invalidated(listener):
+    """
+    Register a callback `listener(store_key)` run whenever a store is rewritten, so caches
+    derived from the store can drop their entries.
+    """
+    _invalidation_listeners.append(listener)
+
+
+def on_vectorstore_evicted(listener):
+    """
+    Register a callback `listener(store_key)` run when a loaded store is evicted, so
+    in-memory objects holding on to it (e.g. prebuilt retrievers) can let it go.
+    """
+    _eviction_listeners.append(listener)
+
+
+def iter_texts(vector_store):
+    """
+    (doc_id, text) for every chunk of a store. Columnar docstores (stores loaded from
+    disk) are scanned without building Documents; in-memory ones (stores just built by
+    ingestion) are read from their dict.
+    """
+    if isinstance(vector_store.docstore, ColumnarDocstore):
+        return vector_store.docstore.iter_texts()
+    return ((doc_id, doc.page_content) for doc_id, doc in vector_store.docstore._dict.items())
+
+
+def count_documents(vector_store) -> int:
+    if isinstance(vector_store.docstore, ColumnarDocstore):
+        return len(vector_store.docstore)
+    return len(vector_store.docstore._dict)
+
+
+def estimate_vectorstore_bytes(vector_store) -> int:
+    """
+    Rough estimate of the resident size of a loaded FAISS vector store.
+
+    Args:
+        vector_store (FAISS): Loaded langchain FAISS vector store.
+
+    Returns:
+        int: Approximate number of bytes (float32 vectors + chunk text). A memory-mapped
+            index or docstore lives in the shared page cache and is not counted.
+    """
+    vector_bytes = resident_index_bytes(vector_store.index, getattr(vector_store, "index_mmap", False))
+    docstore = vector_store.docstore
+    if isinstance(docstore, ColumnarDocstore):
+        return vector_bytes + (0 if docstore.mmap else docstore.text_bytes())
+    text_bytes = sum(len(doc.page_content) for doc in vector_store.docstore._dict.values())
+    return vector_bytes + text_bytes
+
+
+
+
+class VectorStoreRegistry:
+    """
+    Process-wide LRU cache of loaded FAISS vector stores, keyed by store name.
+
+    Entries are evicted least-recently-used first once either the entry limit or the
+    memory budget is exceeded, and reloaded when the store's version on disk changes
+    (e.g. after another worker process rebuilt it). The most recently loaded store is always kept, even if
+    it alone is larger than the budget.
+    """
+
+    def __init__(self, max_entries: int, max_memory_mb: int):
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024
+        self._stores = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _key(self, vector_store_name: str) -> str:
+        return vectorstore_key(vector_store_name)
+
+    def get(self, vector_store_name: str):
+        """
+        Return the loaded vector store, loading it from disk on a cache miss.
+
+        Args:
+            vector_store_name (str): Name (or full path) of the FAISS vector store.
+
+        Returns:
+            FAISS: The loaded vector store.
+        """
+        key = self._key(vector_store_name)
+        version = vectorstore_version(key)
+        with self._lock:
+            vector_store = self._lookup(key, version)
+            if vector_store is not None:
+                return vector_store
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given store; the others wait and then hit the cache.
+        with load_lock:
+            with self._lock:
+                vector_store = self._lookup(key, version)
+                if vector_store is not None:
+                    return vector_store
+                self.misses += 1
+
+            print(f"📂 [Registry] Loading vector store from: {key}")
+            vector_store = read_faiss_store(key, get_embeddings(), VECTORSTORE_LOAD_MODE)
+            configure_search_defaults(vector_store.index)
+            size_bytes = estimate_vectorstore_bytes(vector_store)
+
+            with self._lock:
+                self._stores[key] = (vector_store, size_bytes, version)
+                evicted = self._evict()
+                self._load_locks.pop(key, None)
+            for evicted_key in evicted:
+                for listener in _eviction_listeners:
+                    try:
+                        listener(evicted_key)
+                    except Exception as e:
+                        print(f"⚠️ [Registry] Eviction listener failed for '{evicted_key}': {e}")
+            print(f"✅ [Registry] Cached '{key}' (~{size_bytes / (1024 * 1024):.1f} MB)")
+            return vector_store
+
+    def _lookup(self, key: str, version):
+        # Caller holds self._lock
+        entry = self._stores.get(key)
+        if entry is not None and entry[2] == version:
+            self._stores.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        return None
+
+    def peek(self, vector_store_name: str):
+        """
+        Return the store if it is already loaded and current, without ever touching the index on disk.
+        """
+        key = self._key(vector_store_name)
+        version = vectorstore_version(key)
+        with self._lock:
+            return self._lookup(key, version)
+
+    def _evict(self) -> list:
+        # Caller holds self._lock; returns the evicted keys
+        evicted = []
+        while len(self._stores) > 1 and (
+            len(self._stores) > self.max_entries or self._memory_bytes() > self.max_memory_bytes
+        ):
+            key, _ = self._stores.popitem(last=False)
+            self.evictions += 1
+            evicted.append(key)
+            print(f"♻️ [Registry] Evicted vector store: {key}")
+        return evicted
+
+    def _memory_bytes(self) -> int:
+        return sum(entry[1] for entry in self._stores.values())
+
+    def invalidate(self, vector_store_name: str):
+        """
+        Drop a store from the cache so the next access reloads it from disk.
+        """
+        key = self._key(vector_store_name)
+        with self._lock:
+            if self._stores.pop(key, None) is not None:
+                self.invalidations += 1
+                print(f"🧹 [Registry] Invalidated vector store: {key}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._stores),
+                "max_entries": self.max_entries,
+                "memory_mb": round(self._memory_bytes() / (1024 * 1024), 2),
+                "max_memory_mb": round(self.max_memory_bytes / (1024 * 1024), 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stores": [os.path.basename(key) for key in self._stores],
+            }
+
+
+vectorstore_registry = VectorStoreRegistry(
+    max_entries=VECTORSTORE_CACHE_MAX_ENTRIES,
+    max_memory_mb=VECTORSTORE_CACHE_MAX_MEMORY_MB,
+)
+
+
+def load_vectorstore(vector_store_name: str):
+    """
+    Load a FAISS vector store through the shared process-wide registry.
+
+    Args:
+        vector_store_name (str): Name (or full path) of the FAISS vector store.
+
+    Returns:
+        FAISS: The loaded vector store.
+    """
+    return vectorstore_registry.get(vector_store_name)
+
+
+async def aload_vectorstore(vector_store_name: str):
+    """
+    Async variant of load_vectorstore: cache hits return immediately on the event loop,
+    only a cold load from disk is pushed to a worker thread.
+    """
+    vector_store = vectorstore_registry.peek(vector_store_name)
+    if vector_store is not None:
+        return vector_store
+    return await asyncio.to_thread(vectorstore_registry.get, vector_store_name)
+
+
+def invalidate_vectorstore(vector_store_name: str):
+    """
+    Invalidate the cached copy of a vector store, and every cache derived from it,
+    after it has been rewritten on disk.
+    """
+    vectorstore_registry.invalidate(vector_store_name)
+    key = vectorstore_key(vector_store_name)
+    for listener in _invalidation_listeners:
+        try:
+            listener(key)
+        except Exception as e:
+            print(f"⚠️ [Registry] Invalidation listener failed for '{key}': {e}")
@@ -0,0 +1,117 @@
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from configuration import RETRIEVAL_POOL_SIZE, RETRIEVAL_MAX_QUEUE
+from configuration import GENERATION_POOL_SIZE, GENERATION_MAX_QUEUE
+
+
+class PoolSaturated(Exception):
+    """
+    Raised when a workload's queue is full; the API turns it into 429 with Retry-After.
+    """
+
+    def __init__(self, pool_name: str, retry_after: int):
+        super().__init__(f"The {pool_name} queue is full. Retry in {retry_after}s.")
+        self.pool_name = pool_name
+        self.retry_after = retry_after
+
+
+class WorkloadPool:
+    """
+    Bounded concurrency for one kind of work (retrieval, generation) with admission control.
+
+    At most `max_workers` requests run at once; up to `max_queue` more wait for a slot and
+    anything beyond that is rejected with PoolSaturated instead of piling up in front of
+    Ollama. Sync callables run on the pool's own bounded ThreadPoolExecutor, async work
+    only takes a slot. Counters are only touched from the event loop, so no lock is needed.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        # Created on first use so it binds to the server's event loop
+        self._slots = None
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_service_seconds = 0.0
+
+    def retry_after(self) -> int:
+        """
+        Seconds until a queued request would likely get a slot, from the average service time.
+        """
+        average_service = self.total_service_seconds / self.completed if self.completed else 1.0
+        return max(1, math.ceil(average_service * (self.waiting + 1) / self.max_workers))
+
+    def check_admission(self):
+        """
+        Reject immediately if the wait queue is already full.
+        """
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise PoolSaturated(self.name, self.retry_after())
+
+    @asynccontextmanager
+    async def admit(self, check: bool = True):
+        """
+        Hold one of the pool's slots for the duration of the block, waiting in the queue if needed.
+        Pass `check=False` when the caller already ran check_admission for this request.
+        """
+        if check:
+            self.check_admission()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        self.waiting += 1
+        enqueued_at = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        started_at = time.perf_counter()
+        wait_seconds = started_at - enqueued_at
+        self.total_wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_service_seconds += time.perf_counter() - started_at
+            self._slots.release()
+
+    async def run(self, func, *args):
+        """
+        Run a blocking callable on this pool's executor once a slot is free.
+        """
+        async with self.admit():
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def stats(self) -> dict:
+        admitted = self.completed + self.in_flight
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait_seconds / admitted * 1000, 1) if admitted else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 1),
+            "avg_service_ms": round(self.total_service_seconds / self.completed * 1000, 1) if self.completed else 0.0,
+        }
+
+
+# Latency-sensitive question answering
+retrieval_pool = WorkloadPool("retrieval", RETRIEVAL_POOL_SIZE, RETRIEVAL_MAX_QUEUE)
+# Long LLM generations: summary, diagram, FAQ, quiz, topics
+generation_pool = WorkloadPool("generation", GENERATION_POOL_SIZE, GENERATION_MAX_QUEUE)